@@ -1,61 +1,128 @@
 import os
+import shutil
 import logging
+import argparse
 from src.snapscrub.data.create_folders import create_folders
 from src.snapscrub.data.copy_to_original import copy_to_original
-from src.snapscrub.data.convert_images import process_images
-from src.snapscrub.data.resize_images import resize_images
-from src.snapscrub.data.rename_images import rename_images_in_folder
+from src.snapscrub.data.fused_ingest import ingest_images
 from src.snapscrub.evaluation.duplicate_removal import remove_duplicate_images
-from src.snapscrub.models.predict_and_generate_log import predict_and_generate_log
+from src.snapscrub.models.embedding_store import EmbeddingStore
+from src.snapscrub.models.predict_and_generate_log import predict_and_generate_logs
+from src.snapscrub.pipeline.runner import Stage, PipelineRunner
+from src.snapscrub.pipeline.stream_ingest import stream_ingest
 from src.snapscrub.results.transfer_images import transfer_top_images_by_framework
+from src.snapscrub.utils.feature_store import FeatureStore
 
 logging.basicConfig(level=logging.INFO)
 
-def main():
-    root_path = "data"
-    folders = create_folders(root_path)
+def restore_cleaned(folders):
+    """
+    Move the images of an earlier duplicate removal back to the resized folder, so it can run again.
+    """
+    for file_name in os.listdir(folders["cleaned"]):
+        shutil.move(os.path.join(folders["cleaned"], file_name), os.path.join(folders["resized"], file_name))
 
-    source_path = "/Users/wbendinelli/Downloads/teste_photo"
-    copy_to_original(source_path, folders["original"])
+def build_stages(root_path, source_path, folders, feature_store, embedding_store, streaming=False):
+    """
+    Define the pipeline stages and their dependencies.
 
-    # Convert HEIC images and copy other image formats
-    logging.info("Processing images (conversion and copying)...")
-    process_images(folders["original"], folders["converted"])
+    Parameters:
+        root_path (str): Root directory of the project.
+        source_path (str): Folder of the source photos.
+        folders (dict): Folders returned by ``create_folders``.
+        feature_store (FeatureStore): Store of image features and model scores.
+        embedding_store (EmbeddingStore): Store of model embeddings.
+        streaming (bool): Overlap ingest with feature extraction and scoring (default: False).
 
-    # Rename images before further processing
+    Returns:
+        list: ``Stage`` definitions for ``PipelineRunner``.
+    """
     mapping_path = os.path.join(root_path, "name_mapping.csv")
-    rename_images_in_folder(folders["converted"], mapping_path)
-
-    # Resize images after conversion and renaming
-    resize_images(folders["converted"], folders["resized"])
-
-    # Remove duplicate images using multiple similarity measures
-    logging.info("Removing duplicate images...")
-    removed_images = remove_duplicate_images(
-        folder_path=folders["resized"],
-        cleaned_folder=folders["cleaned"],
-        threshold=0.60  # Ajuste o limiar conforme necessário
-    )
-    logging.info(f"Total duplicates removed: {len(removed_images)}")
-
-    # Generate image predictions using TensorFlow and PyTorch models
-    logging.info("Generating image scores...")
-    predict_and_generate_log(root_path, framework="tensorflow")
-    predict_and_generate_log(root_path, framework="pytorch")
-
-    # Transfer top-ranked images to results folder
-    logging.info("Transferring top-ranked images to results...")
+    score_paths = {framework: os.path.join(root_path, f"model_scores_{framework}.csv")
+                   for framework in ("tensorflow", "pytorch")}
+    dedup_params = {
+        "threshold": 0.60,  # Ajuste o limiar conforme necessário
+        "max_hash_distance": 12,  # Only pairs within 12 pHash bits get histogram/SSIM checks
+        "embedding_threshold": 0.95,  # MobileNetV3 cosine similarity for reframed burst shots
+    }
     num_images_to_transfer = 5  # Defina o número de imagens a serem transferidas
-    transfer_top_images_by_framework(
-        tf_csv_path=os.path.join(root_path, "model_scores_tensorflow.csv"),
-        pt_csv_path=os.path.join(root_path, "model_scores_pytorch.csv"),
-        name_mapping_path=mapping_path,
-        original_folder=folders["original"],
-        results_folder=folders["results"],
-        num_images=num_images_to_transfer
-    )
 
-    logging.info("Pipeline execution completed successfully.")
+    def remove_duplicates():
+        restore_cleaned(folders)
+        removed_images = remove_duplicate_images(
+            folder_path=folders["resized"],
+            cleaned_folder=folders["cleaned"],
+            feature_store=feature_store,
+            embedding_store=embedding_store,
+            **dedup_params
+        )
+        logging.info(f"Total duplicates removed: {len(removed_images)}")
+
+    def ingest():
+        if streaming:
+            # Features and scores are stored as images are ingested; the later stages read them back
+            stream_ingest(folders["original"], folders["converted"], folders["resized"], mapping_path,
+                          feature_store=feature_store, embedding_store=embedding_store,
+                          frameworks=tuple(score_paths), workers=os.cpu_count())
+        else:
+            ingest_images(folders["original"], folders["converted"], folders["resized"], mapping_path,
+                          workers=os.cpu_count())
+
+    def score():
+        predict_and_generate_logs(root_path, frameworks=tuple(score_paths), feature_store=feature_store,
+                                  embedding_store=embedding_store)
+
+    def transfer():
+        transfer_top_images_by_framework(
+            tf_csv_path=score_paths["tensorflow"],
+            pt_csv_path=score_paths["pytorch"],
+            name_mapping_path=mapping_path,
+            original_folder=folders["original"],
+            results_folder=folders["results"],
+            num_images=num_images_to_transfer
+        )
+
+    return [
+        # Only changed files are copied again; unchanged originals are kept between runs
+        Stage("copy", lambda: copy_to_original(source_path, folders["original"], incremental=True, link="auto", threads=8),
+              inputs=(source_path,), outputs=(folders["original"],)),
+        # Convert, rename and resize every image from a single decode
+        Stage("ingest", ingest, depends=("copy",), inputs=(folders["original"],),
+              outputs=(folders["converted"], folders["resized"], folders["cleaned"], mapping_path), clean_outputs=True),
+        # Remove duplicate images using multiple similarity measures
+        Stage("dedup", remove_duplicates, depends=("ingest",), outputs=(folders["cleaned"],), params=dedup_params),
+        # Generate image predictions using TensorFlow and PyTorch models, decoding each image once
+        Stage("score", score, depends=("dedup",), inputs=(folders["resized"],), outputs=tuple(score_paths.values())),
+        # Transfer top-ranked images to results folder
+        Stage("transfer", transfer, depends=("score",), outputs=(folders["results"],),
+              params={"num_images": num_images_to_transfer}, clean_outputs=True),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the SnapScrub pipeline, resuming after the last completed stage.")
+    parser.add_argument("--force", nargs="*", default=[], help="Stages to run even if they are up to date.")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Extract features and scores while images are ingested, through bounded queues.")
+    args = parser.parse_args()
+
+    root_path = "data"
+    source_path = "/Users/wbendinelli/Downloads/teste_photo"
+    # Folders are kept between runs; each stage clears what it rewrites
+    folders = create_folders(root_path, keep=("original", "resized", "converted", "cleaned", "results"))
+
+    # Features and model scores are kept across runs, keyed by image content
+    feature_store = FeatureStore(os.path.join(root_path, "feature_store.sqlite"))
+    # Model features are kept as memory-mapped arrays, so rankings can be recomputed without inference
+    embedding_store = EmbeddingStore(os.path.join(root_path, "embeddings"))
+
+    stages = build_stages(root_path, source_path, folders, feature_store, embedding_store, streaming=args.streaming)
+    # Every stage depends on the previous one, so the stages run one at a time
+    runner = PipelineRunner(stages, os.path.join(root_path, "pipeline_state"), max_workers=1)
+    try:
+        status = runner.run(force=args.force)
+    finally:
+        feature_store.close()
+    logging.info(f"Pipeline execution completed successfully: {status}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
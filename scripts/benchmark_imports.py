@@ -0,0 +1,85 @@
+import sys
+import logging
+import argparse
+import subprocess
+
+logging.basicConfig(level=logging.INFO)
+
+# Module: (time budget in seconds, heavy modules it must not load)
+IMPORT_BUDGETS = {
+    "src.snapscrub.data": (0.25, ["pandas", "PIL", "pillow_heif", "cv2", "tensorflow", "torch"]),
+    "src.snapscrub.evaluation": (0.25, ["pandas", "PIL", "cv2", "imagehash", "tensorflow", "torch"]),
+    "src.snapscrub.models": (0.25, ["pandas", "PIL", "tensorflow", "torch", "torchvision"]),
+    "src.snapscrub.results": (0.25, ["pandas", "tensorflow", "torch"]),
+    "src.snapscrub.utils": (0.25, ["PIL", "cv2", "imagehash", "tensorflow", "torch"]),
+    "src.snapscrub.pipeline": (0.25, ["pandas", "PIL", "cv2", "tensorflow", "torch"]),
+    "src.snapscrub.data.rename_images": (1.5, ["pillow_heif", "cv2", "tensorflow", "torch"]),
+    "src.snapscrub.evaluation.duplicate_removal": (1.5, ["pandas", "tensorflow", "torch"]),
+    "src.snapscrub.models.predict_and_generate_log": (1.5, ["tensorflow", "torch", "torchvision"]),
+}
+
+_MEASURE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(",".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def measure_import(module, heavy, repeat=3):
+    """
+    Measure the cold import time of a module in fresh interpreters.
+
+    Parameters:
+        module (str): Dotted module name.
+        heavy (list): Module names whose loading should be reported.
+        repeat (int): Number of fresh interpreters to run (default: 3).
+
+    Returns:
+        tuple: ``(seconds, loaded)`` with the fastest import time and the heavy modules
+        loaded by the import, or ``(None, [])`` if the import failed.
+    """
+    timings = []
+    loaded = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _MEASURE.format(module=module, heavy=list(heavy))],
+            capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            logging.error(f"Importing {module} failed: {result.stderr.strip().splitlines()[-1]}")
+            return None, []
+        elapsed, names = result.stdout.split("\n")[:2]
+        timings.append(float(elapsed))
+        loaded = [name for name in names.split(",") if name]
+    return min(timings), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check package import times against their budgets.")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per module.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget (e.g. on slow machines).")
+    args = parser.parse_args()
+
+    failures = 0
+    for module, (budget, heavy) in IMPORT_BUDGETS.items():
+        seconds, loaded = measure_import(module, heavy, args.repeat)
+        if seconds is None:
+            failures += 1
+            continue
+        over_budget = seconds > budget * args.scale
+        status = "FAIL" if over_budget or loaded else "ok"
+        logging.info(f"{status:4} {module}: {seconds * 1000:.0f} ms (budget {budget * args.scale * 1000:.0f} ms)"
+                     + (f", loaded {loaded}" if loaded else ""))
+        failures += status == "FAIL"
+
+    if failures:
+        logging.error(f"{failures} module(s) over their import budget.")
+        sys.exit(1)
+    logging.info("All imports within budget.")
+
+
+if __name__ == "__main__":
+    main()
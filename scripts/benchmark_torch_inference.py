@@ -0,0 +1,61 @@
+import time
+import logging
+import argparse
+from src.snapscrub.models.get_model_map import get_model_map, MODEL_NAMES
+
+logging.basicConfig(level=logging.INFO)
+
+def time_model(model, batch, iterations, warmup=2):
+    """
+    Measure the throughput of a PyTorch model on a fixed batch.
+
+    Parameters:
+        model: Callable model taking an NCHW float batch.
+        batch (torch.Tensor): Input batch.
+        iterations (int): Number of timed forward passes.
+        warmup (int): Untimed forward passes run first (default: 2).
+
+    Returns:
+        tuple: ``(images_per_second, norms)`` with the feature norms of the last pass.
+    """
+    import torch
+
+    with torch.no_grad():
+        for _ in range(warmup):
+            model(batch)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            features = model(batch)
+        elapsed = time.perf_counter() - start
+    return iterations * len(batch) / elapsed, features.flatten(1).norm(dim=1)
+
+
+def main():
+    import torch
+
+    parser = argparse.ArgumentParser(description="Compare the default and optimized PyTorch inference paths.")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images per forward pass.")
+    parser.add_argument("--iterations", type=int, default=5, help="Timed forward passes per model.")
+    parser.add_argument("--models", nargs="+", default=MODEL_NAMES["pytorch"], help="Models to benchmark.")
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    batch = torch.rand(args.batch_size, 3, 224, 224)
+    native_map = get_model_map("pytorch", args.models)
+    optimized_map = get_model_map("pytorch-optimized", args.models)
+
+    for model_name in args.models:
+        native, _ = native_map[model_name]
+        native.eval()
+        native_rate, native_norms = time_model(native, batch, args.iterations)
+
+        optimized, _ = optimized_map[model_name]
+        optimized_rate, optimized_norms = time_model(optimized, batch, args.iterations)
+
+        max_difference = ((optimized_norms - native_norms).abs() / native_norms.abs().clamp_min(1e-12)).max().item()
+        logging.info(f"{model_name}: {native_rate:.1f} -> {optimized_rate:.1f} images/s "
+                     f"({optimized_rate / native_rate:.2f}x), max relative norm difference {max_difference:.2e}")
+
+
+if __name__ == "__main__":
+    main()
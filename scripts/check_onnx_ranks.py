@@ -0,0 +1,58 @@
+import os
+import sys
+import logging
+import argparse
+import pandas as pd
+from src.snapscrub.models.get_model_map import get_model_map, MODEL_NAMES
+from src.snapscrub.models.onnx_backend import check_rank_consistency
+from src.snapscrub.models.shared_preprocessing import evaluate_shared_batches
+
+logging.basicConfig(level=logging.INFO)
+
+def score_tables(image_paths, native_framework, onnx_framework, batch_size):
+    """
+    Score images with the native and ONNX versions of a framework's models from the same decoded batches.
+
+    Returns:
+        tuple: Native and ONNX score tables with ``file_name`` and model columns.
+    """
+    model_names = MODEL_NAMES[native_framework]
+    model_maps = {
+        native_framework: get_model_map(native_framework, model_names),
+        onnx_framework: get_model_map(onnx_framework, model_names),
+    }
+    results = evaluate_shared_batches(image_paths, model_maps, batch_size)
+    return tuple(pd.DataFrame(list(results[framework].values())) for framework in model_maps)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that ONNX scores rank images like the native backends.")
+    parser.add_argument("--root", default="data", help="Project data folder containing 'resized'.")
+    parser.add_argument("--framework", default="onnx", choices=["onnx", "onnx-int8"], help="ONNX backend to check.")
+    parser.add_argument("--min-correlation", type=float, default=0.99, help="Minimum rank correlation per model.")
+    parser.add_argument("--top-k", type=int, default=10, help="Number of top-ranked images compared.")
+    parser.add_argument("--min-top-k-overlap", type=float, default=0.9, help="Minimum top-k overlap per model.")
+    parser.add_argument("--batch-size", type=int, default=32, help="Number of images per batch.")
+    args = parser.parse_args()
+
+    resized_folder = os.path.join(args.root, "resized")
+    image_paths = sorted(
+        os.path.join(resized_folder, f) for f in os.listdir(resized_folder)
+        if f.lower().endswith(("jpg", "jpeg", "png", "bmp"))
+    )
+
+    # Both backends score the same decoded buffer, so only backend differences are measured;
+    # one framework at a time keeps only its native and ONNX models loaded
+    inconsistent = []
+    for native_framework in ("tensorflow", "pytorch"):
+        native, onnx = score_tables(image_paths, native_framework, args.framework, args.batch_size)
+        report = check_rank_consistency(native, onnx, MODEL_NAMES[native_framework], args.min_correlation,
+                                        args.top_k, args.min_top_k_overlap)
+        inconsistent += [model for model, result in report.items() if not result["consistent"]]
+
+    if inconsistent:
+        logging.error(f"Rank ordering differs from the native backends for: {inconsistent}")
+        sys.exit(1)
+    logging.info(f"{args.framework} rankings are consistent with the native backends.")
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,10 @@ setup(
         "tqdm",
         "pillow-heif"
     ],
+    extras_require={
+        # ONNX Runtime backend for CPU inference ('onnx' / 'onnx-int8' frameworks)
+        "onnx": ["onnx", "onnxruntime", "tf2onnx"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3.9",
         "License :: OSI Approved :: MIT License",
@@ -1,7 +1,17 @@
-from .convert_images import heic_to_rgb
-from .convert_images import process_images
-from .copy_to_original import copy_to_original
-from .create_folders import create_folders
-from .file_management import transfer_images
-from .image_resizing import resize_images
-from .rename_images import rename_images_in_folder
\ No newline at end of file
+from src.snapscrub.utils.lazy_imports import lazy_exports
+
+# Names are imported on first access so that importing the package stays cheap
+lazy_exports(__name__, {
+    "heic_to_rgb": ".convert_images",
+    "process_images": ".convert_images",
+    "convert_heic_parallel": ".convert_images",
+    "copy_to_original": ".copy_to_original",
+    "create_folders": ".create_folders",
+    "transfer_images": ".file_management",
+    "resize_images": ".image_resizing",
+    "rename_images_in_folder": ".rename_images",
+    "load_capture_times": ".rename_images",
+    "ingest_image": ".fused_ingest",
+    "ingest_images": ".fused_ingest",
+    "open_reduced": ".reduced_decode",
+})
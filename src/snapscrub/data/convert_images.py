@@ -1,13 +1,22 @@
 import os
+import time
 import logging
-import shutil
+import multiprocessing
+from multiprocessing.connection import wait
 from PIL import Image
 import pillow_heif
+from src.snapscrub.utils.content_hash import find_exact_duplicates
 
 def heic_to_rgb(image_path, output_path, target_format='jpeg'):
     """
     Convert a HEIC image to the specified format using pillow-heif.
 
+    The decoded buffer is wrapped without copying (``Image.frombuffer``) and only
+    converted when it is not RGB already. EXIF metadata (including the capture time)
+    is carried over to the converted image. The image is written to a ``.partial``
+    file and moved into place when complete, so a conversion that fails or is killed
+    never leaves a truncated file at ``output_path``.
+
     Parameters:
         image_path (str): Path to the HEIC image.
         output_path (str): Path to save the converted image.
@@ -15,28 +24,234 @@ def heic_to_rgb(image_path, output_path, target_format='jpeg'):
     """
     try:
         heif_image = pillow_heif.open_heif(image_path)
-        image = Image.frombytes(
+        image = Image.frombuffer(
             heif_image.mode,
             heif_image.size,
             heif_image.data,
             "raw",
             heif_image.mode,
             heif_image.stride,
+            1,
         )
-        image.convert("RGB").save(output_path, format=target_format.upper())
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        partial_path = _partial_path(output_path)
+        image.save(partial_path, format=target_format.upper(), **_exif_options(heif_image.info))
+        os.replace(partial_path, output_path)
         logging.info(f"Successfully converted {image_path} to {target_format.upper()}")
     except Exception as e:
         logging.error(f"Failed to convert {image_path}: {e}")
+        _remove_partial(output_path)
         raise
 
-def process_images(source_folder, destination_folder, target_format='jpeg'):
+def _partial_path(output_path):
+    """
+    Return the temporary path a converted image is written to before it is complete.
+    """
+    return f"{output_path}.partial"
+
+def _remove_partial(output_path):
+    """
+    Delete the incomplete output left by a failed or killed conversion, if any.
+    """
+    try:
+        os.remove(_partial_path(output_path))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logging.warning(f"Could not remove incomplete output {_partial_path(output_path)}: {e}")
+
+def _exif_options(info):
+    """
+    Return the ``save`` options that keep the EXIF block of an image, if it has one.
+    """
+    exif = info.get("exif")
+    return {"exif": exif} if exif else {}
+
+def _preserve_mtime(source_path, destination_path):
+    """
+    Give a converted image the modification time of its source, the fallback capture time.
+    """
+    try:
+        stat = os.stat(source_path)
+        os.utime(destination_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    except OSError as e:
+        logging.warning(f"Could not preserve modification time of {source_path}: {e}")
+
+def _conversion_worker(connection):
+    """
+    Convert the HEIC files received on a pipe until it sends None.
+    """
+    while True:
+        task = connection.recv()
+        if task is None:
+            break
+        idx, source_path, output_path, target_format = task
+        start = time.perf_counter()
+        try:
+            heic_to_rgb(source_path, output_path, target_format)
+            _preserve_mtime(source_path, output_path)
+            error = None
+        except Exception as e:
+            error = str(e)
+        connection.send((idx, error, time.perf_counter() - start))
+
+
+class _ConversionSlot:
+    """
+    A worker process of ``convert_heic_parallel`` with its pipe, current task and statistics.
+    """
+
+    def __init__(self, slot_id):
+        self.slot_id = slot_id
+        self.files = 0
+        self.failures = 0
+        self.busy_seconds = 0.0
+        self.restarts = 0
+        self.task = None
+        self.started = None
+        self._start_process()
+
+    def _start_process(self):
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_conversion_worker, args=(child_connection,), daemon=True)
+        self.process.start()
+        child_connection.close()
+
+    def submit(self, task):
+        self.task = task
+        self.started = time.perf_counter()
+        self.connection.send(task)
+
+    def finish(self, seconds, failed):
+        self.files += 1
+        self.failures += failed
+        self.busy_seconds += seconds
+        self.task = None
+
+    def restart(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+        # The killed worker may have been writing the output of its current task
+        if self.task is not None:
+            _remove_partial(self.task[2])
+        self.restarts += 1
+        self._start_process()
+
+    def stop(self):
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+        self.connection.close()
+
+
+def convert_heic_parallel(tasks, workers=4, timeout=120, target_format='jpeg'):
+    """
+    Convert HEIC files with a pool of worker processes.
+
+    Every file runs in a worker process with its own deadline: a worker that exceeds
+    ``timeout`` seconds on one file, or crashes (e.g. in the native HEIF decoder), is
+    killed and replaced, and only that file is reported as failed (its incomplete
+    output is removed). Converted files keep the modification time of their source.
+
+    Parameters:
+        tasks (list): ``(source_path, output_path)`` pairs.
+        workers (int): Number of worker processes (default: 4).
+        timeout (float): Maximum seconds per file (default: 120).
+        target_format (str): Format to convert to (default: 'jpeg').
+
+    Returns:
+        tuple: ``(errors, worker_stats)`` where ``errors`` maps the source path of every
+        failed file to its error message, and ``worker_stats`` holds a dictionary per
+        worker with its files, failures, busy seconds and restarts.
+    """
+    pending = list(enumerate(tasks))[::-1]
+    errors = {}
+    slots = [_ConversionSlot(slot_id) for slot_id in range(max(1, min(workers, len(tasks))))]
+    start = time.perf_counter()
+
+    try:
+        for slot in slots:
+            if pending:
+                idx, (source_path, output_path) = pending.pop()
+                slot.submit((idx, source_path, output_path, target_format))
+
+        while any(slot.task is not None for slot in slots):
+            busy = {slot.connection: slot for slot in slots if slot.task is not None}
+            deadline = min(slot.started + timeout for slot in busy.values())
+            ready = wait(list(busy), timeout=max(0.0, deadline - time.perf_counter()))
+
+            for connection in ready:
+                slot = busy[connection]
+                source_path = slot.task[1]
+                try:
+                    idx, error, seconds = connection.recv()
+                except (EOFError, OSError):
+                    # The worker died while converting this file
+                    seconds = time.perf_counter() - slot.started
+                    slot.process.join(timeout=1)
+                    error = f"worker crashed (exit code {slot.process.exitcode})"
+                    slot.restart()
+                if error is not None:
+                    errors[source_path] = error
+                slot.finish(seconds, error is not None)
+
+            for slot in busy.values():
+                if slot.task is not None and time.perf_counter() - slot.started > timeout:
+                    errors[slot.task[1]] = f"timed out after {timeout} s"
+                    slot.restart()
+                    slot.finish(timeout, True)
+
+            for slot in slots:
+                if slot.task is None and pending:
+                    idx, (source_path, output_path) = pending.pop()
+                    slot.submit((idx, source_path, output_path, target_format))
+    finally:
+        for slot in slots:
+            slot.stop()
+
+    elapsed = time.perf_counter() - start
+    worker_stats = [
+        {"worker": slot.slot_id, "files": slot.files, "failures": slot.failures,
+         "busy_seconds": slot.busy_seconds, "restarts": slot.restarts}
+        for slot in slots
+    ]
+    for stats in worker_stats:
+        rate = stats["files"] / stats["busy_seconds"] if stats["busy_seconds"] else 0.0
+        logging.info(f" - Worker {stats['worker']}: {stats['files']} files in {stats['busy_seconds']:.1f} s "
+                     f"({rate:.2f} files/s), {stats['failures']} failed, {stats['restarts']} restarts")
+    logging.info(f"Converted {len(tasks) - len(errors)}/{len(tasks)} HEIC files in {elapsed:.1f} s "
+                 f"({len(tasks) / elapsed if elapsed else 0.0:.2f} files/s) with {len(slots)} workers.")
+    return errors, worker_stats
+
+
+def process_images(source_folder, destination_folder, target_format='jpeg', skip_exact_duplicates=True,
+                   workers=None, timeout=120):
     """
     Process images from a source folder and copy them to a destination folder.
 
+    Byte-identical source files (e.g. the same HEIC exported twice) are detected by size
+    and content hash before conversion, and only the first file of each group is processed.
+    Converted images keep the EXIF metadata and modification time of their source, so
+    their capture time can still be read (see ``read_capture_time``).
+
+    With ``workers`` set, HEIC files are converted by a pool of worker processes (see
+    ``convert_heic_parallel``) where a file that hangs or crashes the decoder only
+    fails itself, and a per-worker throughput summary is logged.
+
     Parameters:
         source_folder (str): Folder containing the source images.
         destination_folder (str): Folder where processed images will be saved.
         target_format (str): Target format for image conversion (default: 'jpeg').
+        skip_exact_duplicates (bool): Skip byte-identical copies before conversion (default: True).
+        workers (int): Number of processes converting HEIC files; None or 1 converts them
+            in this process (default: None).
+        timeout (float): Maximum seconds per HEIC file in the worker pool (default: 120).
 
     Returns:
         None
@@ -66,6 +281,18 @@ def process_images(source_folder, destination_folder, target_format='jpeg'):
         copied_count = 0
         converted_count = 0
         skipped_count = 0
+        duplicate_count = 0
+        heic_tasks = []
+
+        # Find byte-identical source files before spending time on conversion
+        exact_duplicates = set()
+        if skip_exact_duplicates:
+            source_files = [
+                os.path.join(source_folder, f) for f in os.listdir(source_folder)
+                if os.path.isfile(os.path.join(source_folder, f))
+            ]
+            for group in find_exact_duplicates(source_files):
+                exact_duplicates.update(os.path.basename(p) for p in group[1:])
 
         # Process files in the source folder
         for file_name in os.listdir(source_folder):
@@ -76,23 +303,42 @@ def process_images(source_folder, destination_folder, target_format='jpeg'):
                 logging.warning(f"Skipping non-file entry: {file_name}")
                 continue
 
+            if file_name in exact_duplicates:
+                logging.info(f"Skipping exact duplicate: {file_name}")
+                duplicate_count += 1
+                continue
+
             try:
                 if file_name.lower().endswith('.heic'):
-                    heic_to_rgb(source_path, destination_path, target_format)
-                    shutil.move(destination_path, os.path.join(converted_folder, os.path.basename(destination_path)))
+                    # Converted HEIC files go straight to the converted subfolder
+                    output_path = os.path.join(converted_folder, os.path.basename(destination_path))
+                    if workers and workers > 1:
+                        heic_tasks.append((source_path, output_path))
+                        continue
+                    heic_to_rgb(source_path, output_path, target_format)
+                    _preserve_mtime(source_path, output_path)
                     converted_count += 1
                 else:
                     with Image.open(source_path) as img:
-                        img.convert("RGB").save(destination_path, format=target_format.upper())
+                        img.convert("RGB").save(destination_path, format=target_format.upper(), **_exif_options(img.info))
+                    _preserve_mtime(source_path, destination_path)
                     copied_count += 1
             except Exception as e:
                 logging.warning(f"Skipped file {file_name} due to error: {e}")
                 skipped_count += 1
 
+        if heic_tasks:
+            errors, _ = convert_heic_parallel(heic_tasks, workers, timeout, target_format)
+            for source_path, error in errors.items():
+                logging.warning(f"Skipped file {os.path.basename(source_path)} due to error: {error}")
+            converted_count += len(heic_tasks) - len(errors)
+            skipped_count += len(errors)
+
         # Log summary
         logging.info(f"Summary of image processing:")
         logging.info(f" - Copied without conversion: {copied_count}")
         logging.info(f" - Converted from HEIC to {target_format.upper()}: {converted_count}")
+        logging.info(f" - Skipped exact duplicates: {duplicate_count}")
         logging.info(f" - Skipped files (not processed): {skipped_count}")
 
     except Exception as e:
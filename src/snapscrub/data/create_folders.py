@@ -2,7 +2,7 @@ import os
 import shutil
 import logging
 
-def create_folders(root_path):
+def create_folders(root_path, keep=()):
     """
     Create the necessary directory structure for the image classification pipeline.
 
@@ -13,8 +13,12 @@ def create_folders(root_path):
     - `cleaned`: Contains cleaned images (without duplicates or corrupt files).
     - `results`: Stores results such as evaluation tables or reports.
 
+    Existing subdirectories are removed first, except those named in ``keep`` (e.g.
+    ``("original",)`` to synchronize the originals incrementally with ``copy_to_original``).
+
     Parameters:
         root_path (str): The root directory where the subdirectories will be created.
+        keep (tuple): Names of subdirectories whose contents are kept (default: none).
 
     Returns:
         dict: A dictionary containing the names of the subdirectories as keys and their full paths as values.
@@ -28,8 +32,8 @@ def create_folders(root_path):
     }
 
     # Remove existing directories
-    for folder in folders.values():
-        if os.path.exists(folder):
+    for name, folder in folders.items():
+        if os.path.exists(folder) and name not in keep:
             shutil.rmtree(folder)
         os.makedirs(folder, exist_ok=True)
 
@@ -0,0 +1,170 @@
+import os
+import logging
+import pandas as pd
+import pillow_heif
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+from src.snapscrub.utils.content_hash import find_exact_duplicates
+from src.snapscrub.utils.capture_time import EXIF_IFD, DATETIME_ORIGINAL, DATETIME, parse_exif_datetime
+
+# Let PIL open HEIC files directly, with their EXIF metadata
+pillow_heif.register_heif_opener()
+
+
+def clear_folder(folder_path):
+    """
+    Create a folder, or delete the files it already holds.
+    """
+    os.makedirs(folder_path, exist_ok=True)
+    for file_name in os.listdir(folder_path):
+        file_path = os.path.join(folder_path, file_name)
+        if os.path.isfile(file_path):
+            try:
+                os.remove(file_path)
+            except OSError as e:
+                logging.warning(f"Failed to delete file {file_name}: {e}")
+
+
+def ingest_image(source_path, converted_path, resized_path, size=(256, 256), target_format="jpeg"):
+    """
+    Decode an image once and write its normalized full-size and resized versions.
+
+    The image is decoded, rotated according to its EXIF orientation and converted to
+    RGB; the full-size output (with the EXIF metadata) and the resized output are both
+    encoded from that same in-memory image. Both files get the modification time of
+    the source.
+
+    Parameters:
+        source_path (str): Path to the source image (any format PIL or pillow-heif reads).
+        converted_path (str): Destination of the full-size image.
+        resized_path (str): Destination of the resized image.
+        size (tuple): Size of the resized image (width, height) (default: 256x256).
+        target_format (str): Format of both outputs (default: 'jpeg').
+
+    Returns:
+        tuple: ``(capture_time, capture_time_source)`` as returned by ``read_capture_time``,
+        or None if the image could not be processed.
+    """
+    try:
+        stat = os.stat(source_path)
+        with Image.open(source_path) as img:
+            exif = img.getexif()
+            value = exif.get_ifd(EXIF_IFD).get(DATETIME_ORIGINAL) or exif.get(DATETIME)
+            capture_time = parse_exif_datetime(value) if value else None
+            image = ImageOps.exif_transpose(img).convert("RGB")
+
+        save_options = {"exif": image.info["exif"]} if image.info.get("exif") else {}
+        image.save(converted_path, format=target_format.upper(), **save_options)
+        image.resize(size).save(resized_path, format=target_format.upper())
+        for output_path in (converted_path, resized_path):
+            os.utime(output_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        if capture_time is None:
+            return stat.st_mtime, "mtime"
+        return capture_time, "exif"
+    except Exception as e:
+        logging.error(f"Error ingesting image {source_path}: {e}")
+        return None
+
+
+def _ingest_task(task):
+    return ingest_image(*task)
+
+
+def plan_ingest(source_folder, converted_folder, resized_folder, size=(256, 256), target_format="jpeg",
+                skip_exact_duplicates=True):
+    """
+    List the source images to ingest and the ``ingest_image`` arguments of each.
+
+    IDs follow the sorted source file names, so they are known before any image is
+    decoded. Byte-identical source files are skipped (only the first copy is kept).
+
+    Parameters:
+        source_folder (str): Folder containing the source images.
+        converted_folder (str): Folder receiving the full-size normalized images.
+        resized_folder (str): Folder receiving the resized images.
+        size (tuple): Size of the resized images (width, height) (default: 256x256).
+        target_format (str): Format of the outputs (default: 'jpeg').
+        skip_exact_duplicates (bool): Skip byte-identical source files (default: True).
+
+    Returns:
+        tuple: Source file names and ``(source_path, converted_path, resized_path, size,
+        target_format)`` tasks, in the same order.
+    """
+    source_files = sorted(f for f in os.listdir(source_folder) if os.path.isfile(os.path.join(source_folder, f)))
+    if skip_exact_duplicates:
+        exact_duplicates = set()
+        for group in find_exact_duplicates([os.path.join(source_folder, f) for f in source_files]):
+            exact_duplicates.update(os.path.basename(p) for p in group[1:])
+        if exact_duplicates:
+            logging.info(f"Skipping {len(exact_duplicates)} exact duplicates: {sorted(exact_duplicates)}")
+        source_files = [f for f in source_files if f not in exact_duplicates]
+
+    # IDs are assigned up front, so workers write straight to the final names
+    new_names = [f"{idx + 1}.{target_format}" for idx in range(len(source_files))]
+    tasks = [
+        (os.path.join(source_folder, source), os.path.join(converted_folder, new_name),
+         os.path.join(resized_folder, new_name), size, target_format)
+        for source, new_name in zip(source_files, new_names)
+    ]
+    return source_files, tasks
+
+
+def ingest_images(source_folder, converted_folder, resized_folder, mapping_path, size=(256, 256),
+                  target_format="jpeg", workers=None, skip_exact_duplicates=True, chunk_size=8):
+    """
+    Convert, rename and resize source images in a single pass.
+
+    Replaces running ``process_images``, ``rename_images_in_folder`` and
+    ``resize_images`` one after the other, which decodes and encodes every photo
+    several times and walks the folders once per step. Here each source file is
+    decoded once (see ``ingest_image``) and written directly under its final name,
+    ``<id>.<target_format>``, to both output folders. IDs follow the sorted source file
+    names, so they are known before any image is decoded; images that cannot be read
+    leave a gap in the numbering. HEIC files are read like any other format.
+
+    The name mapping CSV has the same columns as the one written by
+    ``rename_images_in_folder``, with ``original_name`` being the source file name.
+
+    Parameters:
+        source_folder (str): Folder containing the source images.
+        converted_folder (str): Folder receiving the full-size normalized images.
+        resized_folder (str): Folder receiving the resized images.
+        mapping_path (str): Path to save the name mapping CSV.
+        size (tuple): Size of the resized images (width, height) (default: 256x256).
+        target_format (str): Format of the outputs (default: 'jpeg').
+        workers (int): Number of processes; None or 1 ingests in this process (default: None).
+        skip_exact_duplicates (bool): Skip byte-identical source files (default: True).
+        chunk_size (int): Number of images sent to a worker at a time (default: 8).
+
+    Returns:
+        pd.DataFrame: DataFrame containing the mapping of original to renamed files.
+    """
+    columns = ["original_name", "file_name", "capture_time", "capture_time_source"]
+    if not os.path.exists(source_folder):
+        logging.error(f"Source folder '{source_folder}' does not exist.")
+        return pd.DataFrame(columns=columns)
+
+    clear_folder(converted_folder)
+    clear_folder(resized_folder)
+
+    source_files, tasks = plan_ingest(source_folder, converted_folder, resized_folder, size, target_format,
+                                      skip_exact_duplicates)
+    new_names = [os.path.basename(task[2]) for task in tasks]
+
+    logging.info(f"Ingesting {len(tasks)} images...")
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_ingest_task, tasks, chunksize=max(1, chunk_size)))
+    else:
+        results = [_ingest_task(task) for task in tasks]
+
+    mapping = [
+        {"original_name": source, "file_name": new_name, "capture_time": result[0], "capture_time_source": result[1]}
+        for source, new_name, result in zip(source_files, new_names, results) if result is not None
+    ]
+    mapping_df = pd.DataFrame(mapping, columns=columns)
+    mapping_df.to_csv(mapping_path, index=False)
+    logging.info(f"Ingest completed: {len(mapping)} images ingested, {len(tasks) - len(mapping)} failed. "
+                 f"Name mapping saved to {mapping_path}")
+    return mapping_df
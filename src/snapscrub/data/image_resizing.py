@@ -1,15 +1,21 @@
 import os
 import logging
 from PIL import Image, UnidentifiedImageError
+from src.snapscrub.data.reduced_decode import open_reduced
 
-def resize_images(folder_path, output_path, size=(256, 256)):
+def resize_images(folder_path, output_path, size=(256, 256), fast=True):
     """
     Resize images in a folder to the specified size and save them to the output folder.
 
+    With ``fast``, each image is opened once and decoded at reduced scale (see
+    ``open_reduced``), which also detects corrupt files, before the final LANCZOS
+    resize. Without it, images are verified and then decoded at full resolution.
+
     Parameters:
         folder_path (str): Path to the folder containing images to resize.
         output_path (str): Path to the folder to save resized images.
         size (tuple): Desired size for the resized images (width, height).
+        fast (bool): Decode at reduced scale in a single open (default: True).
 
     Returns:
         None
@@ -32,14 +38,18 @@ def resize_images(folder_path, output_path, size=(256, 256)):
         output_file_path = os.path.join(output_path, file_name)
 
         try:
-            with Image.open(file_path) as img:
-                img.verify()  # Verifica se a imagem não está corrompida
-
-            # Reabrir após a verificação para evitar erros ao redimensionar
-            with Image.open(file_path) as img:
-                img = img.convert("RGB")
-                img_resized = img.resize(size, Image.Resampling.LANCZOS)
-                img_resized.save(output_file_path, quality=90)
+            if fast:
+                img = open_reduced(file_path, size).convert("RGB")
+                img.resize(size, Image.Resampling.LANCZOS).save(output_file_path, quality=90)
+            else:
+                with Image.open(file_path) as img:
+                    img.verify()  # Verifica se a imagem não está corrompida
+
+                # Reabrir após a verificação para evitar erros ao redimensionar
+                with Image.open(file_path) as img:
+                    img = img.convert("RGB")
+                    img_resized = img.resize(size, Image.Resampling.LANCZOS)
+                    img_resized.save(output_file_path, quality=90)
 
             logging.info(f"Resized and saved: {output_file_path}")
             resized_count += 1
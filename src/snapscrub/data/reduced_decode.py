@@ -0,0 +1,40 @@
+from PIL import Image
+
+
+def open_reduced(image_path, size, oversample=2):
+    """
+    Decode an image at the smallest scale that still covers a target size.
+
+    JPEG files are decoded with DCT scaling (``draft``), which skips most of the
+    decoding work for large photos; other formats are decoded fully and then shrunk
+    by an integer factor with ``reduce``. The result stays at least ``oversample``
+    times the target size, so the final resample to ``size`` keeps its quality.
+    Corrupt or truncated files raise while decoding, so no separate ``verify()`` pass
+    is needed.
+
+    Parameters:
+        image_path (str): Path to the image file.
+        size (tuple): Final size (width, height).
+        oversample (int): Minimum ratio between the decoded and the final size (default: 2).
+
+    Returns:
+        PIL.Image.Image: The decoded image, in the mode of the file; palette images
+        are converted to RGB (RGBA with transparency) and bilevel images to L when
+        they are reduced.
+    """
+    requested = (size[0] * oversample, size[1] * oversample)
+    with Image.open(image_path) as img:
+        img.draft(img.mode, requested)
+        img.load()
+        factor = min(img.width // requested[0], img.height // requested[1])
+        if factor < 2:
+            return img
+        # Averaging palette indices or bilevel pixels is meaningless (and reduce rejects them)
+        if img.mode in ("P", "PA"):
+            img = img.convert("RGBA" if img.mode == "PA" or "transparency" in img.info else "RGB")
+        elif img.mode == "1":
+            img = img.convert("L")
+        if img.mode.startswith("I;16"):
+            # reduce does not support 16-bit modes; a box resize averages the same pixels
+            return img.resize((img.width // factor, img.height // factor), Image.BOX)
+        return img.reduce(factor)
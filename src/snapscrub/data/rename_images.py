@@ -1,11 +1,16 @@
 import os
 import logging
 import pandas as pd
+from src.snapscrub.utils.capture_time import read_capture_time
 
 def rename_images_in_folder(folder_path, mapping_path):
     """
     Rename images in the specified folder sequentially and save the mapping to a CSV file.
 
+    The mapping also records when each image was taken (``capture_time`` in POSIX
+    seconds, from EXIF DateTimeOriginal or the file modification time, see
+    ``capture_time_source``), so later stages can compare only images taken close together.
+
     Parameters:
         folder_path (str): Path to the folder containing the images.
         mapping_path (str): Path to save the name mapping CSV.
@@ -20,7 +25,7 @@ def rename_images_in_folder(folder_path, mapping_path):
     files = [f for f in os.listdir(folder_path) if f.lower().endswith(('jpg', 'jpeg', 'png', 'bmp', 'tiff'))]
     if not files:
         logging.warning("No image files found in the folder.")
-        return pd.DataFrame(columns=["original_name", "file_name"])
+        return pd.DataFrame(columns=["original_name", "file_name", "capture_time", "capture_time_source"])
 
     files.sort()
     mapping = []
@@ -29,9 +34,11 @@ def rename_images_in_folder(folder_path, mapping_path):
         old_path = os.path.join(folder_path, file_name)
         new_name = f"{idx + 1}{os.path.splitext(file_name)[1]}"
         new_path = os.path.join(folder_path, new_name)
+        capture_time, capture_time_source = read_capture_time(old_path)
         try:
             os.rename(old_path, new_path)
-            mapping.append({"original_name": file_name, "file_name": new_name})
+            mapping.append({"original_name": file_name, "file_name": new_name,
+                            "capture_time": capture_time, "capture_time_source": capture_time_source})
         except Exception as e:
             logging.error(f"Error renaming {file_name}: {e}")
 
@@ -43,4 +50,22 @@ def rename_images_in_folder(folder_path, mapping_path):
         logging.error(f"Error saving name mapping CSV: {e}")
         raise e
 
-    return mapping_df
\ No newline at end of file
+    return mapping_df
+
+def load_capture_times(mapping_path):
+    """
+    Load the capture time of every renamed image from a name mapping CSV.
+
+    Parameters:
+        mapping_path (str): Path of the mapping written by ``rename_images_in_folder``.
+
+    Returns:
+        dict: Mapping of renamed file name to POSIX seconds; empty if the mapping has
+        no capture times.
+    """
+    mapping_df = pd.read_csv(mapping_path)
+    if "capture_time" not in mapping_df.columns:
+        logging.warning(f"No capture times in {mapping_path}.")
+        return {}
+    mapping_df = mapping_df.dropna(subset=["capture_time"])
+    return dict(zip(mapping_df["file_name"], mapping_df["capture_time"].astype(float)))
@@ -1,15 +1,20 @@
 import os
 import logging
 from PIL import Image
+from src.snapscrub.data.reduced_decode import open_reduced
 
-def resize_images(folder_path, output_path, size=(256, 256)):
+def resize_images(folder_path, output_path, size=(256, 256), fast=True):
     """
     Resize images in a folder to the specified size and save them to the output folder.
 
+    With ``fast``, images are decoded at reduced scale (see ``open_reduced``) before
+    the final resize; otherwise they are decoded at full resolution.
+
     Parameters:
         folder_path (str): Path to the folder containing images to resize.
         output_path (str): Path to the folder to save resized images.
         size (tuple): Desired size for the resized images (width, height).
+        fast (bool): Decode at reduced scale (default: True).
 
     Returns:
         None
@@ -38,7 +43,7 @@ def resize_images(folder_path, output_path, size=(256, 256)):
     for file_name in files:
         file_path = os.path.join(folder_path, file_name)
         try:
-            img = Image.open(file_path)
+            img = open_reduced(file_path, size) if fast else Image.open(file_path)
             img_resized = img.resize(size)
             img_resized.save(os.path.join(output_path, file_name))
 
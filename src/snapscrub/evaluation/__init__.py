@@ -1,9 +1,18 @@
-from .similarity import calculate_similarity
-from .sharpness import calculate_sharpness
-from .exposure import calculate_exposure
-from .hash_check import calculate_hash
-from .image_evaluation import evaluate_images_from_folders
-from .duplicate_removal import remove_duplicate_images
-from src.snapscrub.utils.calculate_phash import calculate_phash
-from src.snapscrub.utils.calculate_histogram_similarity import calculate_histogram_similarity
-from src.snapscrub.utils.calculate_structural_similarity import calculate_structural_similarity
\ No newline at end of file
+from src.snapscrub.utils.lazy_imports import lazy_exports
+
+# Names are imported on first access so that importing the package stays cheap
+lazy_exports(__name__, {
+    "calculate_similarity": ".similarity",
+    "calculate_sharpness": ".sharpness",
+    "calculate_exposure": ".exposure",
+    "calculate_hash": ".hash_check",
+    "evaluate_images_from_folders": ".image_evaluation",
+    "remove_duplicate_images": ".duplicate_removal",
+    "calculate_phash": "src.snapscrub.utils.calculate_phash",
+    "calculate_histogram_similarity": "src.snapscrub.utils.calculate_histogram_similarity",
+    "calculate_structural_similarity": "src.snapscrub.utils.calculate_structural_similarity",
+    "find_exact_duplicates": ".exact_duplicates",
+    "remove_exact_duplicates": ".exact_duplicates",
+    "find_embedding_duplicates": ".embedding_duplicates",
+    "load_image_embeddings": ".embedding_duplicates",
+})
@@ -0,0 +1,163 @@
+import os
+import shutil
+import logging
+from src.snapscrub.evaluation.sharpness import calculate_sharpness
+from src.snapscrub.evaluation.exposure import calculate_exposure
+
+
+class UnionFind:
+    """
+    Disjoint-set forest with path halving and union by size.
+
+    Parameters:
+        size (int): Number of elements, identified by 0..size-1.
+    """
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.sizes = [1] * size
+
+    def find(self, item):
+        """
+        Return the representative of the set containing an element.
+        """
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, item1, item2):
+        """
+        Merge the sets containing two elements.
+
+        Returns:
+            bool: True if the elements were in different sets.
+        """
+        root1, root2 = self.find(item1), self.find(item2)
+        if root1 == root2:
+            return False
+        if self.sizes[root1] < self.sizes[root2]:
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.sizes[root1] += self.sizes[root2]
+        return True
+
+    def connected(self, item1, item2):
+        """
+        Check whether two elements belong to the same set.
+        """
+        return self.find(item1) == self.find(item2)
+
+    def clusters(self, min_size=2):
+        """
+        Return the sets with at least ``min_size`` elements.
+
+        Returns:
+            list: Sorted lists of element indices, ordered by their smallest element.
+        """
+        groups = {}
+        for item in range(len(self.parent)):
+            groups.setdefault(self.find(item), []).append(item)
+        return sorted((group for group in groups.values() if len(group) >= min_size), key=lambda group: group[0])
+
+
+def group_duplicates(num_items, edges):
+    """
+    Group items into duplicate clusters from a list of matching pairs.
+
+    Parameters:
+        num_items (int): Number of items.
+        edges (iterable): Index pairs ``(i, j)`` considered duplicates.
+
+    Returns:
+        list: Sorted lists of item indices, one per cluster of two or more items.
+    """
+    union_find = UnionFind(num_items)
+    for i, j in edges:
+        union_find.union(i, j)
+    return union_find.clusters()
+
+
+def quality_score(sharpness, exposure):
+    """
+    Combine sharpness and exposure into the score used to rank duplicates.
+
+    The score is the same as in ``evaluate_images_from_folders``: sharpness minus the
+    distance of the exposure from 0.5.
+
+    Parameters:
+        sharpness (float): Laplacian variance of the image.
+        exposure (float): Mean brightness of the image.
+
+    Returns:
+        float: Quality score (higher is better).
+    """
+    return sharpness - abs(exposure - 0.5)
+
+
+def calculate_quality_score(image_path):
+    """
+    Calculate the quality score used to choose the image kept from a duplicate cluster.
+
+    Parameters:
+        image_path (str): Path to the image.
+
+    Returns:
+        float: Quality score (higher is better).
+    """
+    return quality_score(calculate_sharpness(image_path), calculate_exposure(image_path))
+
+
+def select_keepers(clusters, image_paths, scores=None):
+    """
+    Pick the highest-quality image of every duplicate cluster.
+
+    Ties are broken by the lowest index, so the result does not depend on listing order.
+
+    Parameters:
+        clusters (list): Lists of image indices.
+        image_paths (list): Image paths, indexed like the clusters.
+        scores (dict): Optional precomputed quality scores by index.
+
+    Returns:
+        list: Index of the kept image for every cluster.
+    """
+    scores = {} if scores is None else scores
+    keepers = []
+    for cluster in clusters:
+        for idx in cluster:
+            if idx not in scores:
+                scores[idx] = calculate_quality_score(image_paths[idx])
+        keepers.append(max(cluster, key=lambda idx: (scores[idx], -idx)))
+    return keepers
+
+
+def move_duplicates(clusters, keepers, image_paths, cleaned_folder):
+    """
+    Move every image of each cluster except its keeper to the cleaned folder.
+
+    Parameters:
+        clusters (list): Lists of image indices.
+        keepers (list): Kept image index for every cluster.
+        image_paths (list): Image paths, indexed like the clusters.
+        cleaned_folder (str): Folder to move duplicate images.
+
+    Returns:
+        list: File names of the moved images.
+    """
+    os.makedirs(cleaned_folder, exist_ok=True)
+    removed_images = []
+
+    for cluster, keeper in zip(clusters, keepers):
+        for idx in cluster:
+            if idx == keeper:
+                continue
+            file_name = os.path.basename(image_paths[idx])
+            try:
+                shutil.move(image_paths[idx], os.path.join(cleaned_folder, file_name))
+                removed_images.append(file_name)
+            except FileNotFoundError:
+                logging.warning(f"File not found while moving: {image_paths[idx]}")
+
+    return removed_images
@@ -1,20 +1,90 @@
 import os
-import shutil
 import logging
-import imagehash
+import numpy as np
 from itertools import combinations
-from src.snapscrub.utils.calculate_phash import calculate_phash
-from src.snapscrub.utils.calculate_histogram_similarity import calculate_histogram_similarity
-from src.snapscrub.utils.calculate_structural_similarity import calculate_structural_similarity
+from src.snapscrub.utils.feature_cache import CachedGrays, FeatureCache
+from src.snapscrub.utils.hash_index import find_similar_hash_pairs
+from src.snapscrub.utils.hamming_distance import pack_hashes, popcount64, find_hash_pairs_within
+from src.snapscrub.utils.capture_time import read_capture_time, find_time_window_pairs
+from src.snapscrub.utils.histogram_matrix import (
+    build_histogram_matrix, prepare_correlation_matrix, histogram_correlation_pairs, find_histogram_pairs_above
+)
+from src.snapscrub.utils.batched_ssim import BatchedSSIM, score_ssim_pairs
+from src.snapscrub.evaluation.duplicate_grouping import UnionFind, quality_score, select_keepers, move_duplicates
+from src.snapscrub.evaluation.exact_duplicates import remove_exact_duplicates
+from src.snapscrub.evaluation.embedding_duplicates import find_embedding_duplicates
 
-def remove_duplicate_images(folder_path, cleaned_folder, threshold=0.90):
+def remove_duplicate_images(folder_path, cleaned_folder, threshold=0.90, max_hash_distance=None,
+                            cache_bytes=512 * 1024 * 1024, index="matrix", ssim_batch_size=64,
+                            ssim_prescreen_scale=None, exact_prepass=True, workers=None, chunk_size=64,
+                            feature_store=None, embedding_threshold=None, embedding_model="MobileNetV3",
+                            embedding_framework="tensorflow", embedding_store=None, time_window=None,
+                            capture_times=None):
     """
     Identify and move duplicate images based on multiple similarity measures (pHash, Histogram, SSIM).
 
+    Byte-identical files are removed first by size and content hash, without decoding
+    any pixels (``exact_prepass``). Pairs matching on any measure are then merged into
+    duplicate clusters with union-find. The cascade runs from cheap to expensive: all
+    pHash and histogram matches are merged first, and SSIM is only computed for pairs
+    whose images are still in different clusters. In each cluster the image with the best sharpness/exposure
+    score is kept and the others are moved in one step at the end, so the result does
+    not depend on the folder listing order.
+
+    By default every pair of images is a candidate. When ``max_hash_distance`` is set,
+    candidate pairs are generated from the pHash values and only pairs whose hashes
+    differ by at most that many bits (or by the pHash threshold distance, whichever is
+    larger) go through the histogram and SSIM checks. The clusters are identical to the
+    all-pairs path whenever all histogram/SSIM matches lie within the chosen distance.
+
+    Each image is decoded once into a per-run ``FeatureCache`` holding its pHash,
+    histogram and grayscale array. pHash matches are found on packed uint64 hashes,
+    histogram correlations on a mean-centered (N, 256) matrix, and SSIM scores by a
+    batched engine for ``ssim_batch_size`` pairs at a time. With ``workers`` set, the
+    features (including the sharpness/exposure used to pick keepers) are extracted up
+    front by a process pool in chunks of ``chunk_size`` images.
+
+    With ``embedding_threshold`` set, a last stage also merges pairs whose pooled CNN
+    features (``embedding_model``) have at least that cosine similarity, found with an
+    LSH index. This catches burst shots with slight reframing that the pixel-based
+    measures miss; the merged clusters are handled like all others.
+
+    With ``time_window`` set, only images taken at most that many seconds apart are
+    compared by any measure, which reduces the comparisons from O(n^2) to O(n * w) for
+    w images per window. Capture times come from ``capture_times`` (see
+    ``load_capture_times``) or are read from the files (EXIF DateTimeOriginal, else the
+    modification time). Combined with ``max_hash_distance``, pairs must satisfy both.
+
     Parameters:
         folder_path (str): Path to the folder containing images.
         cleaned_folder (str): Folder to move duplicate images.
         threshold (float): Similarity threshold (default: 0.90).
+        max_hash_distance (int): Hamming distance (in bits) for indexed candidate
+            generation. If None, all pairs are compared (default: None).
+        cache_bytes (int): Memory budget for cached grayscale arrays, and separately for
+            the per-image SSIM statistics (default: 512 MB).
+        index (str): Candidate generator when ``max_hash_distance`` is set: 'matrix'
+            (blocked XOR/popcount over packed hashes) or 'bktree' (default: 'matrix').
+        ssim_batch_size (int): Number of pairs scored per SSIM batch (default: 64).
+        ssim_prescreen_scale (int): Optional downscale factor for an approximate SSIM
+            pre-screen; pairs clearly below the threshold skip the exact score. Raises
+            ValueError if the downscaled images are smaller than the SSIM window (default: None).
+        exact_prepass (bool): Remove byte-identical files before the perceptual checks (default: True).
+        workers (int): Number of processes for feature extraction; None or 1 extracts
+            features lazily in this process (default: None).
+        chunk_size (int): Number of images per feature extraction task (default: 64).
+        feature_store (FeatureStore): Optional persistent store; images with stored
+            features are only decoded if they reach the SSIM stage (default: None).
+        embedding_threshold (float): Cosine similarity of CNN embeddings above which images
+            are duplicates; None disables the embedding stage (default: None).
+        embedding_model (str): Feature extractor of the embedding stage (default: 'MobileNetV3').
+        embedding_framework (str): Framework of ``embedding_model`` (default: 'tensorflow').
+        embedding_store (EmbeddingStore): Optional store of model embeddings, so images
+            embedded in earlier runs are not run through the model again (default: None).
+        time_window (float): Maximum capture time difference in seconds of compared
+            images; None compares images regardless of time (default: None).
+        capture_times (dict): Optional capture time (POSIX seconds) per file name; images
+            missing from it are read from the file (default: None).
 
     Returns:
         list: A list of removed images.
@@ -24,71 +94,209 @@ def remove_duplicate_images(folder_path, cleaned_folder, threshold=0.90):
     if not os.path.exists(cleaned_folder):
         os.makedirs(cleaned_folder)
 
-    images = [f for f in os.listdir(folder_path) if f.lower().endswith(('jpg', 'jpeg', 'png', 'bmp', 'tiff'))]
-    removed_images = []
-    checked_pairs = set()
-    hashes = {}
+    exact_removed = remove_exact_duplicates(folder_path, cleaned_folder) if exact_prepass else []
 
-    for img1, img2 in combinations(images, 2):
-        pair = tuple(sorted([img1, img2]))
-        if pair in checked_pairs:
-            continue
+    images = sorted(f for f in os.listdir(folder_path) if f.lower().endswith(('jpg', 'jpeg', 'png', 'bmp', 'tiff')))
+    paths = [os.path.join(folder_path, img) for img in images]
+    cache = FeatureCache(max_bytes=cache_bytes, store=feature_store)
+    if workers and workers > 1:
+        cache.prefetch(paths, workers=workers, chunk_size=chunk_size)
+    union_find = UnionFind(len(images))
 
-        path1 = os.path.join(folder_path, img1)
-        path2 = os.path.join(folder_path, img2)
+    # One SSIM engine per run, so per-image SSIM statistics are shared by all batches
+    grays = CachedGrays(paths, cache)
+    ssim_engine = BatchedSSIM(grays, max_bytes=cache_bytes)
+    prescreen_engine = BatchedSSIM(grays, downscale=ssim_prescreen_scale) if ssim_prescreen_scale else None
 
-        # Verificar se os arquivos ainda existem antes de processá-los
-        if not os.path.exists(path1) or not os.path.exists(path2):
-            logging.warning(f"Skipping non-existing file: {path1} or {path2}")
-            continue
+    hash_values = [cache.phash(path) for path in paths]
+    packed, valid = pack_hashes(hash_values)
+    hash_length = 16
+    # pHash similarity is defined as 1 - distance / len(hash), with len(hash) in hex characters
+    phash_distance = int((1 - threshold) * hash_length)
 
-        # Compute Perceptual Hash (pHash) only once per image
-        if img1 not in hashes:
-            hashes[img1] = calculate_phash(path1)
-        if img2 not in hashes:
-            hashes[img2] = calculate_phash(path2)
+    window_pairs = None
+    if time_window is not None:
+        window_pairs = find_time_window_pairs(_capture_times(images, paths, capture_times), time_window)
 
-        hash1 = hashes[img1]
-        hash2 = hashes[img2]
+    # Stage 1: pHash matches on the packed hashes
+    if window_pairs is None:
+        rows, cols, distances = find_hash_pairs_within(packed, phash_distance, valid)
+    else:
+        rows, cols = window_pairs
+        distances = popcount64(np.bitwise_xor(packed[rows], packed[cols]))
+        within = (distances <= phash_distance) & valid[rows] & valid[cols]
+        rows, cols, distances = rows[within], cols[within], distances[within]
+    phash_edges = 0
+    for i, j, distance in zip(rows.tolist(), cols.tolist(), distances.tolist()):
+        if 1 - distance / hash_length >= threshold:
+            union_find.union(i, j)
+            phash_edges += 1
 
-        if hash1 and hash2:
-            try:
-                hash_similarity = 1 - (imagehash.hex_to_hash(hash1) - imagehash.hex_to_hash(hash2)) / len(hash1)
-            except Exception as e:
-                logging.error(f"Error comparing pHash for {img1} and {img2}: {e}")
-                continue
+    # Stage 2: histogram matches on the histogram matrix
+    histograms, hist_valid = build_histogram_matrix([cache.histogram(path) for path in paths])
+    prepared, flat = prepare_correlation_matrix(histograms)
+
+    if max_hash_distance is None and window_pairs is None:
+        candidates = None
+        rows, cols, _ = find_histogram_pairs_above(prepared, flat, threshold, hist_valid)
+    else:
+        if window_pairs is None:
+            candidates = _indexed_candidate_pairs(hash_values, packed, valid, max(max_hash_distance, phash_distance), index)
+        else:
+            window_rows, window_cols = window_pairs
+            if max_hash_distance is not None:
+                # Filter the window pairs directly instead of searching the whole corpus;
+                # images without a hash stay candidates, as in _indexed_candidate_pairs
+                radius = max(max_hash_distance, phash_distance)
+                near = popcount64(np.bitwise_xor(packed[window_rows], packed[window_cols])) <= radius
+                keep = near | ~valid[window_rows] | ~valid[window_cols]
+                window_rows, window_cols = window_rows[keep], window_cols[keep]
+            candidates = list(zip(window_rows.tolist(), window_cols.tolist()))
+        rows = np.array([i for i, _ in candidates], dtype=np.int64)
+        cols = np.array([j for _, j in candidates], dtype=np.int64)
+        similarities = histogram_correlation_pairs(prepared, flat, rows, cols)
+        above = (similarities >= threshold) & hist_valid[rows] & hist_valid[cols]
+        rows, cols = rows[above], cols[above]
+
+    for i, j in zip(rows.tolist(), cols.tolist()):
+        union_find.union(i, j)
+    hist_edges = len(rows)
 
-            if hash_similarity >= threshold:
-                logging.info(f"Duplicate found: {img1} and {img2} (pHash similarity: {hash_similarity:.2f})")
-                try:
-                    shutil.move(path2, os.path.join(cleaned_folder, img2))
-                    removed_images.append(img2)
-                except FileNotFoundError:
-                    logging.warning(f"File not found while moving: {path2}")
+    # Stage 3: SSIM only for candidate pairs not already in the same cluster
+    pairs = combinations(range(len(images)), 2) if candidates is None else iter(candidates)
+    pending = ((i, j) for i, j in pairs if hist_valid[i] and hist_valid[j])
+    ssim_pairs = 0
+    ssim_edges = 0
+
+    while True:
+        batch = []
+        for i, j in pending:
+            # Earlier batches may have merged these clusters in the meantime
+            if union_find.connected(i, j):
                 continue
+            batch.append((i, j))
+            if len(batch) >= ssim_batch_size:
+                break
+        if not batch:
+            break
 
-        # Compute Histogram Similarity
-        hist_similarity = calculate_histogram_similarity(path1, path2)
-        if hist_similarity >= threshold:
-            logging.info(f"Duplicate found: {img1} and {img2} (Histogram similarity: {hist_similarity:.2f})")
-            try:
-                shutil.move(path2, os.path.join(cleaned_folder, img2))
-                removed_images.append(img2)
-            except FileNotFoundError:
-                logging.warning(f"File not found while moving: {path2}")
-            continue
+        ssim_pairs += len(batch)
+        for (i, j), ssim_score in _score_ssim_batch(batch, paths, cache, threshold, ssim_engine,
+                                                         prescreen_engine).items():
+            if ssim_score >= threshold:
+                union_find.union(i, j)
+                ssim_edges += 1
+
+    # Stage 4: embedding matches, for reframed shots the pixel measures miss
+    embedding_edges = 0
+    if embedding_threshold is not None:
+        rows, cols, _ = find_embedding_duplicates(paths, embedding_threshold, embedding_model, embedding_framework,
+                                                  embedding_store, feature_store=feature_store)
+        if window_pairs is not None:
+            in_window = set(zip(*(pairs.tolist() for pairs in window_pairs)))
+        for i, j in zip(rows.tolist(), cols.tolist()):
+            if window_pairs is None or (i, j) in in_window:
+                embedding_edges += union_find.union(i, j)
+
+    logging.info(f"Duplicate edges: {phash_edges} pHash, {hist_edges} histogram, "
+                 f"{ssim_edges} SSIM ({ssim_pairs} SSIM pairs scored), {embedding_edges} embedding.")
+
+    # Keep the best image of each cluster and move the rest in one step
+    clusters = union_find.clusters()
+    scores = {}
+    for cluster in clusters:
+        for idx in cluster:
+            sharpness, exposure = cache.quality(paths[idx])
+            # Unreadable images score like calculate_quality_score does for them
+            scores[idx] = quality_score(sharpness or 0.0, exposure or 0.0)
+    keepers = select_keepers(clusters, paths, scores)
+    for cluster, keeper in zip(clusters, keepers):
+        duplicates = [images[idx] for idx in cluster if idx != keeper]
+        logging.info(f"Duplicate cluster: keeping {images[keeper]}, removing {duplicates}")
+    removed_images = exact_removed + move_duplicates(clusters, keepers, paths, cleaned_folder)
 
-        # Compute SSIM (Structural Similarity Index)
-        ssim_score = calculate_structural_similarity(path1, path2)
-        if ssim_score >= threshold:
-            logging.info(f"Duplicate found: {img1} and {img2} (SSIM similarity: {ssim_score:.2f})")
-            try:
-                shutil.move(path2, os.path.join(cleaned_folder, img2))
-                removed_images.append(img2)
-            except FileNotFoundError:
-                logging.warning(f"File not found while moving: {path2}")
+    logging.info(f"Duplicate detection completed. {len(removed_images)} images removed "
+                 f"from {len(clusters)} clusters ({cache.decode_count} decodes for {len(images)} images).")
+    return removed_images
+
+
+def _capture_times(images, paths, capture_times=None):
+    """
+    Return the capture time of every image, from ``capture_times`` or from the file itself.
+    """
+    capture_times = capture_times or {}
+    times = []
+    for image, path in zip(images, paths):
+        if image in capture_times:
+            times.append(capture_times[image])
+        else:
+            times.append(read_capture_time(path)[0])
+    return times
 
-        checked_pairs.add(pair)
 
-    logging.info(f"Duplicate detection completed. {len(removed_images)} images removed.")
-    return removed_images
\ No newline at end of file
+def _score_ssim_batch(batch, paths, cache, threshold, engine, prescreen_engine=None):
+    """
+    Score a batch of index pairs with the batched SSIM engine.
+
+    Parameters:
+        batch (list): Index pairs ``(i, j)`` to score.
+        paths (list): Image paths, indexed like the pairs.
+        cache (FeatureCache): Per-run feature cache providing grayscale arrays.
+        threshold (float): Duplicate threshold (used by the optional pre-screen).
+        engine (BatchedSSIM): Engine over the grayscale arrays of all images.
+        prescreen_engine (BatchedSSIM): Optional downscaled engine for approximate pre-screening.
+
+    Returns:
+        dict: Mapping of index pair to SSIM score (0.0 for unreadable images).
+    """
+    used = sorted({idx for pair in batch for idx in pair})
+    readable = {idx for idx in used if cache.gray(paths[idx]) is not None}
+
+    scorable = [pair for pair in batch if pair[0] in readable and pair[1] in readable]
+    scores = {pair: 0.0 for pair in batch}
+    if scorable:
+        values = score_ssim_pairs(
+            engine,
+            [a for a, _ in scorable],
+            [b for _, b in scorable],
+            prescreen_engine=prescreen_engine,
+            prescreen_threshold=threshold if prescreen_engine is not None else None,
+        )
+        scores.update(zip(scorable, values.tolist()))
+    return scores
+
+
+def _indexed_candidate_pairs(hash_values, packed, valid, radius, index="matrix"):
+    """
+    Generate candidate pairs whose pHash values lie within a Hamming radius.
+
+    Parameters:
+        hash_values (list): Hex-encoded pHash per image (None if unreadable).
+        packed (np.ndarray): The same hashes packed as uint64.
+        valid (np.ndarray): Boolean mask of usable hashes.
+        radius (int): Maximum Hamming distance (in bits) for a candidate pair.
+        index (str): 'matrix' or 'bktree'.
+
+    Returns:
+        list: Candidate index pairs ``(i, j)`` with ``i < j``, sorted.
+    """
+    if index == "bktree":
+        index_pairs = set(find_similar_hash_pairs([h if ok else None for h, ok in zip(hash_values, valid)], radius))
+    elif index == "matrix":
+        rows, cols, _ = find_hash_pairs_within(packed, radius, valid)
+        index_pairs = set(zip(rows.tolist(), cols.tolist()))
+    else:
+        raise ValueError("Unsupported index. Choose 'matrix' or 'bktree'.")
+
+    # Images without a hash cannot be indexed; compare them against everything
+    num_images = len(hash_values)
+    for idx in range(num_images):
+        if valid[idx]:
+            continue
+        for other_idx in range(num_images):
+            if other_idx != idx:
+                index_pairs.add((min(idx, other_idx), max(idx, other_idx)))
+
+    logging.info(f"Indexed candidate generation ({index}): {len(index_pairs)} pairs "
+                 f"(radius {radius}) instead of {num_images * (num_images - 1) // 2}.")
+    return sorted(index_pairs)
@@ -0,0 +1,109 @@
+import os
+import logging
+import numpy as np
+from src.snapscrub.utils.embedding_index import find_embedding_pairs_above
+from src.snapscrub.models.get_model_map import get_model_map, model_score_version, MODEL_NAMES, SHARED_DECODE
+from src.snapscrub.models.shared_preprocessing import evaluate_shared_batches
+from src.snapscrub.utils.content_hash import calculate_content_hash
+
+
+def load_image_embeddings(image_paths, model_name="MobileNetV3", framework="tensorflow", embedding_store=None,
+                          batch_size=32, num_workers=2, feature_store=None):
+    """
+    Return the pooled CNN features of every image as one matrix.
+
+    Embeddings already in ``embedding_store`` are reused; the others are computed with
+    batched inference on the shared decode (see ``evaluate_shared_batches``) and added
+    to the store, and their scores to ``feature_store``, under the same version as
+    ``predict_and_generate_logs``. The scoring stage and streaming ingest therefore
+    reuse these embeddings, and this function reuses theirs. Stored embeddings are
+    keyed by the content hash of the image, not its file name: file names are
+    positional IDs that shift when source photos are added or removed.
+
+    Parameters:
+        image_paths (list): Paths to the image files.
+        model_name (str): Feature extractor (default: 'MobileNetV3').
+        framework (str): Framework of the model (default: 'tensorflow').
+        embedding_store (EmbeddingStore): Optional store of model embeddings (default: None).
+        batch_size (int): Number of images per forward pass (default: 32).
+        num_workers (int): Decoding threads (default: 2).
+        feature_store (FeatureStore): Optional store whose cached content hashes avoid
+            reading unchanged files again, and which receives the model scores (default: None).
+
+    Returns:
+        tuple: ``(embeddings, valid)`` with a float32 array of shape (N, D) and a boolean
+        mask of the images that could be embedded.
+    """
+    if model_name not in MODEL_NAMES.get(framework, []):
+        raise ValueError(f"Model {model_name} is not a {framework} model.")
+
+    vectors = dict.fromkeys(image_paths)
+    # Embeddings come from the shared decode of the scoring stage, so either stage reuses the other's work
+    version = model_score_version(framework, SHARED_DECODE)
+    content_hashes = None
+    if feature_store is not None:
+        content_hashes = dict(zip(image_paths, feature_store.content_hashes(image_paths)))
+    elif embedding_store is not None:
+        content_hashes = {path: calculate_content_hash(path) for path in image_paths}
+    if embedding_store is not None:
+        hashed = [path for path in image_paths if content_hashes[path] is not None]
+        stored = embedding_store.get(version, model_name, [content_hashes[path] for path in hashed])
+        vectors.update(zip(hashed, stored))
+
+    missing = [path for path in image_paths if vectors[path] is None]
+    if missing:
+        logging.info(f"Computing {model_name} embeddings for {len(missing)} images...")
+        computed = {}
+        scores = evaluate_shared_batches(missing, {framework: get_model_map(framework, [model_name])}, batch_size,
+                                         num_workers, embeddings=computed)[framework]
+        computed = computed.get(framework, {}).get(model_name, {})
+        vectors.update(computed)
+        hashed = [path for path in computed if content_hashes is not None and content_hashes[path] is not None]
+        if embedding_store is not None:
+            embedding_store.put(version, model_name, [content_hashes[path] for path in hashed],
+                                [computed[path] for path in hashed],
+                                file_names=[os.path.basename(path) for path in hashed])
+        if feature_store is not None:
+            # The score is the embedding norm, so the scoring stage does not run this model again
+            feature_store.put_scores([content_hashes[path] for path in hashed], model_name, version,
+                                     [scores[path][model_name] for path in hashed])
+
+    dim = next((len(vector) for vector in vectors.values() if vector is not None), 0)
+    embeddings = np.zeros((len(image_paths), dim), dtype=np.float32)
+    valid = np.zeros(len(image_paths), dtype=bool)
+    for idx, path in enumerate(image_paths):
+        if vectors[path] is not None:
+            embeddings[idx] = vectors[path]
+            valid[idx] = True
+    return embeddings, valid
+
+
+def find_embedding_duplicates(image_paths, threshold=0.95, model_name="MobileNetV3", framework="tensorflow",
+                              embedding_store=None, num_tables=16, num_bits=8, batch_size=32, num_workers=2,
+                              feature_store=None):
+    """
+    Find near-duplicate image pairs by the cosine similarity of their CNN embeddings.
+
+    Unlike pHash, histograms and SSIM, pooled CNN features are largely insensitive to
+    small shifts and reframing, so burst shots of the same scene match. Pairs are found
+    with a random-hyperplane LSH index (see ``find_embedding_pairs_above``) instead of
+    comparing all pairs.
+
+    Parameters:
+        image_paths (list): Paths to the image files.
+        threshold (float): Minimum cosine similarity (default: 0.95).
+        model_name (str): Feature extractor (default: 'MobileNetV3').
+        framework (str): Framework of the model (default: 'tensorflow').
+        embedding_store (EmbeddingStore): Optional store of model embeddings (default: None).
+        num_tables (int): Number of LSH tables (default: 16).
+        num_bits (int): Hyperplanes per LSH table (default: 8).
+        batch_size (int): Number of images per forward pass (default: 32).
+        num_workers (int): Decoding threads (default: 2).
+        feature_store (FeatureStore): Optional store of cached content hashes and model scores (default: None).
+
+    Returns:
+        tuple: Arrays ``(rows, cols, similarities)`` of image indices with ``rows < cols``.
+    """
+    embeddings, valid = load_image_embeddings(image_paths, model_name, framework, embedding_store,
+                                              batch_size, num_workers, feature_store)
+    return find_embedding_pairs_above(embeddings, threshold, valid, num_tables, num_bits)
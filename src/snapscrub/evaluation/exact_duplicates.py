@@ -0,0 +1,36 @@
+import os
+import shutil
+import logging
+from src.snapscrub.utils.content_hash import find_exact_duplicates
+
+def remove_exact_duplicates(folder_path, cleaned_folder):
+    """
+    Move byte-identical copies of images to the cleaned folder, keeping the first name of each group.
+
+    Parameters:
+        folder_path (str): Path to the folder containing images.
+        cleaned_folder (str): Folder to move duplicate images.
+
+    Returns:
+        list: A list of removed images.
+    """
+    os.makedirs(cleaned_folder, exist_ok=True)
+
+    images = [
+        os.path.join(folder_path, f) for f in os.listdir(folder_path)
+        if f.lower().endswith(('jpg', 'jpeg', 'png', 'bmp', 'tiff'))
+    ]
+    removed_images = []
+
+    for group in find_exact_duplicates(images):
+        for file_path in group[1:]:
+            file_name = os.path.basename(file_path)
+            try:
+                shutil.move(file_path, os.path.join(cleaned_folder, file_name))
+                removed_images.append(file_name)
+            except FileNotFoundError:
+                logging.warning(f"File not found while moving: {file_path}")
+        logging.info(f"Exact duplicates of {os.path.basename(group[0])}: {[os.path.basename(p) for p in group[1:]]}")
+
+    logging.info(f"Exact duplicate pre-pass completed. {len(removed_images)} images removed.")
+    return removed_images
\ No newline at end of file
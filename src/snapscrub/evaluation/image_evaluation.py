@@ -1,13 +1,14 @@
 import os
 import shutil
 import logging
+import numpy as np
 import pandas as pd
-from itertools import combinations
-from src.snapscrub.evaluation.similarity import calculate_similarity
-from src.snapscrub.evaluation.sharpness import calculate_sharpness
-from src.snapscrub.evaluation.exposure import calculate_exposure
+from src.snapscrub.utils.batched_ssim import BatchedSSIM, find_ssim_pairs_above
+from src.snapscrub.utils.capture_time import read_capture_time, find_time_window_pairs
+from src.snapscrub.utils.feature_cache import CachedGrays, FeatureCache
 
-def evaluate_images_from_folders(resized_folder, cleaned_folder, output_csv, criteria):
+def evaluate_images_from_folders(resized_folder, cleaned_folder, output_csv, criteria, workers=None,
+                                 time_window=None, capture_times=None, cache_bytes=512 * 1024 * 1024):
     """
     Evaluate images based on similarity, sharpness, and exposure, and move rejected images.
 
@@ -16,6 +17,14 @@ def evaluate_images_from_folders(resized_folder, cleaned_folder, output_csv, cri
         cleaned_folder (str): Path to the folder to move rejected images.
         output_csv (str): Path to save the evaluation report CSV.
         criteria (dict): Dictionary with evaluation thresholds.
+        workers (int): Number of processes used to decode the images and compute their
+            sharpness and exposure; None or 1 runs serially (default: None).
+        time_window (float): Only compare images taken at most this many seconds apart;
+            None compares all pairs (default: None).
+        capture_times (dict): Optional capture time (POSIX seconds) per file name, e.g.
+            from ``load_capture_times``; other images are read from the file (default: None).
+        cache_bytes (int): Memory budget for the grayscale arrays and SSIM statistics kept
+            in memory; images beyond it are decoded again when needed (default: 512 MB).
 
     Returns:
         pd.DataFrame: DataFrame containing log of moved images.
@@ -32,31 +41,49 @@ def evaluate_images_from_folders(resized_folder, cleaned_folder, output_csv, cri
 
     # Step 1: Detect duplicates using SSIM
     logging.info("Step 1: Detecting duplicates with SSIM...")
-    checked_pairs = set()
     duplicates_groups = {}
 
-    for img1, img2 in combinations(image_files, 2):
-        pair = tuple(sorted([img1, img2]))
-        if pair in checked_pairs:
+    # Decode every image once for SSIM, sharpness and exposure; only the grayscale
+    # arrays within the cache budget stay in memory
+    paths = [image_paths[img] for img in image_files]
+    cache = FeatureCache(max_bytes=cache_bytes)
+    if workers and workers > 1:
+        cache.prefetch(paths, workers=workers)
+    qualities = [cache.quality(path) for path in paths]
+    valid = np.array([quality[0] is not None for quality in qualities], dtype=bool)
+    # Unreadable images score zero, so they are rejected like before
+    sharpness = {img: quality[0] or 0.0 for img, quality in zip(image_files, qualities)}
+    exposure = {img: quality[1] or 0.0 for img, quality in zip(image_files, qualities)}
+    grays = CachedGrays(paths, cache)
+
+    if time_window is None:
+        rows, cols, scores = find_ssim_pairs_above(grays, criteria["similarity_threshold"], valid,
+                                                   max_bytes=cache_bytes)
+    else:
+        capture_times = capture_times or {}
+        times = [capture_times[img] if img in capture_times else read_capture_time(image_paths[img])[0]
+                 for img in image_files]
+        rows, cols = find_time_window_pairs(times, time_window)
+        usable = valid[rows] & valid[cols]
+        rows, cols = rows[usable], cols[usable]
+        scores = BatchedSSIM(grays, max_bytes=cache_bytes).score(rows, cols)
+    for i, j, sim_score in zip(rows.tolist(), cols.tolist(), scores.tolist()):
+        if sim_score <= criteria["similarity_threshold"]:
             continue
-
-        sim_score = calculate_similarity(image_paths[img1], image_paths[img2])
-        if sim_score > criteria["similarity_threshold"]:
-            if pair[0] not in duplicates_groups:
-                duplicates_groups[pair[0]] = [pair[1]]
-            else:
-                duplicates_groups[pair[0]].append(pair[1])
-
-        checked_pairs.add(pair)
+        pair = tuple(sorted([image_files[i], image_files[j]]))
+        if pair[0] not in duplicates_groups:
+            duplicates_groups[pair[0]] = [pair[1]]
+        else:
+            duplicates_groups[pair[0]].append(pair[1])
 
     # Evaluate duplicates and move lower-quality images
     for main_image, duplicates in duplicates_groups.items():
         best_image = main_image
-        best_score = calculate_sharpness(image_paths[main_image]) - abs(calculate_exposure(image_paths[main_image]) - 0.5)
+        best_score = sharpness[main_image] - abs(exposure[main_image] - 0.5)
 
         for image_name in duplicates:
-            sharpness_score = calculate_sharpness(image_paths[image_name])
-            exposure_score = calculate_exposure(image_paths[image_name])
+            sharpness_score = sharpness[image_name]
+            exposure_score = exposure[image_name]
             total_score = sharpness_score - abs(exposure_score - 0.5)
 
             if total_score > best_score:
@@ -75,7 +102,7 @@ def evaluate_images_from_folders(resized_folder, cleaned_folder, output_csv, cri
     remaining_files = [f for f in image_files if f not in duplicates_groups]
 
     for image_name in remaining_files:
-        sharpness_score = calculate_sharpness(image_paths[image_name])
+        sharpness_score = sharpness[image_name]
         if sharpness_score < criteria["sharpness_threshold"]:
             shutil.move(image_paths[image_name], os.path.join(cleaned_folder, image_name))
             logging.info(f"Moved: {image_name} due to low sharpness")
@@ -83,7 +110,7 @@ def evaluate_images_from_folders(resized_folder, cleaned_folder, output_csv, cri
 
     # Exposure evaluation
     for image_name in remaining_files:
-        exposure_score = calculate_exposure(image_paths[image_name])
+        exposure_score = exposure[image_name]
         if abs(exposure_score - 0.5) > criteria["exposure_tolerance"]:
             shutil.move(image_paths[image_name], os.path.join(cleaned_folder, image_name))
             logging.info(f"Moved: {image_name} due to poor exposure")
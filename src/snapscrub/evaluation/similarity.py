@@ -1,6 +1,7 @@
 import logging
 import cv2
-from skimage.metrics import structural_similarity as ssim
+import numpy as np
+from src.snapscrub.utils.batched_ssim import calculate_ssim_pairs
 
 def calculate_similarity(image1_path, image2_path):
     """
@@ -21,8 +22,7 @@ def calculate_similarity(image1_path, image2_path):
             return 0.0
         image1 = cv2.resize(image1, (256, 256))
         image2 = cv2.resize(image2, (256, 256))
-        score, _ = ssim(image1, image2, full=True)
-        return score
+        return float(calculate_ssim_pairs(np.stack([image1, image2]), [0], [1])[0])
     except Exception as e:
         logging.error(f"Error calculating similarity: {e}")
         return 0.0
\ No newline at end of file
@@ -1,3 +1,19 @@
-from .get_model_map import get_model_map
-from .evaluate_image_models import evaluate_image_models
-from .predict_and_generate_log import predict_and_generate_log
\ No newline at end of file
+from src.snapscrub.utils.lazy_imports import lazy_exports
+
+# Names are imported on first access so that importing the package stays cheap
+lazy_exports(__name__, {
+    "get_model_map": ".get_model_map",
+    "warm_up": ".get_model_map",
+    "MODEL_NAMES": ".get_model_map",
+    "model_score_version": ".get_model_map",
+    "native_decode": ".get_model_map",
+    "LazyModelMap": ".model_registry",
+    "ModelCache": ".model_registry",
+    "MODEL_CACHE": ".model_registry",
+    "evaluate_image_models": ".evaluate_image_models",
+    "predict_and_generate_log": ".predict_and_generate_log",
+    "predict_and_generate_logs": ".predict_and_generate_log",
+    "evaluate_image_batches": ".batched_inference",
+    "evaluate_shared_batches": ".shared_preprocessing",
+    "EmbeddingStore": ".embedding_store",
+})
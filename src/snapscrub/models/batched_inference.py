@@ -0,0 +1,183 @@
+import os
+import logging
+import numpy as np
+from PIL import Image
+from src.snapscrub.models.onnx_backend import ONNX_FRAMEWORKS
+from src.snapscrub.models.shared_preprocessing import evaluate_shared_batches, keep_embeddings
+from src.snapscrub.models.torch_optimization import PYTORCH_FRAMEWORKS
+
+IMAGE_SIZE = (224, 224)
+
+
+def _load_tensorflow_image(image_path):
+    """
+    Load an image the same way as ``evaluate_image_models`` (Keras ``load_img`` at 224x224).
+
+    Returns a zero image and a False flag instead of raising, so one bad file does not
+    stop the whole ``tf.data`` pipeline.
+    """
+    from tensorflow.keras.preprocessing import image
+
+    try:
+        img = image.load_img(image_path.decode(), target_size=IMAGE_SIZE)
+        return image.img_to_array(img).astype(np.float32), np.bool_(True)
+    except Exception as e:
+        logging.error(f"Error processing image {image_path.decode()}: {e}")
+        return np.zeros((*IMAGE_SIZE, 3), dtype=np.float32), np.bool_(False)
+
+
+def _tensorflow_dataset(image_paths, batch_size):
+    """
+    Build a ``tf.data`` pipeline that decodes images in parallel and batches them.
+    """
+    import tensorflow as tf
+
+    def load(path):
+        array, ok = tf.numpy_function(_load_tensorflow_image, [path], [tf.float32, tf.bool])
+        array.set_shape((*IMAGE_SIZE, 3))
+        ok.set_shape(())
+        return array, ok
+
+    return (
+        tf.data.Dataset.from_tensor_slices(image_paths)
+        .map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=True)
+        .batch(batch_size)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+
+
+class _PyTorchImageDataset:
+    """
+    Map-style dataset of preprocessed images; unreadable images yield None and are dropped when collating.
+    """
+
+    def __init__(self, image_paths, preprocess):
+        self.image_paths = image_paths
+        self.preprocess = preprocess
+
+    def __len__(self):
+        return len(self.image_paths)
+
+    def __getitem__(self, idx):
+        try:
+            img = Image.open(self.image_paths[idx]).convert("RGB")
+            return idx, self.preprocess(img)
+        except Exception as e:
+            logging.error(f"Error processing image {self.image_paths[idx]}: {e}")
+            return idx, None
+
+
+def _collate_valid(items):
+    """
+    Stack the readable images of a batch and return their indices.
+    """
+    import torch
+
+    items = [(idx, tensor) for idx, tensor in items if tensor is not None]
+    if not items:
+        return torch.empty(0, dtype=torch.long), None
+    indices, tensors = zip(*items)
+    return torch.tensor(indices, dtype=torch.long), torch.stack(tensors)
+
+
+def _evaluate_tensorflow_batches(image_paths, model_map, batch_size, embeddings):
+    # Look the models up once, so a tight model cache budget does not rebuild them every batch
+    model_map = dict(model_map.items())
+    scores = {}
+    processed = 0
+    for batch, ok in _tensorflow_dataset(image_paths, batch_size):
+        batch, ok = batch.numpy(), ok.numpy()
+        batch_paths = image_paths[processed:processed + len(ok)]
+        processed += len(ok)
+        if not ok.any():
+            continue
+
+        batch = batch[ok]
+        batch_paths = [path for path, valid in zip(batch_paths, ok) if valid]
+        for path in batch_paths:
+            scores[path] = {"file_name": os.path.basename(path)}
+
+        for model_name, (model, preprocess) in model_map.items():
+            # Keras preprocessors may work in place, so every model gets its own copy
+            features = np.asarray(model(preprocess(batch.copy()), training=False)).reshape(len(batch), -1)
+            norms = np.linalg.norm(features, axis=1)
+            keep_embeddings(embeddings, model_name, batch_paths, features)
+            for path, norm in zip(batch_paths, norms.tolist()):
+                scores[path][model_name] = norm
+
+        logging.info(f"Processed {processed}/{len(image_paths)} images using tensorflow.")
+    return scores
+
+
+def _evaluate_pytorch_batches(image_paths, model_map, batch_size, num_workers, embeddings):
+    import torch
+
+    scores = {}
+
+    # Models sharing a preprocessing pipeline share one pass over the images
+    groups = {}
+    for model_name, (model, preprocess) in model_map.items():
+        groups.setdefault(id(preprocess), (preprocess, []))[1].append((model_name, model))
+
+    for preprocess, group_models in groups.values():
+        for _, model in group_models:
+            model.eval()
+        loader = torch.utils.data.DataLoader(
+            _PyTorchImageDataset(image_paths, preprocess),
+            batch_size=batch_size,
+            num_workers=num_workers,
+            collate_fn=_collate_valid,
+        )
+
+        processed = 0
+        for indices, batch in loader:
+            processed = min(processed + batch_size, len(image_paths))
+            if batch is None:
+                continue
+            batch_paths = [image_paths[idx] for idx in indices.tolist()]
+            with torch.no_grad():
+                for model_name, model in group_models:
+                    features = model(batch).flatten(1)
+                    norms = features.norm(dim=1)
+                    keep_embeddings(embeddings, model_name, batch_paths, features)
+                    for path, norm in zip(batch_paths, norms.tolist()):
+                        scores.setdefault(path, {"file_name": os.path.basename(path)})[model_name] = norm
+            logging.info(f"Processed {processed}/{len(image_paths)} images using pytorch.")
+
+    return scores
+
+
+def evaluate_image_batches(image_paths, model_map, framework="tensorflow", batch_size=32, num_workers=2,
+                           embeddings=None):
+    """
+    Evaluate many images with various deep learning models, a batch at a time.
+
+    Scores are the same feature norms as ``evaluate_image_models``. TensorFlow images
+    are decoded by a parallel ``tf.data`` pipeline and fed to each model as one batch;
+    PyTorch images are decoded by a ``DataLoader`` with ``num_workers`` processes, and
+    models sharing a preprocessing pipeline reuse the same decoded batch.
+
+    Parameters:
+        image_paths (list): Paths to the image files.
+        model_map (dict): Dictionary of models and preprocessors.
+        framework (str): 'tensorflow', 'pytorch', 'pytorch-optimized', 'onnx' or 'onnx-int8'.
+        batch_size (int): Number of images per forward pass (default: 32).
+        num_workers (int): DataLoader worker processes for PyTorch (default: 2).
+        embeddings (dict): Optional ``{model_name: {image_path: features}}`` dictionary
+            that receives the flattened float32 features (default: None).
+
+    Returns:
+        dict: Mapping of image path to its scores dictionary; unreadable images are omitted.
+    """
+    if not image_paths:
+        return {}
+    if framework == "tensorflow":
+        return _evaluate_tensorflow_batches(list(image_paths), model_map, batch_size, embeddings)
+    if framework in PYTORCH_FRAMEWORKS:
+        return _evaluate_pytorch_batches(list(image_paths), model_map, batch_size, num_workers, embeddings)
+    if framework in ONNX_FRAMEWORKS:
+        # ONNX models take the shared uint8 buffer, decoded by threads
+        shared_embeddings = None if embeddings is None else {framework: embeddings}
+        return evaluate_shared_batches(list(image_paths), {framework: model_map}, batch_size, max(1, num_workers),
+                                       shared_embeddings)[framework]
+    raise ValueError("Unsupported framework. Choose 'tensorflow', 'pytorch', 'pytorch-optimized', 'onnx' or 'onnx-int8'.")
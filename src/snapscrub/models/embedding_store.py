@@ -0,0 +1,198 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+
+INDEX_COLUMNS = ["content_hash", "file_name"]
+
+
+class EmbeddingStore:
+    """
+    On-disk store of per-model image embeddings as memory-mapped ``.npy`` arrays.
+
+    Every model gets one preallocated float32 array of shape (capacity, D) at
+    ``<directory>/<version>/<model>.<generation>.npy`` and an index
+    ``<model>.<generation>.index.csv`` mapping each filled row to the content hash of
+    the image (plus its file name, for display only). Rows are looked up by content
+    hash because file names are positional IDs that shift when photos are added or
+    removed. The version (see ``model_score_version``) separates embeddings computed
+    with different decode paths or backends. Arrays are opened with ``mmap_mode="r"``,
+    so readers get zero-copy views and only touch the rows they use.
+
+    A small ``<model>.current`` file names the live generation. Compacting the store
+    writes a complete new generation and then replaces that file, so a crash at any
+    point leaves an array and index that belong together.
+
+    Parameters:
+        directory (str): Root directory of the store (created if missing).
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _model_dir(self, version):
+        # Version keys contain ':', which not every filesystem accepts in names
+        return os.path.join(self.directory, version.replace(":", "_"))
+
+    def _generation(self, version, model):
+        """
+        Return the live generation of a model's files, or None if nothing is stored.
+        """
+        try:
+            with open(os.path.join(self._model_dir(version), f"{model}.current")) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _paths(self, version, model, generation):
+        model_dir = self._model_dir(version)
+        return (os.path.join(model_dir, f"{model}.{generation}.npy"),
+                os.path.join(model_dir, f"{model}.{generation}.index.csv"))
+
+    def _index(self, version, model, generation):
+        if generation is None:
+            return pd.DataFrame(columns=INDEX_COLUMNS)
+        _, index_path = self._paths(version, model, generation)
+        return pd.read_csv(index_path, dtype=str, keep_default_na=False)
+
+    def content_hashes(self, version, model):
+        """
+        Return the content hashes stored for a model, in row order (empty if none).
+
+        An image stored more than once appears once per row; its last row is current.
+        """
+        return self._index(version, model, self._generation(version, model))["content_hash"].tolist()
+
+    def file_names(self, version, model):
+        """
+        Return the file names the stored rows had when they were written, in row order.
+        """
+        return self._index(version, model, self._generation(version, model))["file_name"].tolist()
+
+    def open(self, version, model):
+        """
+        Open the embeddings of a model without copying them.
+
+        Parameters:
+            version (str): Version key of the embeddings, e.g. ``model_score_version(framework, decode)``.
+            model (str): Name of the model.
+
+        Returns:
+            tuple: ``(content_hashes, embeddings)`` where ``embeddings`` is a read-only
+            memory-mapped array whose row ``i`` belongs to ``content_hashes[i]``, or
+            ``([], None)`` if nothing is stored.
+        """
+        generation = self._generation(version, model)
+        content_hashes = self._index(version, model, generation)["content_hash"].tolist()
+        if not content_hashes:
+            return [], None
+        array_path, _ = self._paths(version, model, generation)
+        # The array is preallocated; only the rows listed in the index are filled
+        return content_hashes, np.load(array_path, mmap_mode="r")[:len(content_hashes)]
+
+    def get(self, version, model, content_hashes):
+        """
+        Look up the embeddings of some images.
+
+        Parameters:
+            version (str): Version key of the embeddings.
+            model (str): Name of the model.
+            content_hashes (list): Content hashes of the images to look up.
+
+        Returns:
+            list: 1-D arrays, or None for images without a stored embedding.
+        """
+        stored_hashes, embeddings = self.open(version, model)
+        rows = {content_hash: row for row, content_hash in enumerate(stored_hashes)}
+        return [np.array(embeddings[rows[content_hash]]) if content_hash in rows else None
+                for content_hash in content_hashes]
+
+    def put(self, version, model, content_hashes, embeddings, file_names=None):
+        """
+        Store embeddings of a model, superseding the rows of images already stored.
+
+        New rows are appended to a preallocated array whose capacity doubles when it
+        is full, so storing ``n`` images costs O(n) instead of a rewrite of the whole
+        store. The rows are written before the index lines that make them visible, so
+        readers never see a partially written embedding. An image stored again gets a
+        new row that lookups prefer; superseded rows are dropped when the array grows.
+
+        Parameters:
+            version (str): Version key of the embeddings.
+            model (str): Name of the model.
+            content_hashes (list): Content hash of every image; nothing is stored if empty.
+            embeddings (list): 1-D array per image, all of the same length.
+            file_names (list): Optional file name of every image, kept for display (default: None).
+        """
+        if len(content_hashes) == 0:
+            return
+        if len(embeddings) != len(content_hashes):
+            raise ValueError(f"Got {len(embeddings)} {model} embeddings for {len(content_hashes)} images.")
+        os.makedirs(self._model_dir(version), exist_ok=True)
+        content_hashes = list(content_hashes)
+        file_names = list(file_names) if file_names is not None else [""] * len(content_hashes)
+        new_embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(content_hashes), -1)
+
+        generation = self._generation(version, model)
+        index = self._index(version, model, generation)
+        array = None
+        if len(index):
+            array = np.load(self._paths(version, model, generation)[0], mmap_mode="r+")
+            if array.shape[1] != new_embeddings.shape[1]:
+                logging.warning(f"Embedding size of {model} changed from {array.shape[1]} to "
+                                f"{new_embeddings.shape[1]}; dropping {len(index)} stored rows.")
+                array, index = None, index.iloc[:0]
+        if array is None or len(index) + len(new_embeddings) > len(array):
+            del array
+            generation, index = self._grow(version, model, generation, index, new_embeddings.shape[1],
+                                           set(content_hashes), len(new_embeddings))
+            array = np.load(self._paths(version, model, generation)[0], mmap_mode="r+")
+
+        array_path, index_path = self._paths(version, model, generation)
+        array[len(index):len(index) + len(new_embeddings)] = new_embeddings
+        array.flush()
+        del array
+        pd.DataFrame({"content_hash": content_hashes, "file_name": file_names}, columns=INDEX_COLUMNS).to_csv(
+            index_path, mode="a", header=False, index=False
+        )
+        logging.info(f"Stored {len(content_hashes)} {model} embeddings "
+                     f"({len(index) + len(content_hashes)} rows in total).")
+
+    def _grow(self, version, model, generation, index, dim, replaced, added):
+        """
+        Write a new generation of a model's files with room for ``added`` more rows.
+
+        Only the latest row of every image is kept, and none of the images in
+        ``replaced``. The new files are complete before ``<model>.current`` points to
+        them, and the old generation is deleted afterwards.
+
+        Returns:
+            tuple: ``(generation, index)`` of the new files.
+        """
+        latest = ~index["content_hash"].duplicated(keep="last") & ~index["content_hash"].isin(replaced)
+        kept = np.flatnonzero(latest.to_numpy())
+        capacity = 2 * (len(kept) + added)
+        new_generation = 0 if generation is None else generation + 1
+        array_path, index_path = self._paths(version, model, new_generation)
+
+        output = np.lib.format.open_memmap(array_path, mode="w+", dtype=np.float32, shape=(capacity, dim))
+        if len(kept):
+            output[:len(kept)] = np.load(self._paths(version, model, generation)[0], mmap_mode="r")[kept]
+        output.flush()
+        del output
+        index = index.iloc[kept].reset_index(drop=True)
+        index.to_csv(index_path, index=False, columns=INDEX_COLUMNS)
+
+        current_path = os.path.join(self._model_dir(version), f"{model}.current")
+        with open(f"{current_path}.partial", "w") as f:
+            f.write(str(new_generation))
+        os.replace(f"{current_path}.partial", current_path)
+
+        if generation is not None:
+            for old_path in self._paths(version, model, generation):
+                try:
+                    os.remove(old_path)
+                except OSError as e:
+                    logging.warning(f"Could not remove old embedding file {old_path}: {e}")
+        return new_generation, index
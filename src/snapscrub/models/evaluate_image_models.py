@@ -1,18 +1,29 @@
 import os
 import logging
 import numpy as np
-import torch
-from tensorflow.keras.preprocessing import image
 from PIL import Image
+from src.snapscrub.models.onnx_backend import ONNX_FRAMEWORKS
+from src.snapscrub.models.shared_preprocessing import decode_image
+from src.snapscrub.models.torch_optimization import PYTORCH_FRAMEWORKS
 
-def evaluate_image_models(image_path, model_map, framework="tensorflow"):
+def _keep_embedding(embeddings, model_name, image_path, features):
+    """
+    Add the flattened features of one image to an embeddings dictionary, if one is given.
+    """
+    if embeddings is not None:
+        embeddings.setdefault(model_name, {})[image_path] = np.asarray(features, dtype=np.float32).reshape(-1)
+
+
+def evaluate_image_models(image_path, model_map, framework="tensorflow", embeddings=None):
     """
     Evaluate an image using various deep learning models.
 
     Parameters:
         image_path (str): Path to the image file.
         model_map (dict): Dictionary of models and preprocessors.
-        framework (str): Either 'tensorflow' or 'pytorch'.
+        framework (str): 'tensorflow', 'pytorch', 'pytorch-optimized', 'onnx' or 'onnx-int8'.
+        embeddings (dict): Optional ``{model_name: {image_path: features}}`` dictionary
+            that receives the flattened float32 features (default: None).
 
     Returns:
         dict: Dictionary containing image scores.
@@ -21,6 +32,8 @@ def evaluate_image_models(image_path, model_map, framework="tensorflow"):
         scores = {"file_name": os.path.basename(image_path)}
 
         if framework == "tensorflow":
+            from tensorflow.keras.preprocessing import image
+
             img = image.load_img(image_path, target_size=(224, 224))
             img_array = image.img_to_array(img)
             img_array = np.expand_dims(img_array, axis=0)
@@ -29,8 +42,11 @@ def evaluate_image_models(image_path, model_map, framework="tensorflow"):
                 img_preprocessed = preprocess(img_array)
                 features = model.predict(img_preprocessed)
                 scores[model_name] = np.linalg.norm(features)
+                _keep_embedding(embeddings, model_name, image_path, features)
+
+        elif framework in PYTORCH_FRAMEWORKS:
+            import torch
 
-        elif framework == "pytorch":
             img = Image.open(image_path).convert("RGB")
             for model_name, (model, preprocess) in model_map.items():
                 img_preprocessed = preprocess(img).unsqueeze(0)
@@ -38,8 +54,19 @@ def evaluate_image_models(image_path, model_map, framework="tensorflow"):
                 with torch.no_grad():
                     features = model(img_preprocessed).flatten()
                 scores[model_name] = features.norm().item()
+                _keep_embedding(embeddings, model_name, image_path, features.numpy())
+
+        elif framework in ONNX_FRAMEWORKS:
+            decoded = decode_image(image_path)
+            if decoded is None:
+                return None
+            buffer = np.expand_dims(decoded, axis=0)
+            for model_name, (model, preprocess) in model_map.items():
+                features = model(preprocess(buffer))
+                scores[model_name] = np.linalg.norm(features)
+                _keep_embedding(embeddings, model_name, image_path, features)
 
         return scores
     except Exception as e:
         logging.error(f"Error processing image {image_path}: {e}")
-        return None
\ No newline at end of file
+        return None
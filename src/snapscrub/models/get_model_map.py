@@ -1,48 +1,171 @@
 import logging
-import torch
-from torchvision import models, transforms
-from tensorflow.keras.applications import (
-    MobileNetV3Large, InceptionResNetV2, ResNet101, EfficientNetB7, DenseNet201
-)
-from tensorflow.keras.applications.mobilenet_v3 import preprocess_input as mobilenetv3_preprocess
-from tensorflow.keras.applications.inception_resnet_v2 import preprocess_input as inceptionresnet_preprocess
-from tensorflow.keras.applications.resnet import preprocess_input as resnet_preprocess
-from tensorflow.keras.applications.efficientnet import preprocess_input as efficientnet_preprocess
-from tensorflow.keras.applications.densenet import preprocess_input as densenet_preprocess
+from src.snapscrub.models.model_registry import LazyModelMap
+from src.snapscrub.models.onnx_backend import ONNX_FRAMEWORKS, onnx_builders
+from src.snapscrub.models.torch_optimization import configure_torch_threads, optimize_torch_model
 
-def get_model_map(framework="tensorflow"):
+MODEL_NAMES = {
+    "tensorflow": ["MobileNetV3", "InceptionResNetV2", "ResNet101", "EfficientNetB7", "DenseNet201"],
+    "pytorch": ["resnet18", "resnet34", "efficientnet_b0", "vision_transformer"],
+}
+# The ONNX backends run exported copies of all native models
+MODEL_NAMES["onnx"] = MODEL_NAMES["tensorflow"] + MODEL_NAMES["pytorch"]
+MODEL_NAMES["onnx-int8"] = MODEL_NAMES["onnx"]
+# Same PyTorch models, prepared once for fast CPU inference
+MODEL_NAMES["pytorch-optimized"] = MODEL_NAMES["pytorch"]
+
+# Numeric settings of each backend, as served by get_model_map
+BACKEND_SETTINGS = {
+    "tensorflow": "fp32",
+    "pytorch": "fp32",
+    "pytorch-optimized": "trace-channels_last-fp32",
+    "onnx": "fp32",
+    "onnx-int8": "int8",
+}
+# How images reach the models: Keras load_img (nearest), torchvision transforms on the
+# decoded image, or the shared bilinear 224x224 uint8 buffer (evaluate_shared_batches)
+KERAS_DECODE = "keras-nearest"
+TORCHVISION_DECODE = "torchvision"
+SHARED_DECODE = "shared-bilinear"
+# Bump when the score computation changes, so stored scores are recomputed
+MODEL_SCORE_VERSION = "1"
+
+
+def native_decode(framework):
+    """
+    Return the decode path used by ``evaluate_image_models`` and ``evaluate_image_batches``.
+    """
+    if framework == "tensorflow":
+        return KERAS_DECODE
+    if framework in ("pytorch", "pytorch-optimized"):
+        return TORCHVISION_DECODE
+    return SHARED_DECODE
+
+
+def model_score_version(framework, decode):
+    """
+    Return the version key under which model scores and embeddings are stored.
+
+    Scores of the same model differ with the decode path and backend settings, so
+    each combination is stored separately and never mixed in one ranking.
+
+    Parameters:
+        framework (str): 'tensorflow', 'pytorch', 'pytorch-optimized', 'onnx' or 'onnx-int8'.
+        decode (str): Decode path, e.g. ``native_decode(framework)`` or ``SHARED_DECODE``.
+
+    Returns:
+        str: Version key such as ``'tensorflow:keras-nearest:fp32:1'``.
+    """
+    return f"{framework}:{decode}:{BACKEND_SETTINGS[framework]}:{MODEL_SCORE_VERSION}"
+
+def get_model_map(framework="tensorflow", model_names=None):
     """
-    Load and return pre-trained models and their corresponding preprocessors.
+    Return pre-trained models and their corresponding preprocessors.
+
+    The returned map is lazy: a model is only built when it is first looked up, and
+    built models are kept in the process-wide ``MODEL_CACHE`` (bounded by a memory
+    budget) so later calls reuse them.
+
+    The 'onnx' and 'onnx-int8' frameworks run all TensorFlow and PyTorch models through
+    ONNX Runtime (the latter with dynamic int8 quantization). Their preprocessors take
+    a batch of RGB uint8 224x224 images. The 'pytorch-optimized' framework serves the
+    PyTorch models traced, frozen and in channels_last format (see ``optimize_torch_model``),
+    with the intra-op thread count set to the CPUs available to the process.
 
     Parameters:
-        framework (str): Either 'tensorflow' or 'pytorch'.
+        framework (str): 'tensorflow', 'pytorch', 'pytorch-optimized', 'onnx' or 'onnx-int8'.
+        model_names (list): Optional subset of ``MODEL_NAMES[framework]`` to load.
 
     Returns:
-        dict: A dictionary of models and their preprocessors.
+        LazyModelMap: A mapping of model names to ``(model, preprocess)`` tuples.
     """
     logging.info(f"Loading models for framework: {framework}")
 
+    if framework in ONNX_FRAMEWORKS:
+        # ONNX models are exported from the native models of the framework providing them
+        sources = [
+            source for source in ("tensorflow", "pytorch")
+            if model_names is None or any(name in model_names for name in MODEL_NAMES[source])
+        ]
+        builders = onnx_builders({source: _native_builders(source) for source in sources},
+                                 quantize=framework == "onnx-int8")
+    else:
+        builders = _native_builders(framework)
+
+    # Models are built on first access; unknown names are ignored
+    selected = builders if model_names is None else [name for name in builders if name in model_names]
+    return LazyModelMap(framework, {name: builders[name] for name in selected})
+
+
+def warm_up(framework="tensorflow", model_names=None):
+    """
+    Build models ahead of time so that later ``get_model_map`` calls find them cached.
+
+    Parameters:
+        framework (str): 'tensorflow', 'pytorch', 'pytorch-optimized', 'onnx' or 'onnx-int8'.
+        model_names (list): Optional subset of ``MODEL_NAMES[framework]`` to build.
+
+    Returns:
+        LazyModelMap: The warmed-up model map.
+    """
+    return get_model_map(framework, model_names).warm_up()
+
+
+def _inference_mode(model):
+    """
+    Put a freshly built PyTorch model in evaluation mode without gradients.
+
+    torchvision builds models in training mode (BatchNorm batch statistics, active
+    Dropout). A model evicted from the model cache and built again must score like
+    the first build, so the mode is set by the builder itself.
+    """
+    model.eval()
+    model.requires_grad_(False)
+    return model
+
+
+def _native_builders(framework):
+    """
+    Return ``{name: (build_function, preprocess)}`` for the native models of a framework.
+    """
+    # Frameworks are imported here rather than at module level to keep imports cheap
     if framework == "tensorflow":
-        model_map = {
-            "MobileNetV3": (MobileNetV3Large(weights="imagenet", include_top=False, pooling="avg"), mobilenetv3_preprocess),
-            "InceptionResNetV2": (InceptionResNetV2(weights="imagenet", include_top=False, pooling="avg"), inceptionresnet_preprocess),
-            "ResNet101": (ResNet101(weights="imagenet", include_top=False, pooling="avg"), resnet_preprocess),
-            "EfficientNetB7": (EfficientNetB7(weights="imagenet", include_top=False, pooling="avg"), efficientnet_preprocess),
-            "DenseNet201": (DenseNet201(weights="imagenet", include_top=False, pooling="avg"), densenet_preprocess),
+        from tensorflow.keras.applications import (
+            MobileNetV3Large, InceptionResNetV2, ResNet101, EfficientNetB7, DenseNet201
+        )
+        from tensorflow.keras.applications.mobilenet_v3 import preprocess_input as mobilenetv3_preprocess
+        from tensorflow.keras.applications.inception_resnet_v2 import preprocess_input as inceptionresnet_preprocess
+        from tensorflow.keras.applications.resnet import preprocess_input as resnet_preprocess
+        from tensorflow.keras.applications.efficientnet import preprocess_input as efficientnet_preprocess
+        from tensorflow.keras.applications.densenet import preprocess_input as densenet_preprocess
+
+        builders = {
+            "MobileNetV3": (lambda: MobileNetV3Large(weights="imagenet", include_top=False, pooling="avg"), mobilenetv3_preprocess),
+            "InceptionResNetV2": (lambda: InceptionResNetV2(weights="imagenet", include_top=False, pooling="avg"), inceptionresnet_preprocess),
+            "ResNet101": (lambda: ResNet101(weights="imagenet", include_top=False, pooling="avg"), resnet_preprocess),
+            "EfficientNetB7": (lambda: EfficientNetB7(weights="imagenet", include_top=False, pooling="avg"), efficientnet_preprocess),
+            "DenseNet201": (lambda: DenseNet201(weights="imagenet", include_top=False, pooling="avg"), densenet_preprocess),
         }
     elif framework == "pytorch":
+        from torchvision import models, transforms
+
         preprocess = transforms.Compose([
             transforms.Resize((224, 224)),
             transforms.ToTensor(),
             transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
         ])
-        model_map = {
-            "resnet18": (models.resnet18(pretrained=True), preprocess),
-            "resnet34": (models.resnet34(pretrained=True), preprocess),
-            "efficientnet_b0": (models.efficientnet_b0(pretrained=True), preprocess),
-            "vision_transformer": (models.vit_b_16(pretrained=True), preprocess)
+        builders = {
+            "resnet18": (lambda: _inference_mode(models.resnet18(pretrained=True)), preprocess),
+            "resnet34": (lambda: _inference_mode(models.resnet34(pretrained=True)), preprocess),
+            "efficientnet_b0": (lambda: _inference_mode(models.efficientnet_b0(pretrained=True)), preprocess),
+            "vision_transformer": (lambda: _inference_mode(models.vit_b_16(pretrained=True)), preprocess)
+        }
+    elif framework == "pytorch-optimized":
+        configure_torch_threads()
+        builders = {
+            name: (lambda build=build: optimize_torch_model(build()), preprocess)
+            for name, (build, preprocess) in _native_builders("pytorch").items()
         }
     else:
-        raise ValueError("Unsupported framework. Choose 'tensorflow' or 'pytorch'.")
+        raise ValueError("Unsupported framework. Choose 'tensorflow', 'pytorch', 'pytorch-optimized', 'onnx' or 'onnx-int8'.")
 
-    return model_map
\ No newline at end of file
+    return builders
\ No newline at end of file
@@ -0,0 +1,144 @@
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+
+def estimate_model_bytes(model):
+    """
+    Estimate the memory held by a model's parameters.
+
+    Parameters:
+        model: A Keras model, a PyTorch module or a wrapper exposing ``model_bytes``.
+
+    Returns:
+        int: Approximate size in bytes (0 if it cannot be estimated).
+    """
+    try:
+        if hasattr(model, "model_bytes"):
+            return model.model_bytes
+        if hasattr(model, "parameters"):
+            tensors = list(model.parameters()) + list(model.buffers())
+            return sum(t.numel() * t.element_size() for t in tensors)
+        if hasattr(model, "count_params"):
+            # Keras models keep float32 weights
+            return int(model.count_params()) * 4
+    except Exception as e:
+        logging.warning(f"Could not estimate model size: {e}")
+    return 0
+
+
+class ModelCache:
+    """
+    In-process LRU cache of built models, bounded by a memory budget.
+
+    When adding a model brings the estimated total over ``max_bytes``, the least
+    recently used models are dropped from the cache (the new model is always kept).
+    Callers still holding a dropped model keep it alive until they release it.
+
+    Parameters:
+        max_bytes (int): Memory budget for cached models; None disables eviction (default: 4 GB).
+    """
+
+    def __init__(self, max_bytes=4 * 1024 ** 3):
+        self.max_bytes = max_bytes
+        self.models = OrderedDict()
+        self.sizes = {}
+        self.total_bytes = 0
+        self.lock = threading.RLock()
+
+    def get(self, key, builder):
+        """
+        Return a cached model, building it with ``builder`` on first access.
+
+        Parameters:
+            key (tuple): Cache key, e.g. ``(framework, model_name)``.
+            builder (callable): Function without arguments that builds the model.
+
+        Returns:
+            The model.
+        """
+        with self.lock:
+            if key in self.models:
+                self.models.move_to_end(key)
+                return self.models[key]
+
+            logging.info(f"Building model {key[-1]}...")
+            model = builder()
+            size = estimate_model_bytes(model)
+            self.models[key] = model
+            self.sizes[key] = size
+            self.total_bytes += size
+            self._evict(keep=key)
+            return model
+
+    def _evict(self, keep):
+        if self.max_bytes is None:
+            return
+        while self.total_bytes > self.max_bytes and len(self.models) > 1:
+            key = next(k for k in self.models if k != keep)
+            del self.models[key]
+            self.total_bytes -= self.sizes.pop(key)
+            logging.info(f"Evicted model {key[-1]} from the model cache.")
+
+    def __contains__(self, key):
+        return key in self.models
+
+    def clear(self):
+        """
+        Drop every cached model.
+        """
+        with self.lock:
+            self.models.clear()
+            self.sizes.clear()
+            self.total_bytes = 0
+
+
+MODEL_CACHE = ModelCache()
+
+
+class LazyModelMap(Mapping):
+    """
+    Read-only model map whose models are built on first access.
+
+    Behaves like the ``{name: (model, preprocess)}`` dictionaries used across the
+    models package. Built models live in a shared ``ModelCache``, so every map for the
+    same framework reuses them.
+
+    Parameters:
+        framework (str): Framework of the models, used in the cache keys.
+        builders (dict): ``{name: (build_function, preprocess)}``.
+        cache (ModelCache): Cache holding the built models (default: ``MODEL_CACHE``).
+    """
+
+    def __init__(self, framework, builders, cache=None):
+        self.framework = framework
+        self.builders = builders
+        self.cache = MODEL_CACHE if cache is None else cache
+
+    def __getitem__(self, name):
+        builder, preprocess = self.builders[name]
+        return self.cache.get((self.framework, name), builder), preprocess
+
+    def __iter__(self):
+        return iter(self.builders)
+
+    def __len__(self):
+        return len(self.builders)
+
+    def loaded(self):
+        """
+        Return the names of the models that are currently built and cached.
+        """
+        return [name for name in self.builders if (self.framework, name) in self.cache]
+
+    def warm_up(self):
+        """
+        Build every model of the map now, so later calls do not pay the load cost.
+
+        Returns:
+            LazyModelMap: The map itself.
+        """
+        for name in self.builders:
+            self[name]
+        return self
@@ -0,0 +1,254 @@
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+from importlib import metadata
+
+ONNX_FRAMEWORKS = ("onnx", "onnx-int8")
+ONNX_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "snapscrub", "onnx")
+ONNX_OPSET = 17
+# Dynamic int8 quantization of the weights (see ``quantize_onnx_model``)
+ONNX_QUANTIZATION = {"method": "dynamic", "weight_type": "QInt8"}
+# Packages whose versions decide which pretrained weights the native builders download
+SOURCE_PACKAGES = {
+    "tensorflow": (("tensorflow", "tensorflow-cpu", "tensorflow-macos"), ("keras",)),
+    "pytorch": (("torch",), ("torchvision",)),
+}
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
+class OnnxModel:
+    """
+    Feature extractor running an exported ONNX graph with ONNX Runtime.
+
+    Parameters:
+        model_path (str): Path to the ``.onnx`` file.
+        num_threads (int): Intra-op threads; None lets ONNX Runtime decide (default: None).
+    """
+
+    def __init__(self, model_path, num_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.model_path = model_path
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch):
+        """
+        Run the graph on a preprocessed float32 batch and return the features.
+        """
+        return self.session.run(None, {self.input_name: np.ascontiguousarray(batch, dtype=np.float32)})[0]
+
+
+def _pytorch_input(buffer):
+    """
+    Apply the torchvision ToTensor/Normalize steps to an RGB uint8 NHWC buffer, in NumPy.
+    """
+    batch = buffer.astype(np.float32) / 255
+    batch -= IMAGENET_MEAN
+    batch /= IMAGENET_STD
+    return batch.transpose(0, 3, 1, 2)
+
+
+def _tensorflow_input(preprocess):
+    """
+    Wrap a Keras preprocess function so it takes an RGB uint8 NHWC buffer.
+    """
+    def apply(buffer):
+        return preprocess(buffer.astype(np.float32))
+    return apply
+
+
+def export_to_onnx(source_framework, model_name, model, model_path):
+    """
+    Export a native feature extractor to ONNX with a dynamic batch dimension.
+
+    Parameters:
+        source_framework (str): 'tensorflow' or 'pytorch'.
+        model_name (str): Name of the model (for logging).
+        model: The built Keras model or PyTorch module.
+        model_path (str): Destination ``.onnx`` path.
+    """
+    logging.info(f"Exporting {model_name} ({source_framework}) to {model_path}...")
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    partial_path = f"{model_path}.partial"
+
+    if source_framework == "pytorch":
+        import torch
+
+        model.eval()
+        torch.onnx.export(
+            model, torch.zeros(1, 3, 224, 224), partial_path,
+            input_names=["input"], output_names=["features"],
+            dynamic_axes={"input": {0: "batch"}, "features": {0: "batch"}},
+            opset_version=ONNX_OPSET,
+        )
+    elif source_framework == "tensorflow":
+        import tensorflow as tf
+        import tf2onnx
+
+        signature = (tf.TensorSpec((None, 224, 224, 3), tf.float32, name="input"),)
+        tf2onnx.convert.from_keras(model, input_signature=signature, opset=ONNX_OPSET, output_path=partial_path)
+    else:
+        raise ValueError("Unsupported framework. Choose 'tensorflow' or 'pytorch'.")
+
+    # Only publish complete exports, so an interrupted export is redone next time
+    os.replace(partial_path, model_path)
+
+
+def quantize_onnx_model(model_path, quantized_path):
+    """
+    Quantize the weights of an ONNX model to int8 (dynamic quantization).
+
+    Parameters:
+        model_path (str): Path to the float32 ``.onnx`` file.
+        quantized_path (str): Destination path of the quantized model.
+    """
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    logging.info(f"Quantizing {model_path} to {quantized_path}...")
+    partial_path = f"{quantized_path}.partial"
+    quantize_dynamic(model_path, partial_path, weight_type=QuantType[ONNX_QUANTIZATION["weight_type"]])
+    os.replace(partial_path, quantized_path)
+
+
+def _package_version(candidates):
+    """
+    Return the installed version of the first of some alternative package names.
+    """
+    for package in candidates:
+        try:
+            return f"{package}=={metadata.version(package)}"
+        except metadata.PackageNotFoundError:
+            continue
+    return f"{candidates[0]}==unknown"
+
+
+def onnx_export_key(source_framework, quantize=False):
+    """
+    Return a short key identifying the settings an exported graph was produced with.
+
+    The key covers the opset, the quantization settings and the versions of the
+    packages providing the native model and its pretrained weights, so a change to
+    any of them exports the model again instead of reusing a stale graph.
+
+    Parameters:
+        source_framework (str): 'tensorflow' or 'pytorch'.
+        quantize (bool): Whether the graph is quantized (default: False).
+
+    Returns:
+        str: Hexadecimal key of 16 characters.
+    """
+    settings = {
+        "opset": ONNX_OPSET,
+        "quantization": ONNX_QUANTIZATION if quantize else None,
+        "packages": [_package_version(candidates) for candidates in SOURCE_PACKAGES[source_framework]],
+    }
+    return hashlib.blake2b(json.dumps(settings, sort_keys=True).encode(), digest_size=8).hexdigest()
+
+
+def load_onnx_model(source_framework, model_name, build_native, quantize=False, cache_dir=ONNX_CACHE_DIR):
+    """
+    Return an ONNX Runtime model, exporting (and quantizing) the native model on first use.
+
+    Exported graphs are cached on disk as ``<source>_<name>.<key>[.int8].onnx``, where
+    ``key`` is the ``onnx_export_key`` of the export, so the native framework is only
+    needed the first time and a graph exported with other settings is never reused.
+
+    Parameters:
+        source_framework (str): 'tensorflow' or 'pytorch'.
+        model_name (str): Name of the model.
+        build_native (callable): Function building the native model if an export is needed.
+        quantize (bool): Use dynamic int8 quantization (default: False).
+        cache_dir (str): Directory of the exported graphs (default: ``ONNX_CACHE_DIR``).
+
+    Returns:
+        OnnxModel: The loaded model.
+    """
+    model_path = os.path.join(cache_dir, f"{source_framework}_{model_name}.{onnx_export_key(source_framework)}.onnx")
+    if not os.path.exists(model_path):
+        export_to_onnx(source_framework, model_name, build_native(), model_path)
+
+    if quantize:
+        key = onnx_export_key(source_framework, quantize=True)
+        quantized_path = os.path.join(cache_dir, f"{source_framework}_{model_name}.{key}.int8.onnx")
+        if not os.path.exists(quantized_path):
+            quantize_onnx_model(model_path, quantized_path)
+        model_path = quantized_path
+
+    return OnnxModel(model_path)
+
+
+def onnx_builders(native_builders, quantize=False, cache_dir=ONNX_CACHE_DIR):
+    """
+    Build ``get_model_map`` builder entries for the ONNX versions of native models.
+
+    Parameters:
+        native_builders (dict): ``{source_framework: {name: (build_function, preprocess)}}``.
+        quantize (bool): Use dynamic int8 quantization (default: False).
+        cache_dir (str): Directory of the exported graphs (default: ``ONNX_CACHE_DIR``).
+
+    Returns:
+        dict: ``{name: (build_function, preprocess)}`` where ``preprocess`` maps an RGB
+        uint8 NHWC batch buffer to the model input.
+    """
+    builders = {}
+    for source_framework, source_builders in native_builders.items():
+        for name, (build_native, preprocess) in source_builders.items():
+            model_input = _pytorch_input if source_framework == "pytorch" else _tensorflow_input(preprocess)
+            builders[name] = (
+                lambda source=source_framework, name=name, build=build_native:
+                    load_onnx_model(source, name, build, quantize, cache_dir),
+                model_input,
+            )
+    return builders
+
+
+def check_rank_consistency(native_scores, onnx_scores, model_names, min_correlation=0.99, top_k=10,
+                           min_top_k_overlap=0.9):
+    """
+    Check that ONNX scores rank images like the native backends.
+
+    Compares the per-model rank columns of two score tables (as written by
+    ``predict_and_generate_log``) with the Spearman correlation of the ranks and the
+    overlap of the ``top_k`` images. A model is consistent only if both reach their
+    minimum, since the top images are what ``transfer_images`` selects. Score both
+    tables from the same decoded images (``evaluate_shared_batches``), otherwise
+    decode differences are measured along with backend differences.
+
+    Parameters:
+        native_scores (pd.DataFrame): Native scores with ``file_name`` and model columns.
+        onnx_scores (pd.DataFrame): ONNX scores with the same columns.
+        model_names (list): Models to compare.
+        min_correlation (float): Minimum rank correlation per model (default: 0.99).
+        top_k (int): Number of top-ranked images compared (default: 10).
+        min_top_k_overlap (float): Minimum fraction of shared top-k images per model (default: 0.9).
+
+    Returns:
+        dict: Per model, ``{"correlation", "top_k_overlap", "consistent"}``.
+    """
+    merged = native_scores.merge(onnx_scores, on="file_name", suffixes=("_native", "_onnx"))
+    report = {}
+    for model in model_names:
+        native = merged[f"{model}_native"].rank(ascending=False, method="average")
+        onnx = merged[f"{model}_onnx"].rank(ascending=False, method="average")
+        correlation = float(native.corr(onnx)) if len(merged) > 1 else 1.0
+
+        k = min(top_k, len(merged))
+        native_top = set(merged["file_name"][native.nsmallest(k).index])
+        onnx_top = set(merged["file_name"][onnx.nsmallest(k).index])
+        overlap = len(native_top & onnx_top) / k if k else 1.0
+
+        report[model] = {
+            "correlation": correlation,
+            "top_k_overlap": overlap,
+            "consistent": correlation >= min_correlation and overlap >= min_top_k_overlap,
+        }
+        logging.info(f"{model}: rank correlation {correlation:.4f}, top-{k} overlap {overlap:.0%}")
+    return report
@@ -1,57 +1,346 @@
 import os
+import math
 import logging
 import pandas as pd
 from .evaluate_image_models import evaluate_image_models
-from src.snapscrub.models.get_model_map import get_model_map
+from .batched_inference import evaluate_image_batches
+from .shared_preprocessing import evaluate_shared_batches
+from src.snapscrub.utils.content_hash import calculate_content_hash
+from src.snapscrub.models.get_model_map import (
+    get_model_map, model_score_version, native_decode, MODEL_NAMES, SHARED_DECODE
+)
 
-def predict_and_generate_log(root_folder, framework="tensorflow", model_name=None):
+def predict_and_generate_log(root_folder, framework="tensorflow", model_name=None, feature_store=None,
+                             batch_size=32, num_workers=2, cascade_model=None, cascade_fraction=0.05,
+                             cascade_min_images=100, embedding_store=None):
     """
     Predict image scores using selected models, save results to log CSV,
     and add rankings for each model.
 
+    In cascade mode (``cascade_model`` set, e.g. 'MobileNetV3' or 'resnet18'), the cheap
+    model scores every image and only its top ``cascade_fraction`` (at least
+    ``cascade_min_images``) is forwarded to the other models. The CSV then has a
+    ``scored_tier`` column: 1 for images scored by the cheap model only, 2 for images
+    scored by all models. Heavy-model scores and ranks are empty for tier 1 images.
+
     Parameters:
         root_folder (str): Root directory of the project.
-        framework (str): Framework used for models ('tensorflow' or 'pytorch').
+        framework (str): Framework used for models ('tensorflow', 'pytorch', 'pytorch-optimized', 'onnx' or 'onnx-int8').
         model_name (str): Specific model to run (e.g., 'ResNet101'). If None, runs all models.
+        feature_store (FeatureStore): Optional persistent store. Scores of images already
+            scored by a model in an earlier run with the same decode path and backend
+            settings (see ``model_score_version``) are reused, and models are only loaded
+            if some image still needs them (default: None).
+        batch_size (int): Number of images per forward pass. None or 1 evaluates one
+            image at a time with ``evaluate_image_models`` (default: 32).
+        num_workers (int): DataLoader worker processes for PyTorch batches (default: 2).
+        cascade_model (str): Cheap model used as a prefilter; None scores every image
+            with every model (default: None).
+        cascade_fraction (float): Fraction of images forwarded to the other models (default: 0.05).
+        cascade_min_images (int): Minimum number of images forwarded (default: 100).
+        embedding_store (EmbeddingStore): Optional store receiving the features of every
+            model; images without stored features are run through the model even if
+            their score is already known (default: None).
     """
-    resized_folder = os.path.join(root_folder, "resized")
-
-    # Load image files
-    image_files = [
-        os.path.join(resized_folder, f) for f in os.listdir(resized_folder)
-        if f.lower().endswith(("jpg", "jpeg", "png", "bmp"))
-    ]
+    image_files = _list_resized_images(root_folder)
     if not image_files:
         logging.warning(f"No images found in the resized folder for {framework}.")
         return
 
-    # Load the model map based on the selected framework
-    model_map = get_model_map(framework)
+    if framework not in MODEL_NAMES:
+        raise ValueError("Unsupported framework. Choose 'tensorflow', 'pytorch', 'pytorch-optimized', 'onnx' or 'onnx-int8'.")
 
-    # If a specific model is requested, filter the model map
-    if model_name and model_name in model_map:
-        model_map = {model_name: model_map[model_name]}
+    # If a specific model is requested, only run that model
+    model_names = MODEL_NAMES[framework]
+    if model_name and model_name in model_names:
+        model_names = [model_name]
         csv_file_suffix = f"_{model_name}"
     else:
         csv_file_suffix = f"_{framework}"
 
-    logging.info(f"Processing with models: {list(model_map.keys())} using {framework}")
+    if cascade_model is not None and cascade_model not in model_names:
+        raise ValueError(f"Cascade model {cascade_model} is not among the models run: {model_names}")
+
+    logging.info(f"Processing with models: {model_names} using {framework}")
+
+    # Scores are only reused from runs with the same decode path and backend settings
+    version = model_score_version(framework, native_decode(framework))
+    scores_by_image, content_hashes = _load_stored_scores(image_files, model_names, version, feature_store,
+                                                          embedding_store)
+
+    def score(image_paths, models):
+        _score_images(image_paths, models, framework, version, scores_by_image, feature_store, content_hashes,
+                      batch_size, num_workers, embedding_store)
+
+    tiers = None
+    if cascade_model is None:
+        score(image_files, model_names)
+    else:
+        # Tier 1: the cheap model scores everything; tier 2: the heavy models score its top images
+        score(image_files, [cascade_model])
+        forwarded = _select_cascade_images(scores_by_image, cascade_model, cascade_fraction, cascade_min_images)
+        logging.info(f"Cascade: forwarding {len(forwarded)}/{len(image_files)} images from {cascade_model} "
+                     f"to the other {framework} models.")
+        score(forwarded, [model for model in model_names if model != cascade_model])
+        tiers = _scored_tiers(scores_by_image, model_names)
+
+    _save_scores(root_folder, scores_by_image, model_names, csv_file_suffix, tiers)
+
+
+def predict_and_generate_logs(root_folder, frameworks=("tensorflow", "pytorch"), feature_store=None,
+                              batch_size=32, num_workers=4, cascade_models=None, cascade_fraction=0.05,
+                              cascade_min_images=100, embedding_store=None):
+    """
+    Predict image scores for several frameworks in one pass and save one log CSV per framework.
+
+    Each image is decoded and resized once into a shared uint8 buffer that feeds the
+    models of all frameworks (see ``evaluate_shared_batches``). The CSV files are the
+    same as those written by ``predict_and_generate_log`` for each framework.
+
+    With ``cascade_models`` (e.g. ``{"tensorflow": "MobileNetV3", "pytorch": "resnet18"}``)
+    the cheap models of all frameworks score every image in the shared pass, and each
+    framework's other models then score only the top images of its cheap model, as in
+    the cascade mode of ``predict_and_generate_log``.
+
+    Parameters:
+        root_folder (str): Root directory of the project.
+        frameworks (tuple): Frameworks to run (default: ('tensorflow', 'pytorch')).
+        feature_store (FeatureStore): Optional persistent store of model scores; scores are
+            stored under the shared-decode version of each framework (default: None).
+        batch_size (int): Number of images per batch (default: 32).
+        num_workers (int): Number of decoding threads (default: 4).
+        cascade_models (dict): Optional cheap prefilter model per framework (default: None).
+        cascade_fraction (float): Fraction of images forwarded to the other models (default: 0.05).
+        cascade_min_images (int): Minimum number of images forwarded (default: 100).
+        embedding_store (EmbeddingStore): Optional store receiving the features of every model (default: None).
+    """
+    image_files = _list_resized_images(root_folder)
+    if not image_files:
+        logging.warning(f"No images found in the resized folder for {list(frameworks)}.")
+        return
+
+    cascade_models = cascade_models or {}
+    for framework in frameworks:
+        if framework not in MODEL_NAMES:
+            raise ValueError("Unsupported framework. Choose 'tensorflow', 'pytorch', 'pytorch-optimized', 'onnx' or 'onnx-int8'.")
+        if framework in cascade_models and cascade_models[framework] not in MODEL_NAMES[framework]:
+            raise ValueError(f"Cascade model {cascade_models[framework]} is not a {framework} model.")
+
+    stored = {
+        framework: _load_stored_scores(image_files, MODEL_NAMES[framework],
+                                       model_score_version(framework, SHARED_DECODE), feature_store, embedding_store)
+        for framework in frameworks
+    }
+
+    # Cheap models (or all models, without a cascade) score every image in one shared pass
+    first_pass = {framework: [cascade_models[framework]] if framework in cascade_models else MODEL_NAMES[framework]
+                  for framework in frameworks}
+    _score_images_shared(image_files, first_pass, stored, feature_store, batch_size, num_workers, embedding_store)
+
+    for framework in frameworks:
+        scores_by_image = stored[framework][0]
+        tiers = None
+        if framework in cascade_models:
+            cascade_model = cascade_models[framework]
+            forwarded = _select_cascade_images(scores_by_image, cascade_model, cascade_fraction, cascade_min_images)
+            logging.info(f"Cascade: forwarding {len(forwarded)}/{len(image_files)} images from {cascade_model} "
+                         f"to the other {framework} models.")
+            heavy_models = [model for model in MODEL_NAMES[framework] if model != cascade_model]
+            _score_images_shared(forwarded, {framework: heavy_models}, stored, feature_store, batch_size, num_workers,
+                                 embedding_store)
+            tiers = _scored_tiers(scores_by_image, MODEL_NAMES[framework])
+        _save_scores(root_folder, scores_by_image, MODEL_NAMES[framework], f"_{framework}", tiers)
+
+
+def _score_images(image_paths, model_names, framework, version, scores_by_image, feature_store, content_hashes,
+                  batch_size, num_workers, embedding_store=None):
+    """
+    Score images with the models of one framework they have no score (or stored embedding) for yet.
+    """
+    missing = _missing_models(image_paths, model_names, version, scores_by_image, content_hashes, embedding_store)
+    pending = [path for path in image_paths if missing[path]]
+    logging.info(f"{len(image_paths) - len(pending)} images already scored, {len(pending)} to process with {framework}.")
+    if not pending:
+        return
+
+    # Load the model map with only the models that still have work to do
+    needed = [model for model in model_names if any(model in missing[path] for path in pending)]
+    model_map = get_model_map(framework, needed)
+    embeddings = {} if embedding_store is not None else None
+
+    if batch_size and batch_size > 1:
+        # Images missing any model are run through all needed models; scores are deterministic
+        batch_scores = evaluate_image_batches(pending, model_map, framework, batch_size, num_workers, embeddings)
+        computed = [(path, batch_scores.get(path)) for path in pending]
+    else:
+        computed = []
+        # Models are looked up once, not per image, so the model cache cannot rebuild them in between
+        models = dict(model_map.items())
+        # Process each image through the models it has no score for
+        for idx, image_path in enumerate(pending):
+            image_models = {model: models[model] for model in needed if model in missing[image_path]}
+            computed.append((image_path, evaluate_image_models(image_path, image_models, framework, embeddings)))
+            if (idx + 1) % 10 == 0 or (idx + 1) == len(pending):
+                logging.info(f"Processed {idx + 1}/{len(pending)} images using {framework}.")
+
+    _merge_scores(scores_by_image, computed, needed, version, feature_store, content_hashes)
+    _save_embeddings(embedding_store, version, embeddings, content_hashes)
+
+
+def _score_images_shared(image_paths, models_by_framework, stored, feature_store, batch_size, num_workers,
+                         embedding_store=None):
+    """
+    Score images with the models of several frameworks in one shared decoding pass.
+    """
+    model_maps = {}
+    pending = set()
+    for framework, model_names in models_by_framework.items():
+        missing = _missing_models(image_paths, model_names, model_score_version(framework, SHARED_DECODE),
+                                  *stored[framework], embedding_store)
+        framework_pending = [path for path in image_paths if missing[path]]
+        needed = [model for model in model_names if any(model in missing[path] for path in framework_pending)]
+        if needed:
+            model_maps[framework] = get_model_map(framework, needed)
+            pending.update(framework_pending)
+
+    # Images pending for any framework go through all loaded models in the same pass
+    pending = [path for path in image_paths if path in pending]
+    logging.info(f"{len(image_paths) - len(pending)} images already scored, {len(pending)} to process "
+                 f"with {list(model_maps)}.")
+    if not pending:
+        return
+
+    def save_batch(batch_scores, batch_embeddings):
+        # Scores are stored as every batch completes, so a rerun after a crash only scores the rest
+        for framework, model_map in model_maps.items():
+            scores_by_image, content_hashes = stored[framework]
+            version = model_score_version(framework, SHARED_DECODE)
+            _merge_scores(scores_by_image, list(batch_scores[framework].items()), list(model_map), version,
+                          feature_store, content_hashes)
+            if batch_embeddings is not None:
+                _save_embeddings(embedding_store, version, batch_embeddings.get(framework, {}), content_hashes)
 
-    results = []
+    embeddings = {} if embedding_store is not None else None
+    evaluate_shared_batches(pending, model_maps, batch_size, num_workers, embeddings, on_batch=save_batch)
 
-    # Process each image through the models
-    for idx, image_path in enumerate(image_files):
-        scores = evaluate_image_models(image_path, model_map, framework)
-        if scores:
-            results.append(scores)
-        if (idx + 1) % 10 == 0 or (idx + 1) == len(image_files):
-            logging.info(f"Processed {idx + 1}/{len(image_files)} images using {framework}.")
+
+def _missing_models(image_paths, model_names, version, scores_by_image, content_hashes, embedding_store):
+    """
+    Return, for every image, the models it still has to be run through.
+    """
+    missing = {path: [model for model in model_names if model not in scores_by_image[path]] for path in image_paths}
+    if embedding_store is not None:
+        for model in model_names:
+            stored_hashes = set(embedding_store.content_hashes(version, model))
+            for path in image_paths:
+                if content_hashes[path] not in stored_hashes and model not in missing[path]:
+                    missing[path].append(model)
+    return missing
+
+
+def _save_embeddings(embedding_store, version, embeddings, content_hashes):
+    """
+    Write collected ``{model: {image_path: features}}`` embeddings to the embedding store.
+    """
+    if embedding_store is None:
+        return
+    for model, features_by_path in embeddings.items():
+        paths = [path for path in features_by_path if content_hashes[path] is not None]
+        embedding_store.put(version, model, [content_hashes[path] for path in paths],
+                            [features_by_path[path] for path in paths],
+                            file_names=[os.path.basename(path) for path in paths])
+
+
+def _select_cascade_images(scores_by_image, cascade_model, fraction, min_images):
+    """
+    Return the images with the highest cheap-model scores, in their original order.
+    """
+    scored = [(scores[cascade_model], path) for path, scores in scores_by_image.items() if cascade_model in scores]
+    count = min(len(scored), max(min_images, math.ceil(fraction * len(scored))))
+    # Highest scores first; ties are broken by path so the selection is deterministic
+    selected = {path for _, path in sorted(scored, key=lambda item: (-item[0], item[1]))[:count]}
+    return [path for path in scores_by_image if path in selected]
+
+
+def _scored_tiers(scores_by_image, model_names):
+    """
+    Return the cascade tier of every image: 2 if scored by all models, 1 otherwise.
+    """
+    return {path: 2 if all(model in scores for model in model_names) else 1 for path, scores in scores_by_image.items()}
+
+
+def _list_resized_images(root_folder):
+    """
+    List the images of the resized folder.
+    """
+    resized_folder = os.path.join(root_folder, "resized")
+    return [
+        os.path.join(resized_folder, f) for f in os.listdir(resized_folder)
+        if f.lower().endswith(("jpg", "jpeg", "png", "bmp"))
+    ]
+
+
+def _load_stored_scores(image_files, model_names, version, feature_store, embedding_store=None):
+    """
+    Return the scores stored by earlier runs for every image, and the content hashes.
+
+    Content hashes are only calculated if one of the stores needs them (None otherwise).
+    """
+    scores_by_image = {image_path: {} for image_path in image_files}
+
+    content_hashes = None
+    if feature_store is not None:
+        content_hashes = dict(zip(image_files, feature_store.content_hashes(image_files)))
+    elif embedding_store is not None:
+        content_hashes = {path: calculate_content_hash(path) for path in image_files}
+
+    # Reuse scores stored by earlier runs for unchanged images
+    if feature_store is not None:
+        for model in model_names:
+            stored = feature_store.get_scores([content_hashes[path] for path in image_files], model, version)
+            for image_path, score in zip(image_files, stored):
+                if score is not None:
+                    scores_by_image[image_path][model] = score
+
+    return scores_by_image, content_hashes
+
+
+def _merge_scores(scores_by_image, computed, models, version, feature_store, content_hashes):
+    """
+    Add newly computed scores to ``scores_by_image`` and write them to the feature store.
+    """
+    new_scores = {model: ([], []) for model in models}
+    for image_path, scores in computed:
+        if not scores:
+            continue
+        for model in models:
+            if model in scores and model not in scores_by_image[image_path]:
+                scores_by_image[image_path][model] = scores[model]
+                new_scores[model][0].append(image_path)
+                new_scores[model][1].append(scores[model])
+
+    if feature_store is not None:
+        for model, (paths, scores) in new_scores.items():
+            feature_store.put_scores([content_hashes[path] for path in paths], model, version, scores)
+
+
+def _save_scores(root_folder, scores_by_image, model_names, csv_file_suffix, tiers=None):
+    """
+    Save scores and per-model rankings to ``model_scores<suffix>.csv``.
+
+    With ``tiers`` (cascade mode), a ``scored_tier`` column records which tier scored each image.
+    """
+    results = [
+        {"file_name": os.path.basename(image_path), **scores,
+         **({"scored_tier": tiers[image_path]} if tiers is not None else {})}
+        for image_path, scores in scores_by_image.items() if scores
+    ]
 
     # Convert results to DataFrame
     df = pd.DataFrame(results)
 
     # Ensure all model columns are present
-    for model in model_map.keys():
+    for model in model_names:
         if model not in df.columns:
             df[model] = None
 
@@ -59,10 +348,10 @@ def predict_and_generate_log(root_folder, framework="tensorflow", model_name=Non
     scores_csv_path = os.path.join(root_folder, f"model_scores{csv_file_suffix}.csv")
 
     # Add rankings for each model
-    for model in model_map.keys():
+    for model in model_names:
         if df[model].notnull().any():
             df[f"{model}_rank"] = df[model].rank(ascending=False, method="min")
 
     # Save the scores and rankings to CSV
     df.to_csv(scores_csv_path, index=False)
-    logging.info(f"Model scores with rankings saved to {scores_csv_path}")
\ No newline at end of file
+    logging.info(f"Model scores with rankings saved to {scores_csv_path}")
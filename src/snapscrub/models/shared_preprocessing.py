@@ -0,0 +1,217 @@
+import os
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from src.snapscrub.models.onnx_backend import ONNX_FRAMEWORKS
+from src.snapscrub.models.torch_optimization import PYTORCH_FRAMEWORKS
+
+IMAGE_SIZE = (224, 224)
+
+
+def decode_image(image_path, size=IMAGE_SIZE):
+    """
+    Decode an image to an RGB uint8 array resized with bilinear filtering.
+
+    Parameters:
+        image_path (str): Path to the image file.
+        size (tuple): Target size (width, height) (default: 224x224).
+
+    Returns:
+        np.ndarray: Array of shape (H, W, 3), or None if the image cannot be read.
+    """
+    try:
+        with Image.open(image_path) as img:
+            return np.asarray(img.convert("RGB").resize(size, Image.BILINEAR), dtype=np.uint8)
+    except Exception as e:
+        logging.error(f"Error processing image {image_path}: {e}")
+        return None
+
+
+def iterate_decoded_batches(image_paths, batch_size=32, size=IMAGE_SIZE, num_workers=4):
+    """
+    Decode images once into reusable uint8 batch buffers.
+
+    Images are decoded and resized by a thread pool (PIL releases the GIL while doing
+    so). The same buffer is overwritten for every batch, so consumers must copy
+    whatever they keep.
+
+    Parameters:
+        image_paths (list): Paths to the image files.
+        batch_size (int): Number of images per batch (default: 32).
+        size (tuple): Target size (width, height) (default: 224x224).
+        num_workers (int): Number of decoding threads (default: 4).
+
+    Yields:
+        tuple: ``(batch_paths, buffer, valid)`` with ``buffer`` of shape (B, H, W, 3) and
+        ``valid`` marking the images that could be decoded.
+    """
+    buffer = np.zeros((batch_size, size[1], size[0], 3), dtype=np.uint8)
+    with ThreadPoolExecutor(max_workers=max(1, num_workers)) as executor:
+        for start in range(0, len(image_paths), batch_size):
+            batch_paths = image_paths[start:start + batch_size]
+            valid = np.zeros(len(batch_paths), dtype=bool)
+            for idx, decoded in enumerate(executor.map(decode_image, batch_paths, [size] * len(batch_paths))):
+                if decoded is not None:
+                    buffer[idx] = decoded
+                    valid[idx] = True
+            yield batch_paths, buffer[:len(batch_paths)], valid
+
+
+def tensorflow_batch(buffer, preprocess):
+    """
+    Apply a Keras ``preprocess_input`` function to a uint8 batch buffer.
+
+    Parameters:
+        buffer (np.ndarray): RGB uint8 array of shape (B, H, W, 3).
+        preprocess (callable): Keras preprocessing function.
+
+    Returns:
+        np.ndarray: Preprocessed float32 batch (a new array; the buffer is untouched).
+    """
+    return preprocess(buffer.astype(np.float32))
+
+
+def pytorch_batch(buffer, preprocess):
+    """
+    Apply a torchvision preprocessing pipeline to a uint8 batch buffer.
+
+    ``Resize``/``ToTensor``/``Normalize`` pipelines are applied as vectorized tensor
+    operations: the buffer is already resized, so ``ToTensor`` becomes a division by
+    255 and ``Normalize`` a per-channel affine transform. Other pipelines fall back to
+    running ``preprocess`` on every image.
+
+    Parameters:
+        buffer (np.ndarray): RGB uint8 array of shape (B, H, W, 3).
+        preprocess (callable): torchvision transform applied to a PIL image.
+
+    Returns:
+        torch.Tensor: float32 batch of shape (B, 3, H, W).
+    """
+    import torch
+    from torchvision import transforms
+
+    steps = preprocess.transforms if isinstance(preprocess, transforms.Compose) else [preprocess]
+    if not all(isinstance(step, (transforms.Resize, transforms.ToTensor, transforms.Normalize)) for step in steps):
+        return torch.stack([preprocess(Image.fromarray(img)) for img in buffer])
+
+    batch = torch.from_numpy(buffer).permute(0, 3, 1, 2).float().div_(255)
+    for step in steps:
+        if isinstance(step, transforms.Normalize):
+            mean = torch.as_tensor(step.mean, dtype=batch.dtype).view(1, -1, 1, 1)
+            std = torch.as_tensor(step.std, dtype=batch.dtype).view(1, -1, 1, 1)
+            batch.sub_(mean).div_(std)
+    return batch.contiguous()
+
+
+def keep_embeddings(embeddings, model_name, paths, features):
+    """
+    Add a batch of features to an embeddings dictionary, if one is given.
+
+    Parameters:
+        embeddings (dict): ``{model_name: {image_path: features}}`` dictionary, or None.
+        model_name (str): Name of the model.
+        paths (list): Image path of every row of ``features``.
+        features: Array or tensor of shape (B, D).
+    """
+    if embeddings is None:
+        return
+    if not isinstance(features, np.ndarray):
+        features = features.detach().cpu().numpy()
+    rows = np.asarray(features, dtype=np.float32).reshape(len(paths), -1)
+    model_embeddings = embeddings.setdefault(model_name, {})
+    for path, row in zip(paths, rows):
+        model_embeddings[path] = row.copy()
+
+
+def evaluate_shared_batches(image_paths, model_maps, batch_size=32, num_workers=4, embeddings=None, on_batch=None):
+    """
+    Score images with TensorFlow, PyTorch and ONNX models from a single decode per image.
+
+    Every image is decoded and resized to 224x224 once into a shared uint8 buffer; each
+    model then only applies its own normalization to that buffer before its forward
+    pass. Scores are the feature norms used by ``evaluate_image_models``.
+
+    Parameters:
+        image_paths (list): Paths to the image files.
+        model_maps (dict): Model map per framework, e.g. ``{"tensorflow": ..., "pytorch": ...}``
+            (see ``get_model_map``).
+        batch_size (int): Number of images per batch (default: 32).
+        num_workers (int): Number of decoding threads (default: 4).
+        embeddings (dict): Optional ``{framework: {model_name: {image_path: features}}}``
+            dictionary that receives the flattened float32 features (default: None).
+        on_batch (callable): Optional function called after every batch with the scores
+            and embeddings of that batch, in the same layouts as the returned scores and
+            ``embeddings`` (embeddings are None without ``embeddings``), e.g. to persist
+            them before the next batch (default: None).
+
+    Returns:
+        dict: For every framework, a mapping of image path to its scores dictionary;
+        unreadable images are omitted.
+    """
+    results = {framework: {} for framework in model_maps}
+    # Look the models up once, so a tight model cache budget does not rebuild them every batch
+    model_maps = {framework: dict(model_map.items()) for framework, model_map in model_maps.items()}
+    pytorch_frameworks = [framework for framework in model_maps if framework in PYTORCH_FRAMEWORKS]
+    if pytorch_frameworks:
+        import torch
+    for framework in pytorch_frameworks:
+        for model, _ in model_maps[framework].values():
+            model.eval()
+
+    processed = 0
+    for batch_paths, buffer, valid in iterate_decoded_batches(image_paths, batch_size, IMAGE_SIZE, num_workers):
+        processed += len(batch_paths)
+        if not valid.any():
+            continue
+        images = buffer[valid]
+        paths = [path for path, ok in zip(batch_paths, valid) if ok]
+        batch_results = {framework: {} for framework in model_maps}
+        batch_embeddings = None if embeddings is None else {}
+
+        for framework, model_map in model_maps.items():
+            scores = batch_results[framework]
+            framework_embeddings = None if embeddings is None else batch_embeddings.setdefault(framework, {})
+            for path in paths:
+                scores[path] = {"file_name": os.path.basename(path)}
+
+            if framework == "tensorflow":
+                for model_name, (model, preprocess) in model_map.items():
+                    features = np.asarray(model(tensorflow_batch(images, preprocess), training=False)).reshape(len(paths), -1)
+                    norms = np.linalg.norm(features, axis=1)
+                    keep_embeddings(framework_embeddings, model_name, paths, features)
+                    for path, norm in zip(paths, norms.tolist()):
+                        scores[path][model_name] = norm
+            elif framework in PYTORCH_FRAMEWORKS:
+                # Models sharing a preprocessing pipeline share the normalized batch
+                normalized = {}
+                with torch.no_grad():
+                    for model_name, (model, preprocess) in model_map.items():
+                        if id(preprocess) not in normalized:
+                            normalized[id(preprocess)] = pytorch_batch(images, preprocess)
+                        features = model(normalized[id(preprocess)]).flatten(1)
+                        norms = features.norm(dim=1)
+                        keep_embeddings(framework_embeddings, model_name, paths, features)
+                        for path, norm in zip(paths, norms.tolist()):
+                            scores[path][model_name] = norm
+            elif framework in ONNX_FRAMEWORKS:
+                # ONNX preprocessors take the uint8 buffer directly
+                for model_name, (model, preprocess) in model_map.items():
+                    features = model(preprocess(images)).reshape(len(paths), -1)
+                    norms = np.linalg.norm(features, axis=1)
+                    keep_embeddings(framework_embeddings, model_name, paths, features)
+                    for path, norm in zip(paths, norms.tolist()):
+                        scores[path][model_name] = norm
+            else:
+                raise ValueError("Unsupported framework. Choose 'tensorflow', 'pytorch', 'pytorch-optimized', 'onnx' or 'onnx-int8'.")
+
+        for framework, scores in batch_results.items():
+            results[framework].update(scores)
+            if embeddings is not None:
+                for model_name, features in batch_embeddings.get(framework, {}).items():
+                    embeddings.setdefault(framework, {}).setdefault(model_name, {}).update(features)
+        if on_batch is not None:
+            on_batch(batch_results, batch_embeddings)
+        logging.info(f"Processed {processed}/{len(image_paths)} images using {list(model_maps)}.")
+
+    return results
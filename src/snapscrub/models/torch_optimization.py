@@ -0,0 +1,123 @@
+import os
+import logging
+import contextlib
+
+PYTORCH_FRAMEWORKS = ("pytorch", "pytorch-optimized")
+
+
+def configure_torch_threads(num_threads=None, interop_threads=None):
+    """
+    Set PyTorch's intra-op (and optionally inter-op) thread counts.
+
+    By default one intra-op thread is used per CPU available to this process, which
+    avoids oversubscription inside containers or under CPU affinity limits, where
+    ``os.cpu_count()`` reports more cores than can actually be used.
+
+    Parameters:
+        num_threads (int): Intra-op threads; None uses the CPUs available to the process.
+        interop_threads (int): Inter-op threads; None leaves the default (default: None).
+
+    Returns:
+        int: The intra-op thread count in use.
+    """
+    import torch
+
+    if num_threads is None:
+        num_threads = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    torch.set_num_threads(num_threads)
+    if interop_threads is not None:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            # Only allowed before any inter-op parallel work has started
+            logging.warning(f"Could not set inter-op threads: {e}")
+    return torch.get_num_threads()
+
+
+class OptimizedTorchModel:
+    """
+    PyTorch model prepared once for fast CPU inference.
+
+    Calls run under ``torch.inference_mode`` with channels_last inputs and optional
+    bfloat16 autocast. ``eval()`` is a no-op, so the wrapper can be used wherever the
+    native PyTorch models are.
+
+    Parameters:
+        module: The prepared (traced, compiled or eager) module.
+        model_bytes (int): Size of the original parameters, for the model cache budget.
+        channels_last (bool): Convert inputs to channels_last memory format.
+        bf16 (bool): Run under bfloat16 autocast.
+    """
+
+    def __init__(self, module, model_bytes, channels_last=True, bf16=False):
+        self.module = module
+        self.model_bytes = model_bytes
+        self.channels_last = channels_last
+        self.bf16 = bf16
+
+    def eval(self):
+        return self
+
+    def __call__(self, batch):
+        import torch
+
+        autocast = torch.autocast("cpu", dtype=torch.bfloat16) if self.bf16 else contextlib.nullcontext()
+        with torch.inference_mode(), autocast:
+            if self.channels_last:
+                batch = batch.contiguous(memory_format=torch.channels_last)
+            features = self.module(batch)
+        return features.float()
+
+
+def optimize_torch_model(model, mode="trace", channels_last=True, bf16=False, example_batch_size=2):
+    """
+    Prepare a PyTorch model once for CPU inference.
+
+    The model is switched to eval mode and, with ``channels_last``, converted to the
+    channels_last memory format preferred by oneDNN convolutions. Then, depending on
+    ``mode``:
+
+    - 'trace': TorchScript trace, frozen (which folds batch norms into convolutions)
+      and passed through ``optimize_for_inference``.
+    - 'compile': ``torch.compile`` (the first batches pay the compilation cost).
+    - None: the eager model.
+
+    If tracing or compiling fails, the eager model is used and a warning is logged.
+
+    Parameters:
+        model: A PyTorch module.
+        mode (str): 'trace', 'compile' or None (default: 'trace').
+        channels_last (bool): Use channels_last memory format (default: True).
+        bf16 (bool): Run under bfloat16 autocast; scores then differ slightly (default: False).
+        example_batch_size (int): Batch size of the example input used for tracing.
+
+    Returns:
+        OptimizedTorchModel: The prepared model.
+    """
+    import torch
+
+    model.eval()
+    model_bytes = sum(t.numel() * t.element_size() for t in list(model.parameters()) + list(model.buffers()))
+    memory_format = torch.channels_last if channels_last else torch.contiguous_format
+    if channels_last:
+        model = model.to(memory_format=memory_format)
+
+    prepared = model
+    try:
+        if mode == "trace":
+            example = torch.zeros(example_batch_size, 3, 224, 224).contiguous(memory_format=memory_format)
+            autocast = torch.autocast("cpu", dtype=torch.bfloat16) if bf16 else contextlib.nullcontext()
+            with torch.no_grad(), autocast:
+                traced = torch.jit.trace(model, example, check_trace=False)
+            prepared = torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+        elif mode == "compile":
+            prepared = torch.compile(model)
+        elif mode is not None:
+            raise ValueError("Unsupported mode. Choose 'trace', 'compile' or None.")
+    except ValueError:
+        raise
+    except Exception as e:
+        logging.warning(f"Falling back to the eager model ({mode} failed: {e})")
+        prepared = model
+
+    return OptimizedTorchModel(prepared, model_bytes, channels_last, bf16)
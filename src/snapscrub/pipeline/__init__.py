@@ -0,0 +1,11 @@
+from src.snapscrub.utils.lazy_imports import lazy_exports
+
+# Names are imported on first access so that importing the package stays cheap
+lazy_exports(__name__, {
+    "Stage": ".runner",
+    "PipelineRunner": ".runner",
+    "fingerprint_paths": ".runner",
+    "StreamStage": ".streaming",
+    "run_stream": ".streaming",
+    "stream_ingest": ".stream_ingest",
+})
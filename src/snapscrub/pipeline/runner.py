@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+Stage = namedtuple("Stage", ["name", "function", "depends", "inputs", "outputs", "params", "clean_outputs"])
+Stage.__new__.__defaults__ = ((), (), (), None, False)
+Stage.__doc__ = """
+A step of the pipeline.
+
+Parameters:
+    name (str): Unique stage name (also the manifest file name).
+    function (callable): Called without arguments to run the stage.
+    depends (tuple): Names of the stages that must complete first.
+    inputs (tuple): Files or folders the stage reads; their fingerprint is part of the stage key.
+    outputs (tuple): Files or folders the stage writes; they must exist for the stage to be skipped.
+    params (dict): JSON-serializable settings; changing them reruns the stage.
+    clean_outputs (bool): Delete the outputs before running the stage (default: False).
+"""
+
+
+def fingerprint_paths(paths):
+    """
+    Fingerprint files and folders from their names, sizes and modification times.
+
+    Folders are walked recursively. File contents are not read, so fingerprinting a
+    large photo folder only costs one ``stat`` per file.
+
+    Parameters:
+        paths (iterable): Files or folders; missing paths are part of the fingerprint.
+
+    Returns:
+        str: Hexadecimal BLAKE2b digest.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        digest.update(f"{path}\0".encode())
+        if os.path.isdir(path):
+            for directory, subdirectories, files in os.walk(path):
+                subdirectories.sort()
+                for file_name in sorted(files):
+                    file_path = os.path.join(directory, file_name)
+                    try:
+                        stat = os.stat(file_path)
+                    except OSError:
+                        continue
+                    relative = os.path.relpath(file_path, path)
+                    digest.update(f"{relative}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode())
+        elif os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f"{stat.st_size}\0{stat.st_mtime_ns}\0".encode())
+        else:
+            digest.update(b"missing\0")
+    return digest.hexdigest()
+
+
+class PipelineRunner:
+    """
+    Run a graph of stages, skipping the stages completed by an earlier run.
+
+    After a stage succeeds, a JSON manifest is written to ``state_dir/<stage>.json``
+    with the stage key and a run id. The key combines the stage parameters, the
+    fingerprint of its inputs and the run ids of the stages it depends on. On the next
+    run, a stage is skipped when its key is unchanged and its outputs exist, so after a
+    crash the pipeline resumes from the first stage that did not complete. A stage that
+    runs again gets a new run id, which reruns everything downstream of it.
+
+    Inputs are fingerprinted after the stage completes, so a stage that edits its
+    inputs in place (duplicate removal moving files out of the resized folder) is still
+    up to date on the next run.
+
+    Independent stages whose dependencies are complete run concurrently on a thread
+    pool of ``max_workers`` threads; a linear graph runs one stage at a time.
+
+    Parameters:
+        stages (list): ``Stage`` definitions.
+        state_dir (str): Folder of the stage manifests (created if missing).
+        max_workers (int): Maximum number of stages running at once (default: 2).
+    """
+
+    def __init__(self, stages, state_dir, max_workers=2):
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Stage names must be unique.")
+        for stage in stages:
+            unknown = [name for name in stage.depends if name not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages: {unknown}")
+        self.order = self._topological_order()
+        self.state_dir = state_dir
+        self.max_workers = max_workers
+        os.makedirs(state_dir, exist_ok=True)
+
+    def _topological_order(self):
+        order = []
+        state = {}
+
+        def visit(name):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Stage dependencies form a cycle through {name}.")
+            state[name] = "visiting"
+            for dependency in self.stages[name].depends:
+                visit(dependency)
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _manifest_path(self, name):
+        return os.path.join(self.state_dir, f"{name}.json")
+
+    def load_manifest(self, name):
+        """
+        Return the manifest of a completed stage, or None.
+        """
+        try:
+            with open(self._manifest_path(name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, name, manifest):
+        partial_path = f"{self._manifest_path(name)}.partial"
+        with open(partial_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(partial_path, self._manifest_path(name))
+
+    def _stage_key(self, stage, run_ids):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(json.dumps(stage.params, sort_keys=True, default=str).encode())
+        digest.update(fingerprint_paths(stage.inputs).encode())
+        for dependency in stage.depends:
+            digest.update(f"{dependency}\0{run_ids[dependency]}\0".encode())
+        return digest.hexdigest()
+
+    def _is_complete(self, stage, run_ids):
+        manifest = self.load_manifest(stage.name)
+        return (
+            manifest is not None
+            and manifest.get("key") == self._stage_key(stage, run_ids)
+            and all(os.path.exists(path) for path in stage.outputs)
+        )
+
+    def _run_stage(self, stage):
+        if stage.clean_outputs:
+            for path in stage.outputs:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                    os.makedirs(path)
+                elif os.path.exists(path):
+                    os.remove(path)
+        # A stage that starts again is no longer complete, even if it fails
+        if os.path.exists(self._manifest_path(stage.name)):
+            os.remove(self._manifest_path(stage.name))
+        start = time.perf_counter()
+        stage.function()
+        return time.perf_counter() - start
+
+    def run(self, force=()):
+        """
+        Run every stage that is not up to date, concurrently where dependencies allow.
+
+        Parameters:
+            force (iterable): Names of stages to run even if they are up to date.
+
+        Returns:
+            dict: Status of every stage: 'skipped', 'completed', 'failed' or 'not run'.
+
+        Raises:
+            Exception: The error of the first failed stage, after the running stages finish.
+        """
+        force = set(force)
+        run_ids = {}
+        status = {name: "not run" for name in self.order}
+        remaining = list(self.order)
+        running = {}
+        error = None
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            while remaining or running:
+                # Start every stage whose dependencies have completed
+                for name in list(remaining):
+                    if error is not None:
+                        break
+                    stage = self.stages[name]
+                    if not all(status[dependency] in ("skipped", "completed") for dependency in stage.depends):
+                        continue
+                    remaining.remove(name)
+                    if name not in force and self._is_complete(stage, run_ids):
+                        run_ids[name] = self.load_manifest(name)["run_id"]
+                        status[name] = "skipped"
+                        logging.info(f"Stage {name}: up to date, skipped.")
+                        continue
+                    logging.info(f"Stage {name}: running...")
+                    running[executor.submit(self._run_stage, stage)] = name
+
+                # Stages are visited in dependency order, so nothing running means nothing left to start
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    stage = self.stages[name]
+                    try:
+                        seconds = future.result()
+                    except Exception as e:
+                        status[name] = "failed"
+                        logging.error(f"Stage {name} failed: {e}")
+                        error = error or e
+                        continue
+                    run_ids[name] = uuid.uuid4().hex
+                    self._write_manifest(name, {
+                        "stage": name,
+                        "key": self._stage_key(stage, run_ids),
+                        "run_id": run_ids[name],
+                        "completed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "seconds": round(seconds, 3),
+                    })
+                    status[name] = "completed"
+                    logging.info(f"Stage {name}: completed in {seconds:.1f} s.")
+
+        if error is not None:
+            raise error
+        return status
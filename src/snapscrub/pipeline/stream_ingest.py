@@ -0,0 +1,219 @@
+import os
+import csv
+import logging
+from collections import namedtuple
+from src.snapscrub.data.fused_ingest import clear_folder, ingest_image, plan_ingest
+from src.snapscrub.models.get_model_map import get_model_map, model_score_version, MODEL_NAMES, SHARED_DECODE
+from src.snapscrub.models.shared_preprocessing import evaluate_shared_batches
+from src.snapscrub.pipeline.streaming import StreamStage, run_stream
+from src.snapscrub.utils.feature_extraction import extract_image_features
+
+MAPPING_COLUMNS = ["original_name", "file_name", "capture_time", "capture_time_source"]
+
+StreamedImage = namedtuple("StreamedImage", ["original_name", "file_name", "resized_path", "capture_time",
+                                             "capture_time_source", "features"])
+StreamedImage.__new__.__defaults__ = (None,)
+
+
+def _ingest_item(task):
+    """
+    Ingest one source image (runs in a worker process).
+    """
+    original_name, (source_path, converted_path, resized_path, size, target_format) = task
+    result = ingest_image(source_path, converted_path, resized_path, size, target_format)
+    if result is None:
+        return None
+    return StreamedImage(original_name, os.path.basename(resized_path), resized_path, result[0], result[1])
+
+
+def _extract_item(item):
+    """
+    Extract the duplicate-detection features of a resized image (runs in a worker process).
+    """
+    features = extract_image_features(item.resized_path)
+    if features is None:
+        return item
+    # Grayscale arrays are not stored; dropping them keeps the queues small
+    return item._replace(features=features._replace(gray=None))
+
+
+class _StreamScorer:
+    """
+    Score batches of streamed images and keep their scores and embeddings.
+
+    Scores go to the feature store as soon as a batch is scored; embeddings are
+    buffered and appended to the embedding store every ``flush_size`` images. Both
+    are stored under the shared-decode version of each framework, the one
+    ``predict_and_generate_logs`` reads, so the scoring stage reuses them.
+    """
+
+    def __init__(self, frameworks, feature_store, embedding_store, batch_size, num_workers, flush_size):
+        self.frameworks = list(frameworks)
+        self.feature_store = feature_store
+        self.embedding_store = embedding_store
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.flush_size = flush_size
+        self.model_maps = {framework: get_model_map(framework) for framework in self.frameworks}
+        self.versions = {framework: model_score_version(framework, SHARED_DECODE) for framework in self.frameworks}
+        self.stored_hashes = {}
+        if embedding_store is not None:
+            for framework, version in self.versions.items():
+                for model in MODEL_NAMES[framework]:
+                    self.stored_hashes[framework, model] = set(embedding_store.content_hashes(version, model))
+        self.embeddings = {}
+        self.buffered = 0
+
+    def _is_scored(self, content_hash):
+        for framework in self.frameworks:
+            for model in MODEL_NAMES[framework]:
+                if self.feature_store.get_scores([content_hash], model, self.versions[framework])[0] is None:
+                    return False
+                if self.embedding_store is not None and content_hash not in self.stored_hashes[framework, model]:
+                    return False
+        return True
+
+    def __call__(self, items):
+        # Images are passed on even if scoring fails; the later scoring stages then score them
+        try:
+            self._score(items)
+        except Exception as e:
+            logging.error(f"Error scoring a batch of {len(items)} streamed images: {e}")
+        return items
+
+    def _score(self, items):
+        paths = [item.resized_path for item in items]
+        content_hashes = dict(zip(paths, self.feature_store.content_hashes(paths)))
+        pending = [item.resized_path for item in items
+                   if content_hashes[item.resized_path] is not None
+                   and not self._is_scored(content_hashes[item.resized_path])]
+        if not pending:
+            return
+
+        embeddings = {} if self.embedding_store is not None else None
+        computed = evaluate_shared_batches(pending, self.model_maps, self.batch_size, self.num_workers, embeddings)
+        for framework, scores_by_path in computed.items():
+            for model in MODEL_NAMES[framework]:
+                scored = [path for path in pending if model in scores_by_path.get(path, {})]
+                hashes = [content_hashes[path] for path in scored]
+                self.feature_store.put_scores(hashes, model, self.versions[framework],
+                                              [scores_by_path[path][model] for path in scored])
+
+        if embeddings is not None:
+            for framework, by_model in embeddings.items():
+                for model, features_by_path in by_model.items():
+                    self.embeddings.setdefault((framework, model), {}).update(
+                        (content_hashes[path], (os.path.basename(path), features))
+                        for path, features in features_by_path.items()
+                    )
+            self.buffered += len(pending)
+            if self.buffered >= self.flush_size:
+                self.flush()
+
+    def flush(self):
+        """
+        Append the buffered embeddings to the embedding store.
+        """
+        for (framework, model), features_by_hash in self.embeddings.items():
+            hashes = list(features_by_hash)
+            self.embedding_store.put(self.versions[framework], model, hashes,
+                                     [features_by_hash[h][1] for h in hashes],
+                                     file_names=[features_by_hash[h][0] for h in hashes])
+            self.stored_hashes[framework, model].update(hashes)
+        self.embeddings = {}
+        self.buffered = 0
+
+
+def stream_ingest(source_folder, converted_folder, resized_folder, mapping_path, feature_store=None,
+                  embedding_store=None, frameworks=(), size=(256, 256), target_format="jpeg", workers=None,
+                  skip_exact_duplicates=True, queue_size=64, batch_size=32, num_workers=2, flush_size=1024):
+    """
+    Ingest source images and precompute their features and scores in overlapping stages.
+
+    Produces the same folders and name mapping CSV as ``ingest_images``, but instead of
+    finishing the whole folder before the next step starts, every image flows through
+    the steps as soon as it is ready (see ``run_stream``):
+
+    1. ingest (process pool): decode, convert and resize the source image;
+    2. features (process pool): extract the pHash, histogram, sharpness and exposure
+       of the resized image;
+    3. store (thread): write the features to the feature store;
+    4. score (thread, optional): run the models of ``frameworks`` on batches of images
+       and store their scores and embeddings under the same versions as
+       ``predict_and_generate_logs``;
+    5. record (thread): append the image to the name mapping CSV.
+
+    The later pipeline stages read the stored features and scores instead of computing
+    them again, so duplicate removal and scoring mostly reduce to cache lookups. The
+    queues between steps are bounded and the CSV is written as images complete, so
+    memory does not grow with the number of images; the embeddings are buffered for at
+    most ``flush_size`` images.
+
+    Parameters:
+        source_folder (str): Folder containing the source images.
+        converted_folder (str): Folder receiving the full-size normalized images.
+        resized_folder (str): Folder receiving the resized images.
+        mapping_path (str): Path to save the name mapping CSV.
+        feature_store (FeatureStore): Store receiving features and scores; without it
+            only the ingest and record steps run (default: None).
+        embedding_store (EmbeddingStore): Optional store receiving the model embeddings (default: None).
+        frameworks (tuple): Frameworks whose models score the images, e.g.
+            ``("tensorflow", "pytorch")``; empty skips scoring (default: ()).
+        size (tuple): Size of the resized images (width, height) (default: 256x256).
+        target_format (str): Format of the outputs (default: 'jpeg').
+        workers (int): Processes of the ingest step; the features step gets half (default: CPU count).
+        skip_exact_duplicates (bool): Skip byte-identical source files (default: True).
+        queue_size (int): Capacity of the queues between steps (default: 64).
+        batch_size (int): Number of images per forward pass (default: 32).
+        num_workers (int): Decoding threads of the scoring step (default: 2).
+        flush_size (int): Number of images whose embeddings are buffered before writing (default: 1024).
+
+    Returns:
+        list: Statistics per step, as returned by ``run_stream``.
+    """
+    if not os.path.exists(source_folder):
+        logging.error(f"Source folder '{source_folder}' does not exist.")
+        return []
+
+    clear_folder(converted_folder)
+    clear_folder(resized_folder)
+    source_files, tasks = plan_ingest(source_folder, converted_folder, resized_folder, size, target_format,
+                                      skip_exact_duplicates)
+    workers = workers or os.cpu_count() or 1
+
+    def store_features(items):
+        done = [item for item in items if item.features is not None]
+        try:
+            hashes = feature_store.content_hashes([item.resized_path for item in done])
+            feature_store.put_features(hashes, [item.features for item in done])
+        except Exception as e:
+            logging.error(f"Error storing features of {len(done)} streamed images: {e}")
+        # Features are in the store now; only the names travel further
+        return [item._replace(features=None) for item in items]
+
+    stages = [StreamStage("ingest", _ingest_item, workers=workers, kind="process")]
+    if feature_store is not None:
+        stages.append(StreamStage("features", _extract_item, workers=max(1, workers // 2), kind="process"))
+        stages.append(StreamStage("store", store_features, batch_size=64))
+    scorer = None
+    if feature_store is not None and frameworks:
+        scorer = _StreamScorer(frameworks, feature_store, embedding_store, batch_size, num_workers, flush_size)
+        stages.append(StreamStage("score", scorer, batch_size=batch_size))
+
+    logging.info(f"Streaming {len(tasks)} images through {[stage.name for stage in stages]}...")
+    with open(mapping_path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(MAPPING_COLUMNS)
+
+        def record(item):
+            writer.writerow([item.original_name, item.file_name, item.capture_time, item.capture_time_source])
+            return item
+
+        stages.append(StreamStage("record", record))
+        stats = run_stream(zip(source_files, tasks), stages, queue_size=queue_size)
+
+    if scorer is not None and embedding_store is not None:
+        scorer.flush()
+    logging.info(f"Streaming ingest completed: {stats[-1]['items']} images ingested, "
+                 f"{len(tasks) - stats[-1]['items']} failed. Name mapping saved to {mapping_path}")
+    return stats
@@ -0,0 +1,203 @@
+import time
+import queue
+import logging
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+StreamStage = namedtuple("StreamStage", ["name", "function", "workers", "kind", "batch_size"])
+StreamStage.__new__.__defaults__ = (1, "thread", None)
+StreamStage.__doc__ = """
+A step of a streaming pipeline.
+
+Parameters:
+    name (str): Stage name (for logging and statistics).
+    function (callable): Called with one item (or a list of items with ``batch_size``);
+        returns the item passed downstream, or None to drop it. Process stages need a
+        picklable module-level function.
+    workers (int): Threads or processes running the stage (default: 1).
+    kind (str): 'thread' for I/O-bound or GIL-releasing work, 'process' for CPU work (default: 'thread').
+    batch_size (int): Group up to this many items per call (thread stages only);
+        the function then returns a list of items (default: None).
+
+Process stages and single-worker thread stages keep the order of the items; thread
+stages with several workers may reorder them.
+"""
+
+_END = object()
+
+
+class _StageStats:
+    """
+    Item count and busy time of a stage, updated by its workers.
+    """
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.dropped = 0
+        self.busy_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, items, dropped, seconds):
+        with self.lock:
+            self.items += items
+            self.dropped += dropped
+            self.busy_seconds += seconds
+
+    def as_dict(self):
+        return {"stage": self.name, "items": self.items, "dropped": self.dropped,
+                "busy_seconds": self.busy_seconds, "workers": self.workers}
+
+
+def _call(stage, stats, payload):
+    """
+    Run a stage function on an item or batch, logging (not raising) item errors.
+    """
+    start = time.perf_counter()
+    try:
+        result = stage.function(payload)
+    except Exception as e:
+        logging.error(f"Stage {stage.name} failed on an item: {e}")
+        result = None
+    size = len(payload) if stage.batch_size else 1
+    outputs = [] if result is None else (list(result) if stage.batch_size else [result])
+    stats.add(size, size - len(outputs), time.perf_counter() - start)
+    return outputs
+
+
+def _run_thread_stage(stage, stats, inbox, outbox, finished):
+    """
+    Worker loop of a thread stage; the last worker to finish forwards the end marker.
+    """
+    ended = False
+    while not ended:
+        item = inbox.get()
+        if item is _END:
+            break
+        payload = item
+        if stage.batch_size:
+            # Block until the batch is full so the stage (e.g. inference) sees full batches
+            payload = [item]
+            while len(payload) < stage.batch_size:
+                item = inbox.get()
+                if item is _END:
+                    ended = True
+                    break
+                payload.append(item)
+        for output in _call(stage, stats, payload):
+            outbox.put(output)
+
+    # Let the other workers of this stage see the end marker too
+    inbox.put(_END)
+    with finished["lock"]:
+        finished["count"] += 1
+        if finished["count"] == stage.workers:
+            outbox.put(_END)
+
+
+def _timed_call(function, item):
+    """
+    Run a stage function in a worker process and measure its busy time.
+    """
+    start = time.perf_counter()
+    return function(item), time.perf_counter() - start
+
+
+def _run_process_stage(stage, stats, inbox, outbox):
+    """
+    Feed a process pool from a queue, keeping at most two tasks per process in flight.
+    """
+    in_flight = deque()
+
+    def collect():
+        future = in_flight.popleft()
+        seconds = 0.0
+        try:
+            result, seconds = future.result()
+        except Exception as e:
+            logging.error(f"Stage {stage.name} failed on an item: {e}")
+            result = None
+        stats.add(1, result is None, seconds)
+        if result is not None:
+            outbox.put(result)
+
+    ended = False
+    try:
+        with ProcessPoolExecutor(max_workers=stage.workers) as executor:
+            while True:
+                item = inbox.get()
+                if item is _END:
+                    ended = True
+                    break
+                in_flight.append(executor.submit(_timed_call, stage.function, item))
+                while len(in_flight) >= 2 * stage.workers:
+                    collect()
+            while in_flight:
+                collect()
+    except Exception as e:
+        # A broken pool fails the rest of the stage; upstream stages must not block on it
+        logging.error(f"Stage {stage.name} stopped: {e}")
+        while not ended:
+            ended = inbox.get() is _END
+    finally:
+        outbox.put(_END)
+
+
+def run_stream(items, stages, queue_size=64):
+    """
+    Run items through a chain of stages that all work at the same time.
+
+    Stages are connected by bounded queues of ``queue_size`` items, and process stages
+    keep at most two tasks per process in flight, so memory does not grow with the
+    number of items: a fast stage blocks when the next one falls behind. The wall time
+    approaches that of the slowest stage instead of the sum of all stages. Item errors
+    are logged and the item is dropped; the stream continues.
+
+    Parameters:
+        items (iterable): Items fed to the first stage (consumed lazily).
+        stages (list): ``StreamStage`` definitions, in order.
+        queue_size (int): Capacity of every queue between stages (default: 64).
+
+    Returns:
+        list: Statistics per stage: items, dropped items, busy seconds and workers.
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    stats = [_StageStats(stage.name, stage.workers) for stage in stages]
+    threads = []
+
+    for idx, stage in enumerate(stages):
+        if stage.kind == "process":
+            threads.append(threading.Thread(target=_run_process_stage, daemon=True,
+                                            args=(stage, stats[idx], queues[idx], queues[idx + 1])))
+        elif stage.kind == "thread":
+            finished = {"count": 0, "lock": threading.Lock()}
+            for _ in range(stage.workers):
+                threads.append(threading.Thread(target=_run_thread_stage, daemon=True,
+                                                args=(stage, stats[idx], queues[idx], queues[idx + 1], finished)))
+        else:
+            raise ValueError("Unsupported stage kind. Choose 'thread' or 'process'.")
+
+    # The last queue is drained here, so the final stage never blocks
+    def drain():
+        while queues[-1].get() is not _END:
+            pass
+
+    threads.append(threading.Thread(target=drain, daemon=True))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for item in items:
+        queues[0].put(item)
+    queues[0].put(_END)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    for stage_stats in stats:
+        logging.info(f"Stream stage {stage_stats.name}: {stage_stats.items} items "
+                     f"({stage_stats.dropped} dropped), busy {stage_stats.busy_seconds:.1f} s "
+                     f"with {stage_stats.workers} workers.")
+    logging.info(f"Stream completed in {elapsed:.1f} s.")
+    return [stage_stats.as_dict() for stage_stats in stats]
@@ -1 +1,6 @@
-from .transfer_images import transfer_top_images_by_framework
\ No newline at end of file
+from src.snapscrub.utils.lazy_imports import lazy_exports
+
+# Names are imported on first access so that importing the package stays cheap
+lazy_exports(__name__, {
+    "transfer_top_images_by_framework": ".transfer_images",
+})
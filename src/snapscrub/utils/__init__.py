@@ -1,3 +1,36 @@
-from .calculate_phash import calculate_phash
-from .calculate_histogram_similarity import calculate_histogram_similarity
-from .calculate_structural_similarity import calculate_structural_similarity
\ No newline at end of file
+from src.snapscrub.utils.lazy_imports import lazy_exports
+
+# Names are imported on first access so that importing the package stays cheap
+lazy_exports(__name__, {
+    "calculate_phash": ".calculate_phash",
+    "calculate_histogram_similarity": ".calculate_histogram_similarity",
+    "calculate_structural_similarity": ".calculate_structural_similarity",
+    "find_similar_hash_pairs": ".hash_index",
+    "FeatureArrays": ".feature_extraction",
+    "ImageFeatures": ".feature_extraction",
+    "extract_image_features": ".feature_extraction",
+    "extract_features": ".feature_extraction",
+    "iterate_feature_chunks": ".feature_extraction",
+    "FeatureCache": ".feature_cache",
+    "CachedGrays": ".feature_cache",
+    "FeatureStore": ".feature_store",
+    "pack_hashes": ".hamming_distance",
+    "hamming_distance_matrix": ".hamming_distance",
+    "find_hash_pairs_within": ".hamming_distance",
+    "build_histogram_matrix": ".histogram_matrix",
+    "prepare_correlation_matrix": ".histogram_matrix",
+    "histogram_correlation_pairs": ".histogram_matrix",
+    "histogram_correlation_blocks": ".histogram_matrix",
+    "find_histogram_pairs_above": ".histogram_matrix",
+    "BatchedSSIM": ".batched_ssim",
+    "calculate_ssim_pairs": ".batched_ssim",
+    "score_ssim_pairs": ".batched_ssim",
+    "find_ssim_pairs_above": ".batched_ssim",
+    "calculate_content_hash": ".content_hash",
+    "find_exact_duplicates": ".content_hash",
+    "normalize_embeddings": ".embedding_index",
+    "lsh_bucket_codes": ".embedding_index",
+    "find_embedding_pairs_above": ".embedding_index",
+    "read_capture_time": ".capture_time",
+    "find_time_window_pairs": ".capture_time",
+})
@@ -1,32 +1,42 @@
 import cv2
 import logging
+from src.snapscrub.utils.feature_extraction import ImageFeatures
+
+def _load_histogram(image):
+    """
+    Return the normalized first-channel histogram of an image path or precomputed features.
+    """
+    if isinstance(image, ImageFeatures):
+        return image.histogram.reshape(-1, 1)
+
+    img = cv2.imread(image)
+    if img is None:
+        return None
+
+    hist = cv2.calcHist([img], [0], None, [256], [0, 256])
+    cv2.normalize(hist, hist)
+    return hist
 
 def calculate_histogram_similarity(image1_path, image2_path):
     """
     Calculate histogram similarity between two images using correlation.
 
     Parameters:
-        image1_path (str): Path to the first image.
-        image2_path (str): Path to the second image.
+        image1_path (str or ImageFeatures): Path to the first image, or its precomputed features.
+        image2_path (str or ImageFeatures): Path to the second image, or its precomputed features.
 
     Returns:
         float: Similarity score (1.0 = identical, 0.0 = completely different).
     """
     try:
-        img1 = cv2.imread(image1_path)
-        img2 = cv2.imread(image2_path)
+        hist1 = _load_histogram(image1_path)
+        hist2 = _load_histogram(image2_path)
 
-        if img1 is None or img2 is None:
+        if hist1 is None or hist2 is None:
             return 0.0
 
-        hist1 = cv2.calcHist([img1], [0], None, [256], [0, 256])
-        hist2 = cv2.calcHist([img2], [0], None, [256], [0, 256])
-
-        cv2.normalize(hist1, hist1)
-        cv2.normalize(hist2, hist2)
-
         similarity = cv2.compareHist(hist1, hist2, cv2.HISTCMP_CORREL)
         return similarity
     except Exception as e:
         logging.error(f"Error calculating histogram similarity: {e}")
-        return 0.0
\ No newline at end of file
+        return 0.0
@@ -1,30 +1,40 @@
 import cv2
 import logging
-from skimage.metrics import structural_similarity as ssim
+import numpy as np
+from src.snapscrub.utils.batched_ssim import calculate_ssim_pairs
+from src.snapscrub.utils.feature_extraction import ImageFeatures
+
+def _load_gray(image):
+    """
+    Return the 256x256 grayscale array of an image path or precomputed features.
+    """
+    if isinstance(image, ImageFeatures):
+        return image.gray
+
+    img = cv2.imread(image, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return None
+    return cv2.resize(img, (256, 256))
 
 def calculate_structural_similarity(image1_path, image2_path):
     """
     Calculate the Structural Similarity Index (SSIM) between two images.
 
     Parameters:
-        image1_path (str): Path to the first image.
-        image2_path (str): Path to the second image.
+        image1_path (str or ImageFeatures): Path to the first image, or its precomputed features.
+        image2_path (str or ImageFeatures): Path to the second image, or its precomputed features.
 
     Returns:
         float: SSIM similarity score (0 to 1).
     """
     try:
-        img1 = cv2.imread(image1_path, cv2.IMREAD_GRAYSCALE)
-        img2 = cv2.imread(image2_path, cv2.IMREAD_GRAYSCALE)
+        img1 = _load_gray(image1_path)
+        img2 = _load_gray(image2_path)
 
         if img1 is None or img2 is None:
             return 0.0
 
-        img1 = cv2.resize(img1, (256, 256))
-        img2 = cv2.resize(img2, (256, 256))
-
-        score, _ = ssim(img1, img2, full=True)
-        return score
+        return float(calculate_ssim_pairs(np.stack([img1, img2]), [0], [1])[0])
     except Exception as e:
         logging.error(f"Error calculating SSIM: {e}")
-        return 0.0
\ No newline at end of file
+        return 0.0
@@ -0,0 +1,99 @@
+import os
+import logging
+import numpy as np
+from datetime import datetime
+from PIL import Image
+
+EXIF_IFD = 0x8769
+DATETIME_ORIGINAL = 36867
+DATETIME = 306
+
+
+def parse_exif_datetime(value):
+    """
+    Parse an EXIF date (``YYYY:MM:DD HH:MM:SS``) into POSIX seconds, as local time.
+
+    Parameters:
+        value (str): EXIF date string.
+
+    Returns:
+        float: Seconds since the epoch, or None if the value cannot be parsed.
+    """
+    try:
+        return datetime.strptime(str(value).strip("\x00 ")[:19], "%Y:%m:%d %H:%M:%S").timestamp()
+    except (ValueError, OverflowError):
+        return None
+
+
+def read_capture_time(image_path):
+    """
+    Read when an image was taken.
+
+    Uses EXIF DateTimeOriginal (or the EXIF DateTime tag) and falls back to the file
+    modification time, which ``copy_to_original`` and ``process_images`` preserve.
+
+    Parameters:
+        image_path (str): Path to the image file.
+
+    Returns:
+        tuple: ``(seconds, source)`` with POSIX seconds and 'exif' or 'mtime', or
+        ``(None, None)`` if the file cannot be read.
+    """
+    try:
+        with Image.open(image_path) as img:
+            exif = img.getexif()
+            value = exif.get_ifd(EXIF_IFD).get(DATETIME_ORIGINAL) or exif.get(DATETIME)
+        seconds = parse_exif_datetime(value) if value else None
+        if seconds is not None:
+            return seconds, "exif"
+    except Exception as e:
+        logging.debug(f"Could not read EXIF of {image_path}: {e}")
+
+    try:
+        return os.path.getmtime(image_path), "mtime"
+    except OSError as e:
+        logging.error(f"Error reading capture time of {image_path}: {e}")
+        return None, None
+
+
+def find_time_window_pairs(capture_times, window):
+    """
+    Find all pairs of images taken at most ``window`` seconds apart.
+
+    Times are sorted once and each image is paired with the images following it until
+    the window is exceeded, so the cost is O(n log n + n * w) for w images per window
+    instead of O(n^2). Images without a capture time are paired with every image.
+
+    Parameters:
+        capture_times (list): POSIX seconds per image (None if unknown).
+        window (float): Maximum time difference in seconds (inclusive).
+
+    Returns:
+        tuple: Arrays ``(rows, cols)`` with ``rows < cols``, sorted by (row, col).
+    """
+    n = len(capture_times)
+    times = np.array([np.nan if t is None else t for t in capture_times], dtype=np.float64)
+    known = np.flatnonzero(~np.isnan(times))
+    order = known[np.argsort(times[known], kind="stable")]
+    sorted_times = times[order]
+
+    ends = np.searchsorted(sorted_times, sorted_times + window, side="right")
+    counts = ends - np.arange(len(order)) - 1
+    firsts = np.repeat(np.arange(len(order)), counts)
+    # Offset of every pair within its row: 1, 2, ..., counts[i]
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+    first, second = order[firsts], order[firsts + offsets]
+    rows, cols = [np.minimum(first, second)], [np.maximum(first, second)]
+
+    for idx in np.flatnonzero(np.isnan(times)):
+        others = np.delete(np.arange(n), idx)
+        # Pairs between two unknown times are added once, by the smaller index
+        others = others[~np.isnan(times[others]) | (others > idx)]
+        rows.append(np.minimum(idx, others))
+        cols.append(np.maximum(idx, others))
+
+    rows = np.concatenate(rows).astype(np.int64)
+    cols = np.concatenate(cols).astype(np.int64)
+    order = np.lexsort((cols, rows))
+    logging.info(f"Capture-time window ({window} s): {len(rows)} pairs instead of {n * (n - 1) // 2}.")
+    return rows[order], cols[order]
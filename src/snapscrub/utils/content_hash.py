@@ -0,0 +1,57 @@
+import os
+import hashlib
+import logging
+
+def calculate_content_hash(file_path, chunk_size=1024 * 1024):
+    """
+    Calculate a BLAKE2b hash of a file's bytes, reading it in chunks.
+
+    Parameters:
+        file_path (str): Path to the file.
+        chunk_size (int): Number of bytes read per chunk (default: 1 MB).
+
+    Returns:
+        str: Hexadecimal digest, or None if the file cannot be read.
+    """
+    try:
+        digest = hashlib.blake2b(digest_size=32)
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    except Exception as e:
+        logging.error(f"Error calculating content hash for {file_path}: {e}")
+        return None
+
+def find_exact_duplicates(file_paths):
+    """
+    Group byte-identical files without decoding them.
+
+    Files are first grouped by size; only files sharing a size are hashed, so most
+    unique files are never read.
+
+    Parameters:
+        file_paths (list): Paths of the files to check.
+
+    Returns:
+        list: Groups of two or more identical file paths, each sorted, ordered by first path.
+    """
+    by_size = {}
+    for file_path in file_paths:
+        try:
+            by_size.setdefault(os.path.getsize(file_path), []).append(file_path)
+        except OSError as e:
+            logging.warning(f"Could not read size of {file_path}: {e}")
+
+    groups = []
+    for same_size in by_size.values():
+        if len(same_size) < 2:
+            continue
+        by_hash = {}
+        for file_path in same_size:
+            content_hash = calculate_content_hash(file_path)
+            if content_hash is not None:
+                by_hash.setdefault(content_hash, []).append(file_path)
+        groups.extend(sorted(group) for group in by_hash.values() if len(group) > 1)
+
+    return sorted(groups)
@@ -0,0 +1,117 @@
+import logging
+import numpy as np
+
+
+def normalize_embeddings(embeddings, valid=None):
+    """
+    L2-normalize embeddings so that dot products equal cosine similarities.
+
+    Parameters:
+        embeddings (np.ndarray): Array of shape (N, D).
+        valid (np.ndarray): Optional boolean mask of usable embeddings.
+
+    Returns:
+        tuple: ``(normalized, valid)`` with float32 unit rows and the mask of usable
+        rows (zero vectors are marked invalid).
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    usable = norms[:, 0] > np.finfo(np.float32).eps
+    if valid is not None:
+        usable &= np.asarray(valid, dtype=bool)
+    normalized = np.divide(embeddings, norms, out=np.zeros_like(embeddings), where=usable[:, None])
+    return normalized, usable
+
+
+def lsh_bucket_codes(normalized, num_tables=16, num_bits=8, seed=0, center=True):
+    """
+    Hash unit vectors with random-hyperplane (SimHash) LSH.
+
+    Two vectors at angle ``theta`` get the same bit with probability ``1 - theta / pi``,
+    so near-duplicates share a bucket in at least one table with high probability.
+    Pooled CNN features are non-negative and point in similar directions; with
+    ``center`` the mean direction is subtracted before hashing so the buckets stay
+    balanced.
+
+    Parameters:
+        normalized (np.ndarray): Unit vectors of shape (N, D).
+        num_tables (int): Number of hash tables (default: 16).
+        num_bits (int): Hyperplanes (bits) per table (default: 8).
+        seed (int): Seed of the random hyperplanes (default: 0).
+        center (bool): Subtract the mean vector before hashing (default: True).
+
+    Returns:
+        np.ndarray: int64 bucket codes of shape (num_tables, N).
+    """
+    if num_bits > 62:
+        raise ValueError("num_bits must be at most 62.")
+    vectors = normalized - normalized.mean(axis=0, keepdims=True) if center and len(normalized) else normalized
+    rng = np.random.default_rng(seed)
+    planes = rng.standard_normal((vectors.shape[1], num_tables * num_bits)).astype(np.float32)
+    bits = (vectors @ planes > 0).reshape(len(vectors), num_tables, num_bits)
+    weights = np.left_shift(np.int64(1), np.arange(num_bits, dtype=np.int64))
+    return (bits.astype(np.int64) @ weights).T
+
+
+def find_embedding_pairs_above(embeddings, threshold, valid=None, num_tables=16, num_bits=8, seed=0,
+                               block_size=1024):
+    """
+    Find pairs of embeddings whose cosine similarity is at least a threshold, using LSH.
+
+    Candidates are the pairs sharing a bucket in any table of ``lsh_bucket_codes``;
+    their exact cosine similarity is then computed bucket by bucket, so the cost grows
+    with the bucket sizes instead of with all N^2 pairs. The result is approximate:
+    a pair is missed only if it collides in no table. With the defaults, a pair at
+    cosine similarity 0.9 after centering is missed with probability below 1%; more
+    tables raise the recall, more bits shrink the buckets.
+
+    Parameters:
+        embeddings (np.ndarray): Array of shape (N, D).
+        threshold (float): Minimum cosine similarity (inclusive).
+        valid (np.ndarray): Optional boolean mask of usable embeddings.
+        num_tables (int): Number of hash tables (default: 16).
+        num_bits (int): Hyperplanes (bits) per table (default: 8).
+        seed (int): Seed of the random hyperplanes (default: 0).
+        block_size (int): Rows per similarity tile inside large buckets (default: 1024).
+
+    Returns:
+        tuple: Arrays ``(rows, cols, similarities)`` with ``rows < cols``, sorted by (row, col).
+    """
+    normalized, usable = normalize_embeddings(embeddings, valid)
+    indices = np.flatnonzero(usable)
+    n = len(normalized)
+    keys, similarities = [], []
+    candidates = 0
+
+    if len(indices) > 1:
+        codes = lsh_bucket_codes(normalized[indices], num_tables, num_bits, seed)
+        for table_codes in codes:
+            order = np.argsort(table_codes, kind="stable")
+            boundaries = np.flatnonzero(np.diff(table_codes[order])) + 1
+            for bucket in np.split(order, boundaries):
+                if len(bucket) < 2:
+                    continue
+                members = indices[bucket]
+                candidates += len(members) * (len(members) - 1) // 2
+                vectors = normalized[members]
+                for start in range(0, len(members), block_size):
+                    tile = vectors[start:start + block_size] @ vectors.T
+                    tile_rows, tile_cols = np.nonzero(tile >= threshold)
+                    # Keep the upper triangle of the bucket only
+                    upper = tile_cols > tile_rows + start
+                    tile_rows, tile_cols = tile_rows[upper], tile_cols[upper]
+                    first, second = members[tile_rows + start], members[tile_cols]
+                    keys.append(np.minimum(first, second).astype(np.int64) * n + np.maximum(first, second))
+                    similarities.append(tile[tile_rows, tile_cols].astype(np.float64))
+
+    logging.info(f"LSH candidate generation: {candidates} bucket pairs in {num_tables} tables "
+                 f"instead of {len(indices) * (len(indices) - 1) // 2}.")
+
+    if not keys:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=np.float64)
+
+    # Pairs found in several tables are kept once; np.unique also sorts them by (row, col)
+    keys, first = np.unique(np.concatenate(keys), return_index=True)
+    similarities = np.concatenate(similarities)[first]
+    return keys // n, keys % n, similarities
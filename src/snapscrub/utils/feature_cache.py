@@ -0,0 +1,209 @@
+from collections import OrderedDict
+from src.snapscrub.utils.feature_extraction import (
+    FEATURE_SIZE, ImageFeatures, extract_image_features, iterate_feature_chunks
+)
+
+class FeatureCache:
+    """
+    Per-run cache that decodes every image at most once while it stays resident.
+
+    pHash values, histograms, sharpness and exposure are small (about 1 KB per image)
+    and are kept for the whole run. Grayscale arrays (64 KB each at 256x256) are held
+    in an LRU bounded by ``max_bytes``; an evicted array is decoded again on next access.
+
+    With a ``FeatureStore``, features of images seen in earlier runs are read from the
+    store instead of being recomputed, and newly computed features are written back.
+    Such images are only decoded if their grayscale array is requested.
+
+    Parameters:
+        max_bytes (int): Memory budget for the cached grayscale arrays (default: 512 MB).
+        size (tuple): Size of the grayscale arrays (width, height).
+        store (FeatureStore): Optional persistent store shared across runs.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024, size=FEATURE_SIZE, store=None):
+        self.max_bytes = max_bytes
+        self.size = size
+        self.store = store
+        self.hashes = {}
+        self.histograms = {}
+        self.sharpness = {}
+        self.exposure = {}
+        self.grays = OrderedDict()
+        self.gray_bytes = 0
+        self.decode_count = 0
+
+    def _load(self, image_path):
+        if self.store is not None:
+            stored = self.store.get_features(self.store.content_hashes([image_path]))[0]
+            if stored is not None:
+                self._store(image_path, stored)
+                return stored
+        return self._decode(image_path)
+
+    def _decode(self, image_path):
+        features = extract_image_features(image_path, self.size)
+        self.decode_count += 1
+        if self.store is not None and image_path not in self.hashes:
+            self.store.put_features(self.store.content_hashes([image_path]), [features])
+        self._store(image_path, features)
+        return features
+
+    def _store(self, image_path, features):
+        if features is None:
+            self.hashes[image_path] = None
+            self.histograms[image_path] = None
+            self.sharpness[image_path] = None
+            self.exposure[image_path] = None
+            return
+
+        self.hashes[image_path] = features.phash
+        self.histograms[image_path] = features.histogram
+        self.sharpness[image_path] = features.sharpness
+        self.exposure[image_path] = features.exposure
+        if features.gray is not None:
+            self._store_gray(image_path, features.gray)
+
+    def _store_gray(self, image_path, gray):
+        # Arrays from a prefetched chunk are views that would keep the whole chunk alive
+        # while only their own bytes count against the budget
+        if gray.base is not None:
+            gray = gray.copy()
+        self.grays[image_path] = gray
+        self.gray_bytes += gray.nbytes
+        while self.gray_bytes > self.max_bytes and len(self.grays) > 1:
+            _, evicted = self.grays.popitem(last=False)
+            self.gray_bytes -= evicted.nbytes
+
+    def prefetch(self, image_paths, workers=None, chunk_size=64):
+        """
+        Extract features for many images up front, optionally with a process pool.
+
+        Images found in the feature store are not decoded.
+
+        Parameters:
+            image_paths (list): Paths of the images to load.
+            workers (int): Number of worker processes; None or 1 runs serially (default: None).
+            chunk_size (int): Number of images per worker task (default: 64).
+        """
+        missing = [path for path in image_paths if path not in self.hashes]
+        content_hashes = {}
+        if self.store is not None and missing:
+            hashes = self.store.content_hashes(missing)
+            for path, content_hash, stored in zip(missing, hashes, self.store.get_features(hashes)):
+                if stored is not None:
+                    self._store(path, stored)
+                else:
+                    content_hashes[path] = content_hash
+            missing = list(content_hashes)
+
+        for start, chunk in iterate_feature_chunks(missing, workers=workers, chunk_size=chunk_size, size=self.size):
+            features = chunk.to_features()
+            paths = missing[start:start + len(features)]
+            for path, item in zip(paths, features):
+                self._store(path, item)
+            if self.store is not None:
+                self.store.put_features([content_hashes[path] for path in paths], features)
+            self.decode_count += len(chunk.valid)
+
+    def quality(self, image_path):
+        """
+        Return the sharpness and exposure of an image, decoding it on first access.
+
+        Parameters:
+            image_path (str): Path to the image.
+
+        Returns:
+            tuple: ``(sharpness, exposure)``, or ``(None, None)`` if the image cannot be read.
+        """
+        if image_path not in self.hashes:
+            self._load(image_path)
+        return self.sharpness[image_path], self.exposure[image_path]
+
+    def phash(self, image_path):
+        """
+        Return the hex pHash of an image, decoding it on first access.
+
+        Parameters:
+            image_path (str): Path to the image.
+
+        Returns:
+            str: The perceptual hash, or None if the image cannot be read.
+        """
+        if image_path not in self.hashes:
+            self._load(image_path)
+        return self.hashes[image_path]
+
+    def histogram(self, image_path):
+        """
+        Return the normalized histogram of an image, decoding it on first access.
+
+        Parameters:
+            image_path (str): Path to the image.
+
+        Returns:
+            np.ndarray: 256-bin float32 histogram, or None if the image cannot be read.
+        """
+        if image_path not in self.histograms:
+            self._load(image_path)
+        return self.histograms[image_path]
+
+    def gray(self, image_path):
+        """
+        Return the 256x256 grayscale array of an image, decoding it if not resident.
+
+        Parameters:
+            image_path (str): Path to the image.
+
+        Returns:
+            np.ndarray: uint8 grayscale array, or None if the image cannot be read.
+        """
+        if image_path in self.grays:
+            self.grays.move_to_end(image_path)
+            return self.grays[image_path]
+        if self.hashes.get(image_path, "") is None:
+            return None
+        features = self._decode(image_path)
+        return features.gray if features is not None else None
+
+    def get(self, image_path, load_gray=True):
+        """
+        Return all cached features of an image.
+
+        Parameters:
+            image_path (str): Path to the image.
+            load_gray (bool): Whether the grayscale array is needed (default: True).
+
+        Returns:
+            ImageFeatures: The image features, or None if the image cannot be read.
+        """
+        phash = self.phash(image_path)
+        if phash is None:
+            return None
+        gray = self.gray(image_path) if load_gray else None
+        return ImageFeatures(phash, self.histograms[image_path], gray,
+                             self.sharpness[image_path], self.exposure[image_path])
+
+
+class CachedGrays:
+    """
+    Grayscale arrays of some images, read through a ``FeatureCache`` on access.
+
+    Behaves like an (N, H, W) stack for ``BatchedSSIM`` without holding all arrays
+    in memory: only the cache's byte-bounded LRU is resident.
+
+    Parameters:
+        paths (list): Paths of the images, in stack order.
+        cache (FeatureCache): Cache providing the grayscale arrays.
+    """
+
+    def __init__(self, paths, cache):
+        self.paths = paths
+        self.cache = cache
+        self.shape = (len(paths), cache.size[1], cache.size[0])
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, idx):
+        return self.cache.gray(self.paths[idx])
@@ -0,0 +1,206 @@
+import logging
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import cv2
+import imagehash
+import numpy as np
+from PIL import Image, ImageOps
+
+ImageFeatures = namedtuple("ImageFeatures", ["phash", "histogram", "gray", "sharpness", "exposure"],
+                           defaults=(None, None))
+ImageFeatures.__doc__ = """
+Precomputed features of a single decoded image.
+
+Attributes:
+    phash (str): Hex-encoded perceptual hash.
+    histogram (np.ndarray): L2-normalized 256-bin histogram of the first (blue) channel, float32.
+    gray (np.ndarray): Grayscale image resized to 256x256, uint8 (None if not loaded).
+    sharpness (float): Laplacian variance of the full-size grayscale image.
+    exposure (float): Mean brightness of the full-size grayscale image.
+"""
+
+FEATURE_SIZE = (256, 256)
+
+EXIF_ORIENTATION = 0x0112
+
+# Bump when the pHash, histogram, sharpness or exposure computation changes
+FEATURE_VERSION = "3"
+
+
+def extract_image_features(image_path, size=FEATURE_SIZE):
+    """
+    Decode an image once and compute its pHash, histogram, grayscale array, sharpness and exposure.
+
+    The pHash is computed from the decoded PIL image, exactly as ``calculate_phash``
+    does. The other features are computed with OpenCV from the same pixels, rotated by
+    their EXIF orientation as ``cv2.imread`` does, and the grayscale image is the
+    ``COLOR_RGB2GRAY`` conversion of the color decode. ``calculate_sharpness`` and
+    ``calculate_structural_similarity`` decode a second time with ``IMREAD_GRAYSCALE``,
+    which differs from that conversion by a few levels per pixel (sharpness by about 1%).
+
+    Parameters:
+        image_path (str): Path to the image.
+        size (tuple): Size of the grayscale array (width, height).
+
+    Returns:
+        ImageFeatures: The extracted features, or None if the image cannot be read.
+    """
+    try:
+        with Image.open(image_path) as img:
+            img.load()
+            phash = str(imagehash.phash(img))
+            if img.getexif().get(EXIF_ORIENTATION, 1) != 1:
+                img = ImageOps.exif_transpose(img)
+            rgb = np.asarray(img.convert("RGB"))
+
+        # Channel 2 of RGB is the blue channel OpenCV's BGR decode puts first
+        histogram = cv2.calcHist([rgb], [2], None, [256], [0, 256])
+        cv2.normalize(histogram, histogram)
+
+        gray_full = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+        sharpness = float(cv2.Laplacian(gray_full, cv2.CV_64F).var())
+        exposure = float(np.mean(gray_full))
+        gray = cv2.resize(gray_full, size)
+
+        return ImageFeatures(phash, histogram.ravel().astype(np.float32), gray, sharpness, exposure)
+    except Exception as e:
+        logging.error(f"Error extracting features for {image_path}: {e}")
+        return None
+
+
+class FeatureArrays(namedtuple("FeatureArrays", ["phashes", "histograms", "grays", "sharpness", "exposure", "valid"])):
+    """
+    Features of a batch of images packed into compact NumPy arrays.
+
+    Attributes:
+        phashes (np.ndarray): uint64 pHash per image, shape (N,).
+        histograms (np.ndarray): float32 normalized histograms, shape (N, 256).
+        grays (np.ndarray): uint8 grayscale arrays, shape (N, H, W), or None if not requested.
+        sharpness (np.ndarray): float64 Laplacian variance per image, shape (N,).
+        exposure (np.ndarray): float64 mean brightness per image, shape (N,).
+        valid (np.ndarray): Boolean mask of images that could be read, shape (N,).
+    """
+
+    __slots__ = ()
+
+    def to_features(self):
+        """
+        Unpack the arrays into a list of ``ImageFeatures`` (None for unreadable images).
+        """
+        features = []
+        for idx in range(len(self.valid)):
+            if not self.valid[idx]:
+                features.append(None)
+                continue
+            features.append(ImageFeatures(
+                f"{int(self.phashes[idx]):016x}",
+                self.histograms[idx],
+                self.grays[idx] if self.grays is not None else None,
+                float(self.sharpness[idx]),
+                float(self.exposure[idx]),
+            ))
+        return features
+
+
+def _initialize_worker(threads_per_worker):
+    """
+    Limit OpenCV's internal thread pool so that worker processes do not oversubscribe cores.
+    """
+    cv2.setNumThreads(threads_per_worker)
+
+
+def _extract_chunk(image_paths, size, include_gray):
+    """
+    Extract features for a chunk of images into ``FeatureArrays``.
+    """
+    n = len(image_paths)
+    phashes = np.zeros(n, dtype=np.uint64)
+    histograms = np.zeros((n, 256), dtype=np.float32)
+    grays = np.zeros((n, size[1], size[0]), dtype=np.uint8) if include_gray else None
+    sharpness = np.zeros(n, dtype=np.float64)
+    exposure = np.zeros(n, dtype=np.float64)
+    valid = np.zeros(n, dtype=bool)
+
+    for idx, image_path in enumerate(image_paths):
+        features = extract_image_features(image_path, size)
+        if features is None:
+            continue
+        phashes[idx] = int(features.phash, 16)
+        histograms[idx] = features.histogram
+        if include_gray:
+            grays[idx] = features.gray
+        sharpness[idx] = features.sharpness
+        exposure[idx] = features.exposure
+        valid[idx] = True
+
+    return FeatureArrays(phashes, histograms, grays, sharpness, exposure, valid)
+
+
+def iterate_feature_chunks(image_paths, workers=None, chunk_size=64, size=FEATURE_SIZE, include_gray=True,
+                           threads_per_worker=1):
+    """
+    Extract features chunk by chunk, serially or with a process pool, in input order.
+
+    Serial and parallel modes run the same per-image extraction, so their results are
+    identical. Each worker returns a whole chunk as ``FeatureArrays`` rather than one
+    pickled object per image.
+
+    Parameters:
+        image_paths (list): Paths of the images.
+        workers (int): Number of worker processes; None or 1 runs serially (default: None).
+        chunk_size (int): Number of images per task (default: 64).
+        size (tuple): Size of the grayscale arrays (width, height).
+        include_gray (bool): Whether to return the grayscale arrays (default: True).
+        threads_per_worker (int): OpenCV threads per worker process (default: 1).
+
+    Yields:
+        tuple: ``(start, arrays)`` with the offset of the chunk and its ``FeatureArrays``.
+    """
+    starts = list(range(0, len(image_paths), chunk_size))
+    chunks = [image_paths[start:start + chunk_size] for start in starts]
+
+    if not workers or workers <= 1:
+        for start, chunk in zip(starts, chunks):
+            yield start, _extract_chunk(chunk, size, include_gray)
+        return
+
+    logging.info(f"Extracting features for {len(image_paths)} images with {workers} workers "
+                 f"({len(chunks)} chunks of up to {chunk_size}).")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_initialize_worker,
+                             initargs=(threads_per_worker,)) as executor:
+        results = executor.map(_extract_chunk, chunks, repeat(size), repeat(include_gray))
+        for start, arrays in zip(starts, results):
+            yield start, arrays
+
+
+def extract_features(image_paths, workers=None, chunk_size=64, size=FEATURE_SIZE, include_gray=True,
+                     threads_per_worker=1):
+    """
+    Extract pHash, histogram, grayscale array, sharpness and exposure for many images.
+
+    Parameters:
+        image_paths (list): Paths of the images.
+        workers (int): Number of worker processes; None or 1 runs serially (default: None).
+        chunk_size (int): Number of images per task (default: 64).
+        size (tuple): Size of the grayscale arrays (width, height).
+        include_gray (bool): Whether to return the grayscale arrays (default: True).
+        threads_per_worker (int): OpenCV threads per worker process (default: 1).
+
+    Returns:
+        FeatureArrays: Features of all images, in input order.
+    """
+    chunks = [arrays for _, arrays in iterate_feature_chunks(
+        image_paths, workers, chunk_size, size, include_gray, threads_per_worker
+    )]
+    if not chunks:
+        return _extract_chunk([], size, include_gray)
+
+    return FeatureArrays(
+        np.concatenate([chunk.phashes for chunk in chunks]),
+        np.concatenate([chunk.histograms for chunk in chunks]),
+        np.concatenate([chunk.grays for chunk in chunks]) if include_gray else None,
+        np.concatenate([chunk.sharpness for chunk in chunks]),
+        np.concatenate([chunk.exposure for chunk in chunks]),
+        np.concatenate([chunk.valid for chunk in chunks]),
+    )
@@ -0,0 +1,262 @@
+import os
+import sqlite3
+import logging
+import threading
+import functools
+import numpy as np
+from src.snapscrub.utils.content_hash import calculate_content_hash
+from src.snapscrub.utils.feature_extraction import ImageFeatures, FEATURE_VERSION
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS features (
+    content_hash TEXT NOT NULL,
+    version TEXT NOT NULL,
+    phash TEXT NOT NULL,
+    histogram BLOB NOT NULL,
+    sharpness REAL NOT NULL,
+    exposure REAL NOT NULL,
+    PRIMARY KEY (content_hash, version)
+);
+CREATE TABLE IF NOT EXISTS model_scores (
+    content_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    version TEXT NOT NULL,
+    score REAL,
+    embedding BLOB,
+    PRIMARY KEY (content_hash, model, version)
+);
+"""
+
+
+def _locked(method):
+    """
+    Serialize calls to a ``FeatureStore`` method across threads.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class FeatureStore:
+    """
+    On-disk SQLite store of per-image features, keyed by file content hash.
+
+    Features are stored under the content hash of the file and an algorithm version,
+    so renamed or re-copied files with the same bytes are found again, and changing
+    the extraction code (``FEATURE_VERSION``) or a model invalidates old rows without
+    deleting them. Content hashes are cached per path together with the file size and
+    modification time, so unchanged files are not read again either.
+
+    Grayscale arrays are not stored; they are large and only needed for the SSIM
+    candidates, which are decoded on demand.
+
+    The store can be shared by threads (e.g. concurrent pipeline stages); its methods
+    are serialized by a lock.
+
+    Parameters:
+        db_path (str): Path to the SQLite database file (created if missing).
+        version (str): Version of the stored image features (default: ``FEATURE_VERSION``).
+    """
+
+    def __init__(self, db_path, version=FEATURE_VERSION):
+        self.db_path = db_path
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(_SCHEMA)
+        self.connection.commit()
+
+    @_locked
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @_locked
+    def content_hashes(self, file_paths):
+        """
+        Return the content hash of many files, reading only new or modified files.
+
+        Parameters:
+            file_paths (list): Paths of the files.
+
+        Returns:
+            list: Hex digests, or None for files that cannot be read.
+        """
+        hashes = []
+        updates = []
+        for file_path in file_paths:
+            try:
+                stat = os.stat(file_path)
+            except OSError as e:
+                logging.error(f"Error reading file status for {file_path}: {e}")
+                hashes.append(None)
+                continue
+
+            key = os.path.abspath(file_path)
+            row = self.connection.execute(
+                "SELECT size, mtime_ns, content_hash FROM files WHERE path = ?", (key,)
+            ).fetchone()
+            if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+                hashes.append(row[2])
+                continue
+
+            content_hash = calculate_content_hash(file_path)
+            hashes.append(content_hash)
+            if content_hash is not None:
+                updates.append((key, stat.st_size, stat.st_mtime_ns, content_hash))
+
+        if updates:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO files (path, size, mtime_ns, content_hash) VALUES (?, ?, ?, ?)", updates
+                )
+        return hashes
+
+    @_locked
+    def get_features(self, content_hashes):
+        """
+        Look up stored image features.
+
+        Parameters:
+            content_hashes (list): Content hashes of the images.
+
+        Returns:
+            list: ``ImageFeatures`` without grayscale arrays, or None for images not in the store.
+        """
+        features = []
+        for content_hash in content_hashes:
+            row = None
+            if content_hash is not None:
+                row = self.connection.execute(
+                    "SELECT phash, histogram, sharpness, exposure FROM features WHERE content_hash = ? AND version = ?",
+                    (content_hash, self.version),
+                ).fetchone()
+            if row is None:
+                self.misses += 1
+                features.append(None)
+                continue
+            self.hits += 1
+            histogram = np.frombuffer(row[1], dtype=np.float32).copy()
+            features.append(ImageFeatures(row[0], histogram, None, row[2], row[3]))
+        return features
+
+    @_locked
+    def put_features(self, content_hashes, features):
+        """
+        Store image features (the grayscale arrays are ignored).
+
+        Parameters:
+            content_hashes (list): Content hashes of the images.
+            features (list): ``ImageFeatures`` per image; None entries are skipped.
+        """
+        rows = [
+            (content_hash, self.version, item.phash, np.asarray(item.histogram, dtype=np.float32).tobytes(),
+             float(item.sharpness), float(item.exposure))
+            for content_hash, item in zip(content_hashes, features)
+            if content_hash is not None and item is not None
+        ]
+        if rows:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO features (content_hash, version, phash, histogram, sharpness, exposure) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+
+    @_locked
+    def get_scores(self, content_hashes, model, version):
+        """
+        Look up stored model scores.
+
+        Parameters:
+            content_hashes (list): Content hashes of the images.
+            model (str): Model name.
+            version (str): Model version, e.g. the framework and weights used.
+
+        Returns:
+            list: Scores, or None for images not scored by this model version.
+        """
+        scores = []
+        for content_hash in content_hashes:
+            row = None
+            if content_hash is not None:
+                row = self.connection.execute(
+                    "SELECT score FROM model_scores WHERE content_hash = ? AND model = ? AND version = ?",
+                    (content_hash, model, version),
+                ).fetchone()
+            scores.append(row[0] if row is not None else None)
+        return scores
+
+    @_locked
+    def get_embeddings(self, content_hashes, model, version, dtype=np.float32):
+        """
+        Look up stored model embeddings.
+
+        Parameters:
+            content_hashes (list): Content hashes of the images.
+            model (str): Model name.
+            version (str): Model version.
+            dtype (np.dtype): Data type the embeddings were stored with (default: float32).
+
+        Returns:
+            list: 1-D arrays, or None for images without a stored embedding.
+        """
+        embeddings = []
+        for content_hash in content_hashes:
+            row = None
+            if content_hash is not None:
+                row = self.connection.execute(
+                    "SELECT embedding FROM model_scores WHERE content_hash = ? AND model = ? AND version = ?",
+                    (content_hash, model, version),
+                ).fetchone()
+            embeddings.append(np.frombuffer(row[0], dtype=dtype).copy() if row is not None and row[0] is not None else None)
+        return embeddings
+
+    @_locked
+    def put_scores(self, content_hashes, model, version, scores, embeddings=None):
+        """
+        Store model scores and optional embeddings.
+
+        Parameters:
+            content_hashes (list): Content hashes of the images.
+            model (str): Model name.
+            version (str): Model version.
+            scores (list): Score per image; None entries are skipped.
+            embeddings (list): Optional 1-D array per image.
+        """
+        embeddings = [None] * len(scores) if embeddings is None else embeddings
+        rows = [
+            (content_hash, model, version, float(score),
+             np.ascontiguousarray(embedding).tobytes() if embedding is not None else None)
+            for content_hash, score, embedding in zip(content_hashes, scores, embeddings)
+            if content_hash is not None and score is not None
+        ]
+        if rows:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO model_scores (content_hash, model, version, score, embedding) "
+                    "VALUES (?, ?, ?, ?, ?)", rows
+                )
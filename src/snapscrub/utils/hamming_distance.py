@@ -0,0 +1,116 @@
+import logging
+import numpy as np
+
+# Number of set bits for every byte value, used when np.bitwise_count is unavailable (NumPy < 2.0)
+_POPCOUNT_TABLE = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def pack_hashes(hashes):
+    """
+    Pack hex-encoded 64-bit perceptual hashes into a uint64 array.
+
+    Parameters:
+        hashes (list): Hex-encoded 64-bit hashes (16 characters). ``None`` or malformed
+            entries are packed as zero and flagged as invalid.
+
+    Returns:
+        tuple: ``(packed, valid)`` where ``packed`` is a uint64 array of shape (N,)
+        and ``valid`` a boolean array marking usable entries.
+    """
+    valid = np.array([bool(h) and len(h) == 16 for h in hashes], dtype=bool)
+    hex_string = "".join(h if ok else "0" * 16 for h, ok in zip(hashes, valid))
+    try:
+        packed = np.frombuffer(bytes.fromhex(hex_string), dtype=">u8").astype(np.uint64)
+    except ValueError:
+        # Fall back to per-entry parsing to isolate malformed hashes
+        packed = np.zeros(len(hashes), dtype=np.uint64)
+        for idx, (h, ok) in enumerate(zip(hashes, valid)):
+            if not ok:
+                continue
+            try:
+                packed[idx] = int(h, 16)
+            except ValueError:
+                logging.error(f"Invalid hash at index {idx}: {h}")
+                valid[idx] = False
+    return packed, valid
+
+
+def popcount64(values):
+    """
+    Count the set bits of every element of a uint64 array.
+
+    Parameters:
+        values (np.ndarray): uint64 array of any shape.
+
+    Returns:
+        np.ndarray: uint8 array with the same shape holding the bit counts.
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values).astype(np.uint8, copy=False)
+    values = np.ascontiguousarray(values)
+    counts = _POPCOUNT_TABLE[values.view(np.uint8)]
+    return counts.reshape(values.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+
+def hamming_distance_matrix(packed_a, packed_b):
+    """
+    Compute the Hamming distances between two sets of packed hashes.
+
+    Parameters:
+        packed_a (np.ndarray): uint64 array of shape (N,).
+        packed_b (np.ndarray): uint64 array of shape (M,).
+
+    Returns:
+        np.ndarray: uint8 matrix of shape (N, M).
+    """
+    return popcount64(np.bitwise_xor(packed_a[:, None], packed_b[None, :]))
+
+
+def find_hash_pairs_within(packed, max_distance, valid=None, block_size=2048):
+    """
+    Find all pairs of packed hashes within a Hamming distance.
+
+    The upper triangle of the distance matrix is computed in square blocks of
+    ``block_size`` rows and columns, so memory does not depend on the number of
+    hashes and no Python work is done per pair. A block peaks at about 9 bytes per
+    element (the uint64 XOR temporary and the uint8 distances; about 17 without
+    ``np.bitwise_count``), i.e. roughly 36 MB (70 MB) at the default ``block_size``.
+
+    Parameters:
+        packed (np.ndarray): uint64 array of shape (N,).
+        max_distance (int): Maximum Hamming distance (inclusive).
+        valid (np.ndarray): Optional boolean mask of usable hashes.
+        block_size (int): Number of hashes per block side (default: 2048).
+
+    Returns:
+        tuple: Arrays ``(rows, cols, distances)`` with ``rows < cols``, sorted by (row, col).
+    """
+    n = len(packed)
+    rows, cols, distances = [], [], []
+
+    for row_start in range(0, n, block_size):
+        row_end = min(row_start + block_size, n)
+        for col_start in range(row_start, n, block_size):
+            col_end = min(col_start + block_size, n)
+            block = hamming_distance_matrix(packed[row_start:row_end], packed[col_start:col_end])
+
+            mask = block <= max_distance
+            if col_start == row_start:
+                mask &= np.triu(np.ones(block.shape, dtype=bool), k=1)
+            if valid is not None:
+                mask &= valid[row_start:row_end, None] & valid[None, col_start:col_end]
+
+            block_rows, block_cols = np.nonzero(mask)
+            rows.append(block_rows + row_start)
+            cols.append(block_cols + col_start)
+            distances.append(block[block_rows, block_cols])
+
+    if not rows:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=np.uint8)
+
+    rows = np.concatenate(rows).astype(np.int64)
+    cols = np.concatenate(cols).astype(np.int64)
+    distances = np.concatenate(distances)
+    order = np.lexsort((cols, rows))
+    return rows[order], cols[order], distances[order]
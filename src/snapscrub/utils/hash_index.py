@@ -0,0 +1,117 @@
+import logging
+
+
+def hamming_distance(hash1, hash2):
+    """
+    Calculate the Hamming distance between two integer hashes.
+
+    Parameters:
+        hash1 (int): First hash value.
+        hash2 (int): Second hash value.
+
+    Returns:
+        int: Number of differing bits.
+    """
+    return bin(hash1 ^ hash2).count("1")
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over integer hashes using the Hamming distance.
+
+    Each node stores an item index and its children keyed by their distance to
+    the node, so a radius query only descends into children whose edge distance
+    lies within ``[d - radius, d + radius]`` (triangle inequality).
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value, item):
+        """
+        Insert a hash into the tree.
+
+        Parameters:
+            value (int): Hash value.
+            item: Identifier returned by queries (e.g. the image index).
+        """
+        node = (value, item, {})
+        self.size += 1
+        if self.root is None:
+            self.root = node
+            return
+
+        current = self.root
+        while True:
+            distance = hamming_distance(value, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def query(self, value, radius):
+        """
+        Find all items whose hash lies within a Hamming radius of a value.
+
+        Parameters:
+            value (int): Hash value to search for.
+            radius (int): Maximum Hamming distance (inclusive).
+
+        Returns:
+            list: Tuples ``(item, distance)`` of matching entries.
+        """
+        if self.root is None:
+            return []
+
+        matches = []
+        stack = [self.root]
+        while stack:
+            node_value, node_item, children = stack.pop()
+            distance = hamming_distance(value, node_value)
+            if distance <= radius:
+                matches.append((node_item, distance))
+            low, high = distance - radius, distance + radius
+            for edge, child in children.items():
+                if low <= edge <= high:
+                    stack.append(child)
+        return matches
+
+
+def find_similar_hash_pairs(hashes, max_distance):
+    """
+    Find all pairs of hashes within a Hamming distance using a BK-tree.
+
+    Each hash is queried against the tree of the hashes inserted before it and
+    then added, so every pair is reported exactly once. For small radii the
+    number of visited nodes per query is a small fraction of the corpus, which
+    keeps candidate generation close to linear in the number of images.
+
+    Parameters:
+        hashes (list): Hex-encoded perceptual hashes (``None`` entries are ignored).
+        max_distance (int): Maximum Hamming distance (in bits) for a pair.
+
+    Returns:
+        list: Sorted tuples ``(i, j)`` of list indices with ``i < j``.
+    """
+    tree = BKTree()
+    pairs = []
+
+    for idx, hash_hex in enumerate(hashes):
+        if not hash_hex:
+            continue
+        try:
+            value = int(hash_hex, 16)
+        except ValueError:
+            logging.error(f"Invalid hash at index {idx}: {hash_hex}")
+            continue
+
+        for other_idx, _ in tree.query(value, max_distance):
+            pairs.append((other_idx, idx))
+        tree.add(value, idx)
+
+    pairs.sort()
+    logging.info(f"BK-tree candidate search: {len(pairs)} pairs within distance {max_distance} "
+                 f"among {tree.size} hashes.")
+    return pairs
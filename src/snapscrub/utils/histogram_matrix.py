@@ -0,0 +1,174 @@
+import logging
+import cv2
+import numpy as np
+from src.snapscrub.utils.feature_extraction import ImageFeatures
+
+
+def calculate_channel_histograms(image, channels=(0,)):
+    """
+    Calculate L2-normalized 256-bin histograms for the requested channels of a BGR image.
+
+    Parameters:
+        image (np.ndarray): Decoded BGR (or grayscale) image.
+        channels (tuple): Channel indices to use (default: (0,), the blue channel).
+
+    Returns:
+        np.ndarray: float64 array of shape (len(channels), 256).
+    """
+    histograms = np.empty((len(channels), 256), dtype=np.float64)
+    for idx, channel in enumerate(channels):
+        hist = cv2.calcHist([image], [channel], None, [256], [0, 256])
+        cv2.normalize(hist, hist)
+        histograms[idx] = hist.ravel()
+    return histograms
+
+
+def build_histogram_matrix(images, channels=(0,)):
+    """
+    Build an (N, C, 256) matrix of normalized histograms for a list of images.
+
+    Parameters:
+        images (list): Image paths, ``ImageFeatures`` (channel 0 only) or precomputed
+            histogram arrays. ``None`` entries are marked invalid.
+        channels (tuple): Channel indices to use (default: (0,)).
+
+    Returns:
+        tuple: ``(histograms, valid)`` where ``histograms`` has shape (N, C, 256) and
+        ``valid`` is a boolean array marking images that could be read.
+    """
+    histograms = np.zeros((len(images), len(channels), 256), dtype=np.float64)
+    valid = np.zeros(len(images), dtype=bool)
+
+    for idx, image in enumerate(images):
+        if image is None:
+            continue
+        try:
+            if isinstance(image, ImageFeatures):
+                if tuple(channels) != (0,):
+                    raise ValueError("Precomputed features only hold the channel 0 histogram.")
+                histograms[idx, 0] = image.histogram
+            elif isinstance(image, np.ndarray):
+                histograms[idx] = image.reshape(len(channels), 256)
+            else:
+                decoded = cv2.imread(image)
+                if decoded is None:
+                    continue
+                histograms[idx] = calculate_channel_histograms(decoded, channels)
+            valid[idx] = True
+        except Exception as e:
+            logging.error(f"Error building histogram for image {idx}: {e}")
+
+    return histograms, valid
+
+
+def prepare_correlation_matrix(histograms):
+    """
+    Mean-center and L2-normalize histograms so that dot products equal HISTCMP_CORREL.
+
+    Parameters:
+        histograms (np.ndarray): Array of shape (N, C, 256).
+
+    Returns:
+        tuple: ``(prepared, flat)`` where ``prepared`` has the same shape and ``flat``
+        marks (N, C) histograms with zero variance.
+    """
+    centered = histograms - histograms.mean(axis=-1, keepdims=True)
+    norms = np.linalg.norm(centered, axis=-1, keepdims=True)
+    flat = norms[..., 0] <= np.finfo(np.float64).eps
+    prepared = np.divide(centered, norms, out=np.zeros_like(centered), where=~flat[..., None])
+    return prepared, flat
+
+
+def histogram_correlation_pairs(prepared, flat, rows, cols, chunk_size=65536):
+    """
+    Compute HISTCMP_CORREL similarities for explicit index pairs, averaged over channels.
+
+    Parameters:
+        prepared (np.ndarray): Output of ``prepare_correlation_matrix``, shape (N, C, 256).
+        flat (np.ndarray): Zero-variance mask from ``prepare_correlation_matrix``.
+        rows (np.ndarray): First index of each pair.
+        cols (np.ndarray): Second index of each pair.
+        chunk_size (int): Number of pairs processed per step (default: 65536).
+
+    Returns:
+        np.ndarray: float64 similarities, one per pair.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    similarities = np.empty(len(rows), dtype=np.float64)
+
+    for start in range(0, len(rows), chunk_size):
+        r = rows[start:start + chunk_size]
+        c = cols[start:start + chunk_size]
+        per_channel = np.einsum("pcb,pcb->pc", prepared[r], prepared[c])
+        # OpenCV returns 1.0 when either histogram has zero variance
+        per_channel[flat[r] | flat[c]] = 1.0
+        similarities[start:start + chunk_size] = per_channel.mean(axis=1)
+
+    return similarities
+
+
+def histogram_correlation_blocks(prepared, flat, block_size=2048):
+    """
+    Yield HISTCMP_CORREL similarity tiles of the upper triangle of the full matrix.
+
+    Parameters:
+        prepared (np.ndarray): Output of ``prepare_correlation_matrix``, shape (N, C, 256).
+        flat (np.ndarray): Zero-variance mask from ``prepare_correlation_matrix``.
+        block_size (int): Number of images per tile side (default: 2048).
+
+    Yields:
+        tuple: ``(row_start, col_start, tile)`` with ``tile`` of shape (rows, cols).
+    """
+    n, num_channels, _ = prepared.shape
+
+    for row_start in range(0, n, block_size):
+        row_end = min(row_start + block_size, n)
+        for col_start in range(row_start, n, block_size):
+            col_end = min(col_start + block_size, n)
+            tile = np.zeros((row_end - row_start, col_end - col_start), dtype=np.float64)
+            for channel in range(num_channels):
+                channel_tile = prepared[row_start:row_end, channel] @ prepared[col_start:col_end, channel].T
+                either_flat = flat[row_start:row_end, channel, None] | flat[None, col_start:col_end, channel]
+                channel_tile[either_flat] = 1.0
+                tile += channel_tile
+            yield row_start, col_start, tile / num_channels
+
+
+def find_histogram_pairs_above(prepared, flat, threshold, valid=None, block_size=2048):
+    """
+    Find all pairs whose histogram correlation is at least a threshold.
+
+    Parameters:
+        prepared (np.ndarray): Output of ``prepare_correlation_matrix``, shape (N, C, 256).
+        flat (np.ndarray): Zero-variance mask from ``prepare_correlation_matrix``.
+        threshold (float): Minimum similarity (inclusive).
+        valid (np.ndarray): Optional boolean mask of usable images.
+        block_size (int): Number of images per tile side (default: 2048).
+
+    Returns:
+        tuple: Arrays ``(rows, cols, similarities)`` with ``rows < cols``, sorted by (row, col).
+    """
+    rows, cols, similarities = [], [], []
+
+    for row_start, col_start, tile in histogram_correlation_blocks(prepared, flat, block_size):
+        mask = tile >= threshold
+        if row_start == col_start:
+            mask &= np.triu(np.ones(tile.shape, dtype=bool), k=1)
+        if valid is not None:
+            mask &= valid[row_start:row_start + tile.shape[0], None] & valid[None, col_start:col_start + tile.shape[1]]
+
+        tile_rows, tile_cols = np.nonzero(mask)
+        rows.append(tile_rows + row_start)
+        cols.append(tile_cols + col_start)
+        similarities.append(tile[tile_rows, tile_cols])
+
+    if not rows:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=np.float64)
+
+    rows = np.concatenate(rows).astype(np.int64)
+    cols = np.concatenate(cols).astype(np.int64)
+    similarities = np.concatenate(similarities)
+    order = np.lexsort((cols, rows))
+    return rows[order], cols[order], similarities[order]
@@ -0,0 +1,52 @@
+import sys
+import types
+import importlib
+import importlib.util
+
+
+class LazyPackage(types.ModuleType):
+    """
+    Package module whose re-exported names are imported on first attribute access.
+
+    ``_lazy_exports`` maps each exported name to the (relative or absolute) module
+    defining it. When a submodule with the same name as one of its exports is imported
+    directly, Python binds the submodule on the package; the exported object is kept
+    instead, as with an eager ``from .module import name``.
+    """
+
+    def __getattr__(self, name):
+        exports = self.__dict__.get("_lazy_exports", {})
+        if name not in exports:
+            raise AttributeError(f"module {self.__name__!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(exports[name], self.__name__), name)
+        setattr(self, name, value)
+        return value
+
+    def __setattr__(self, name, value):
+        exports = self.__dict__.get("_lazy_exports", {})
+        if (name in exports and isinstance(value, types.ModuleType)
+                and value.__name__ == importlib.util.resolve_name(exports[name], self.__name__)
+                and hasattr(value, name)):
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(self.__dict__.get("_lazy_exports", {})))
+
+
+def lazy_exports(package_name, exports):
+    """
+    Make a package import its re-exported names lazily.
+
+    Call at the end of a package ``__init__`` instead of eager ``from .module import name``
+    statements, so that importing the package (or any of its submodules) does not load
+    heavy dependencies of unrelated submodules.
+
+    Parameters:
+        package_name (str): ``__name__`` of the package.
+        exports (dict): Mapping of exported name to the module defining it.
+    """
+    module = sys.modules[package_name]
+    module._lazy_exports = dict(exports)
+    module.__all__ = list(exports)
+    module.__class__ = LazyPackage